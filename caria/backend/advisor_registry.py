@@ -0,0 +1,74 @@
+import threading
+
+# One place to resolve advisors, whichever source they come from.
+# Rows of the advisors table win over STATIC_ADVISORS (server.py) with the same
+# id or slug; the static list is only a fallback for advisors not in the table.
+# Table rows are normalised to the static shape (name/fullName).
+
+
+class AdvisorRegistry:
+    def __init__(self, static_advisors, version_fn):
+        """`version_fn()` returns the current advisors table version; the registry
+        reloads itself from the database whenever it changes."""
+        self.static_advisors = static_advisors
+        self.version_fn = version_fn
+        self.version = None
+        self.by_id = {}
+        self.by_slug = {}
+        self.loads = 0
+        self._lock = threading.Lock()
+
+    def ensure(self, db):
+        version = self.version_fn()
+        if self.version == version:
+            return
+        with self._lock:
+            if self.version != version:
+                self._load(db)
+                self.version = version
+
+    def _load(self, db):
+        by_id = {}
+        by_slug = {}
+        for row in db.execute("SELECT * FROM advisors").fetchall():
+            advisor = dict(row)
+            advisor['name'] = advisor.get('fullName', '')
+            by_id[advisor['id']] = advisor
+            if advisor.get('slug'):
+                by_slug[advisor['slug']] = advisor
+
+        for advisor in self.static_advisors:
+            if advisor['id'] in by_id:
+                continue
+            by_id[advisor['id']] = advisor
+            by_slug.setdefault(advisor['slug'], advisor)
+
+        self.by_id = dict(sorted(by_id.items()))
+        self.by_slug = by_slug
+        self.loads += 1
+
+    def get(self, db, advisor_id):
+        self.ensure(db)
+        return self.by_id.get(advisor_id)
+
+    def get_by_slug(self, db, slug):
+        self.ensure(db)
+        return self.by_slug.get(slug)
+
+    def all(self, db):
+        self.ensure(db)
+        return list(self.by_id.values())
+
+    def enrich(self, db, listings):
+        """Adds advisor_name / advisor_portrait / advisor_slug / advisor to each
+        listing in a single pass over an id-indexed map."""
+        self.ensure(db)
+        by_id = self.by_id
+        for listing in listings:
+            advisor = by_id.get(listing.get('advisor_id'))
+            if advisor:
+                listing['advisor_name'] = advisor.get('fullName')
+                listing['advisor_portrait'] = advisor.get('portraitUrl')
+                listing['advisor_slug'] = advisor.get('slug')
+                listing['advisor'] = advisor
+        return listings
@@ -0,0 +1,140 @@
+"""Tail latency of cheap requests while the API is under mixed database load.
+
+Starts the API in-process on a copy of the database and measures probe
+requests (GET /api/ and GET /api/cms/menus) first on an idle server, then
+while load threads send uncached listing pages, full-text searches, radius
+searches and inquiry writes. With handler bodies on the db executor the
+loaded p95/p99 should stay close to the idle figures.
+
+Usage: python bench_db_concurrency.py [caria.db] [--seconds 10] [--threads 16]
+"""
+import argparse
+import os
+import random
+import shutil
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+import requests
+import uvicorn
+
+SEARCH_WORDS = ["villa", "pool", "sea", "garden", "kyrenia", "apartment", "view", "bungalow", "penthouse"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {"n": 0}
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+    return {
+        "n": len(samples),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": samples[-1] * 1000,
+        "mean": statistics.mean(samples) * 1000,
+    }
+
+
+def load_request(session, base):
+    kind = random.random()
+    if kind < 0.35:
+        # A fresh page number defeats the response cache
+        return session.get(f"{base}/api/properties", params={
+            "sort": "price_desc", "limit": 200, "page": random.randint(1, 10**6), "fields": "detail",
+        })
+    if kind < 0.65:
+        return session.get(f"{base}/api/properties/search", params={
+            "q": random.choice(SEARCH_WORDS), "limit": random.randint(1, 50),
+        })
+    if kind < 0.85:
+        return session.get(f"{base}/api/properties/nearby", params={
+            "lat": 35.2 + random.random() * 0.3, "lng": 33.2 + random.random() * 0.9, "radius_km": 25,
+        })
+    return session.post(f"{base}/api/inquiries", json={
+        "name": "Benchmark", "email": "bench@example.com", "message": "load test",
+    })
+
+
+def run_phase(base, seconds, threads):
+    stop = threading.Event()
+    probes = []
+    load_count = [0]
+    lock = threading.Lock()
+
+    def probe():
+        session = requests.Session()
+        paths = ["/api/", "/api/cms/menus"]
+        while not stop.is_set():
+            started = time.perf_counter()
+            session.get(base + random.choice(paths))
+            probes.append(time.perf_counter() - started)
+            time.sleep(0.01)
+
+    def load():
+        session = requests.Session()
+        while not stop.is_set():
+            load_request(session, base)
+            with lock:
+                load_count[0] += 1
+
+    workers = [threading.Thread(target=probe)] + [threading.Thread(target=load) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    time.sleep(seconds)
+    stop.set()
+    for w in workers:
+        w.join()
+    return percentiles(probes), load_count[0] / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("db", nargs="?", default=os.path.join(os.path.dirname(__file__), "caria.db"))
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    db_copy = os.path.join(workdir, "bench.db")
+    shutil.copy(args.db, db_copy)
+    os.environ["SITEMAP_CACHE_DIR"] = os.path.join(workdir, "sitemaps")
+
+    import server
+    server.DB_PATH = server.Path(db_copy)
+    server.db_pool.path = db_copy
+    server.db_writer.path = db_copy
+
+    port = free_port()
+    api = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=api.run, daemon=True).start()
+    while not api.started:
+        time.sleep(0.05)
+    base = f"http://127.0.0.1:{port}"
+
+    try:
+        idle, _ = run_phase(base, args.seconds / 2, 0)
+        loaded, throughput = run_phase(base, args.seconds, args.threads)
+        stats = requests.get(f"{base}/api/db/stats").json()
+    finally:
+        api.should_exit = True
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'phase':<8}{'probes':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for name, result in (("idle", idle), ("loaded", loaded)):
+        print(f"{name:<8}{result['n']:>8}{result['p50']:>9.2f}{result['p95']:>9.2f}{result['p99']:>9.2f}{result['max']:>9.2f}")
+    print(f"load: {throughput:.0f} req/s over {args.threads} threads")
+    print(f"pool: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Delta sync over change_log (see migrate_change_log.py).
+# Triggers append one entry per inserted, updated or deleted row; a client
+# keeps the token of the last entry it has seen and asks for everything after
+# it. Tokens are change_log sequence numbers, which AUTOINCREMENT never reuses,
+# so a gap below the oldest surviving entry can only mean pruned history.
+
+CHANGE_TABLES = ('listings', 'pages', 'page_blocks', 'menus', 'sliders', 'homepage_blocks')
+FETCH_CHUNK = 500
+
+
+class StaleToken(Exception):
+    """The token predates the retained history; the client must reload in full."""
+
+
+def current_token(db):
+    row = db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return row[0] if row else 0
+
+
+def changes_since(db, since, tables=CHANGE_TABLES, limit=1000):
+    """Rows upserted and ids deleted after `since`, per table, at most `limit` log entries.
+    Several changes to one row collapse into its latest state."""
+    latest = current_token(db)
+    oldest = db.execute("SELECT MIN(seq) FROM change_log").fetchone()[0]
+    if since > latest or since < (oldest if oldest is not None else latest + 1) - 1:
+        raise StaleToken(since)
+
+    placeholders = ", ".join("?" for _ in tables)
+    entries = db.execute(f"""
+        SELECT seq, table_name, row_id, op FROM change_log
+        WHERE seq > ? AND seq <= ? AND table_name IN ({placeholders})
+        ORDER BY seq
+        LIMIT ?
+    """, (since, latest, *tables, limit)).fetchall()
+
+    latest_op = {}
+    for _, table, row_id, op in entries:
+        latest_op[(table, row_id)] = op
+
+    changes = {}
+    for table in tables:
+        upserted = [row_id for (t, row_id), op in latest_op.items() if t == table and op == 'upsert']
+        deleted = [row_id for (t, row_id), op in latest_op.items() if t == table and op == 'delete']
+        if not upserted and not deleted:
+            continue
+        rows = []
+        for start in range(0, len(upserted), FETCH_CHUNK):
+            chunk = upserted[start:start + FETCH_CHUNK]
+            # A row deleted after `latest` is missing here; its tombstone comes with the next token
+            rows += [dict(r) for r in db.execute(
+                f"SELECT * FROM {table} WHERE id IN ({', '.join('?' for _ in chunk)}) ORDER BY id", chunk
+            ).fetchall()]
+        changes[table] = {"upserted": rows, "deleted": sorted(deleted)}
+
+    has_more = len(entries) == limit
+    token = entries[-1][0] if has_more else latest
+    return {"token": str(token), "has_more": has_more, "changes": changes}
+
+
+def prune(db, days):
+    """Drops log entries older than `days`; clients holding older tokens get StaleToken."""
+    cursor = db.execute("DELETE FROM change_log WHERE changed_at < datetime('now', ?)", (f"-{int(days)} days",))
+    return cursor.rowcount
@@ -0,0 +1,355 @@
+import asyncio
+import functools
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Bounded pool of pre-configured SQLite connections, the executor that runs
+# blocking database work off the event loop, and the single writer that
+# group-commits every write.
+# Connections are opened lazily, tuned once (WAL, synchronous=NORMAL, page
+# cache, mmap, in-memory temp tables, busy timeout) and then reused, so a
+# request no longer pays for connect() and a cold page cache. The writer alone
+# runs with synchronous=FULL: it is the only connection that commits.
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout."""
+
+
+def connection_pragmas(synchronous="NORMAL"):
+    return [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA cache_size=-{int(os.environ.get('DB_CACHE_SIZE_KB', 16384))}",
+        f"PRAGMA mmap_size={int(os.environ.get('DB_MMAP_SIZE', 256 * 1024 * 1024))}",
+        "PRAGMA temp_store=MEMORY",
+        f"PRAGMA busy_timeout={int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))}",
+    ]
+
+
+class ConnectionPool:
+    def __init__(self, path, size=8, timeout=30.0, pragmas=None):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.pragmas = pragmas if pragmas is not None else connection_pragmas()
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+        self.created = 0
+        self.acquired = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+        self.discarded = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._open < self.size:
+                    self._open += 1
+                    self.created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._open -= 1
+                    raise
+            else:
+                started = time.monotonic()
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s")
+                waited = time.monotonic() - started
+                with self._lock:
+                    self.waits += 1
+                    self.wait_time += waited
+                    self.max_wait = max(self.max_wait, waited)
+        with self._lock:
+            self.acquired += 1
+        return conn
+
+    def release(self, conn):
+        try:
+            # A handler that failed halfway must not hand its open transaction to the next request
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.warning(f"Discarding pooled connection: {e}")
+            conn.close()
+            with self._lock:
+                self._open -= 1
+                self.discarded += 1
+            return
+        self._idle.put(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._open -= 1
+
+    def stats(self):
+        with self._lock:
+            idle = self._idle.qsize()
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": idle,
+                "in_use": self._open - idle,
+                "created": self.created,
+                "acquired": self.acquired,
+                "waits": self.waits,
+                "avg_wait_ms": round(self.wait_time / self.waits * 1000, 3) if self.waits else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "timeouts": self.timeouts,
+                "discarded": self.discarded,
+            }
+
+
+class DatabaseExecutor:
+    """Dedicated threads for blocking sqlite3 work, awaitable from async code.
+    Sized like the connection pool: each job holds at most one connection, so
+    more threads would only wait for connections."""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.queue_time = 0.0
+        self.max_queue_time = 0.0
+        self.run_time = 0.0
+
+    async def run(self, fn, *args, **kwargs):
+        submitted = time.monotonic()
+        with self._lock:
+            self.pending += 1
+
+        def call():
+            started = time.monotonic()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                finished = time.monotonic()
+                with self._lock:
+                    self.pending -= 1
+                    self.completed += 1
+                    self.queue_time += started - submitted
+                    self.max_queue_time = max(self.max_queue_time, started - submitted)
+                    self.run_time += finished - started
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    def offload(self, handler):
+        """Route decorator: the blocking handler body runs on the executor while
+        FastAPI still sees the original signature and dependencies."""
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            return await self.run(handler, *args, **kwargs)
+        return wrapper
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self.pending,
+                "completed": self.completed,
+                "avg_queue_ms": round(self.queue_time / self.completed * 1000, 3) if self.completed else 0.0,
+                "max_queue_ms": round(self.max_queue_time * 1000, 3),
+                "avg_run_ms": round(self.run_time / self.completed * 1000, 3) if self.completed else 0.0,
+            }
+
+
+WriteResult = namedtuple("WriteResult", "lastrowid rowcount")
+
+
+class WriteQueue:
+    """Every write goes through one thread holding the only writing connection.
+
+    Jobs that arrive within `window` seconds of each other share a transaction
+    (group commit: one fsync for the lot), while readers on the pool keep
+    running against the last committed snapshot under WAL. Each job runs in
+    its own savepoint, so a failing job is rolled back alone and its caller
+    gets its own exception; the others still commit. The writer connection
+    uses synchronous=FULL, so each COMMIT syncs the WAL and submit() returns
+    only once the job's transaction is durable, power loss included.
+
+    A job is `fn(conn, *args)`; it must not commit or roll back itself.
+    """
+
+    def __init__(self, path, window=0.002, max_batch=64, pragmas=None):
+        self.path = path
+        self.window = window
+        self.max_batch = max_batch
+        self.pragmas = pragmas if pragmas is not None else connection_pragmas(synchronous="FULL")
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._conn = None
+        self.jobs = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+        self.commit_time = 0.0
+        self.max_commit_time = 0.0
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, fn, *args):
+        """Runs fn(conn, *args) in the next group commit and returns its result
+        (or raises its exception). Blocks the calling thread until then."""
+        if self._thread is None:
+            self._start()
+        future = Future()
+        self._jobs.put((fn, args, future))
+        return future.result()
+
+    def execute(self, sql, params=()):
+        """Single-statement write; returns the statement's own lastrowid and rowcount."""
+        def job(conn):
+            cursor = conn.execute(sql, params)
+            return WriteResult(cursor.lastrowid, cursor.rowcount)
+        return self.submit(job)
+
+    def _connect(self):
+        # Autocommit mode: the writer issues BEGIN / SAVEPOINT / COMMIT itself
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        return conn
+
+    def _run(self):
+        while True:
+            first = self._jobs.get()
+            if first is None:
+                break
+            batch = [first]
+            stop = False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    job = self._jobs.get(timeout=remaining) if remaining > 0 else self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stop = True
+                    break
+                batch.append(job)
+            self._commit(batch)
+            if stop:
+                break
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _commit(self, batch):
+        started = time.monotonic()
+        batch = [job for job in batch if job[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        outcomes = []
+        try:
+            if self._conn is None:
+                self._conn = self._connect()
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, args, future in batch:
+                conn.execute("SAVEPOINT job")
+                try:
+                    result = fn(conn, *args)
+                except BaseException as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    outcomes.append((future, None, e))
+                else:
+                    conn.execute("RELEASE job")
+                    outcomes.append((future, result, None))
+            conn.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"Group commit of {len(batch)} writes failed: {e}")
+            if self._conn is not None:
+                try:
+                    if self._conn.in_transaction:
+                        self._conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    self._conn.close()
+                    self._conn = None
+            # Jobs that had succeeded (or not run yet) were rolled back with the transaction
+            errors = {id(future): error for future, _, error in outcomes if error is not None}
+            outcomes = [(future, None, errors.get(id(future), e)) for _, _, future in batch]
+
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self.batches += 1
+            self.jobs += len(batch)
+            self.failed += sum(1 for _, _, error in outcomes if error is not None)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self.commit_time += elapsed
+            self.max_commit_time = max(self.max_commit_time, elapsed)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._jobs.put(None)
+            thread.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self._jobs.qsize(),
+                "jobs": self.jobs,
+                "failed": self.failed,
+                "commits": self.batches,
+                "avg_batch": round(self.jobs / self.batches, 2) if self.batches else 0.0,
+                "max_batch": self.max_batch_seen,
+                "avg_commit_ms": round(self.commit_time / self.batches * 1000, 3) if self.batches else 0.0,
+                "max_commit_ms": round(self.max_commit_time * 1000, 3),
+            }
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import threading
+import uuid
+from collections import deque
+
+# Per-process fan-out for Server-Sent Events.
+# Writers call publish() after their commit; every connected client has its
+# own bounded queue, so a slow client loses its connection instead of holding
+# events for everyone else. Recent events are kept for Last-Event-ID replay.
+# Event ids are "<epoch>-<seq>": the epoch is new for every broker, so an id
+# handed out before a restart (or by another worker) is never mistaken for a
+# current one. With several worker processes each one only sees its own writes.
+
+
+class Subscription(asyncio.Queue):
+    # Set when the broker gives up on a client; the stream ends once the queue is drained
+    closed = False
+
+
+class EventBroker:
+    def __init__(self, queue_size=100, history=256):
+        self.queue_size = queue_size
+        self.epoch = uuid.uuid4().hex[:8]
+        self._history = deque(maxlen=history)   # (seq, message)
+        self._subscribers = {}          # queue -> event loop
+        self._seq = 0
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, event, data):
+        """Safe to call from any thread; never blocks the writer."""
+        with self._lock:
+            self._seq += 1
+            message = (f"{self.epoch}-{self._seq}", event, json.dumps(data, default=str))
+            self._history.append((self._seq, message))
+            self.published += 1
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                # The subscriber's event loop is closed (its server stopped
+                # without unsubscribing); the write has committed regardless
+                self.unsubscribe(queue)
+
+    def _deliver(self, queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too far behind: end the stream, the client reconnects with Last-Event-ID
+            with self._lock:
+                self.dropped += 1
+                self._subscribers.pop(queue, None)
+            queue.closed = True
+
+    def _sequence(self, event_id):
+        """The seq of an id this broker handed out, else None."""
+        epoch, _, seq = event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self._seq:
+            return None
+        return int(seq)
+
+    def subscribe(self, last_event_id=None):
+        """Returns a queue of (id, event, json data) tuples, pre-filled with the
+        retained events after `last_event_id`, or with a "reset" event when some
+        of those are no longer retained or the id is not one of this broker's."""
+        queue = Subscription(self.queue_size)
+        with self._lock:
+            if last_event_id is not None:
+                seq = self._sequence(last_event_id)
+                oldest = self._history[0][0] if self._history else self._seq + 1
+                missed = [m for s, m in self._history if seq is not None and s > seq]
+                if seq is None or oldest > seq + 1 or len(missed) >= self.queue_size:
+                    queue.put_nowait((f"{self.epoch}-{self._seq}", "reset", "{}"))
+                else:
+                    for message in missed:
+                        queue.put_nowait(message)
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "dropped": self.dropped,
+            }
+
+
+def format_event(message):
+    event_id, event, data = message
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
@@ -0,0 +1,36 @@
+import math
+
+# Small geodesy helpers for the map endpoints (spherical earth, good to ~0.5%).
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bbox_around(lat, lng, radius_km):
+    """(min_lat, min_lng, max_lat, max_lng) enclosing the circle of `radius_km`."""
+    d_lat = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    d_lng = min(radius_km / (KM_PER_DEGREE_LAT * cos_lat), 180.0)
+    return (max(lat - d_lat, -90.0), max(lng - d_lng, -180.0),
+            min(lat + d_lat, 90.0), min(lng + d_lng, 180.0))
+
+
+def parse_bbox(value):
+    """"west,south,east,north" (lng/lat order, as map libraries emit) ->
+    (min_lat, min_lng, max_lat, max_lng); raises ValueError when malformed."""
+    parts = [float(p) for p in value.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox needs four numbers: west,south,east,north")
+    west, south, east, north = parts
+    if not (-180 <= west <= 180 and -180 <= east <= 180 and -90 <= south <= north <= 90) or west > east:
+        raise ValueError("bbox is out of range or inverted")
+    return south, west, north, east
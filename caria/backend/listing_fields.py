@@ -0,0 +1,153 @@
+import json
+import re
+from decimal import Decimal
+
+# Helpers that turn the free-text listing fields into typed values.
+# Used on write in server.add_property and by the backfill migrations.
+
+CURRENCY_SYMBOLS = {
+    "£": "GBP",
+    "€": "EUR",
+    "$": "USD",
+    "₺": "TRY",
+}
+CURRENCY_CODES = {"GBP", "EUR", "USD", "TRY", "TL"}
+
+# Digits grouped by ".", "," or spaces, then an optional k or M right after
+# them (but not the m of "m²" or "m2")
+_NUMBER_RE = re.compile(r"\d(?:[\d.,]|\s(?=\d))*([kKmM](?![\w²]))?")
+_SUFFIXES = {"k": 1000, "m": 1000000}
+
+
+def parse_number(value):
+    """The first number in free text, as a Decimal; None when there is none.
+
+    Reads both separator styles: "1,250.5" and "1.250,5" are 1250.5. When only
+    one separator appears it groups thousands if it repeats or is followed by
+    exactly three digits ("1.250" -> 1250), and is a decimal point otherwise
+    ("1.5", "85,5"). A k or M suffix multiplies ("£1.5M" -> 1500000)."""
+    match = _NUMBER_RE.search(str(value))
+    if not match:
+        return None
+    number = re.sub(r"\s", "", match.group()).rstrip("kKmM").rstrip(".,")
+    suffix = match.group(1)
+
+    separators = [c for c in number if c in ".,"]
+    if len(set(separators)) == 2:
+        decimal_point = number[max(number.rfind("."), number.rfind(","))]
+    elif len(separators) == 1 and (suffix or len(number) - number.find(separators[0]) - 1 != 3):
+        decimal_point = separators[0]
+    else:
+        decimal_point = None
+    whole, _, fraction = number.rpartition(decimal_point) if decimal_point else (number, "", "")
+    amount = Decimal(re.sub(r"\D", "", whole) + "." + (fraction or "0"))
+    if suffix:
+        amount *= _SUFFIXES[suffix.lower()]
+    return amount
+
+
+def parse_price(value):
+    """Parses a display price such as "£850,000", "250.000 EUR" or "£1.5M".
+
+    Returns (amount, currency) where amount is a whole number of currency units,
+    or (None, None) when the text carries no number (e.g. "Contact for price").
+    """
+    if value is None:
+        return None, None
+    if isinstance(value, (int, float)):
+        return int(value), None
+    text = str(value).strip()
+    amount = parse_number(text)
+    if amount is None:
+        return None, None
+
+    currency = None
+    for symbol, code in CURRENCY_SYMBOLS.items():
+        if symbol in text:
+            currency = code
+            break
+    if not currency:
+        for word in re.findall(r"[A-Za-z]{2,3}", text):
+            if word.upper() in CURRENCY_CODES:
+                currency = "TRY" if word.upper() == "TL" else word.upper()
+                break
+    return int(amount), currency
+
+
+_ROOMS_RE = re.compile(r"^\s*(\d+)\s*(?:\+\s*\d+\s*)?$")
+
+
+def parse_room_count(value):
+    """"3+1" -> 3, "4" -> 4; None when the value is empty or not a room count."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, int):
+        return value
+    match = _ROOMS_RE.match(str(value))
+    return int(match.group(1)) if match else None
+
+
+def parse_area(value):
+    """"320", "320 m²", "1,250.5" or "1.250" -> float square metres; None when absent."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    amount = parse_number(value)
+    return float(amount) if amount is not None else None
+
+
+def normalize_listing_numbers(data):
+    """Derives the typed columns (beds, baths, area, closed_area_m2, plot_area_m2)
+    from the admin's free-text fields. Runs once per write so reads can project
+    the columns as stored."""
+    beds = parse_room_count(data.get('beds_room_count'))
+    if beds is not None:
+        data['beds'] = beds
+    baths = parse_room_count(data.get('baths_count'))
+    if baths is not None:
+        data['baths'] = baths
+    if data.get('closed_area'):
+        data['area'] = data['closed_area']
+    data['closed_area_m2'] = parse_area(data.get('closed_area') or data.get('area'))
+    data['plot_area_m2'] = parse_area(data.get('plot_area') or data.get('plotSize'))
+    return data
+
+
+def parse_feature_list(value):
+    """ozellikler_* hold a JSON array of feature titles (or ids); returns it as a list."""
+    if value is None or value == "":
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    try:
+        parsed = json.loads(value)
+    except (TypeError, ValueError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def feature_lookup(features):
+    """Maps feature ids and (case-folded) TR/EN titles to feature ids."""
+    lookup = {}
+    for feature in features:
+        lookup[feature['id']] = feature['id']
+        lookup[str(feature['id'])] = feature['id']
+        for key in ('title_tr', 'title_en'):
+            if feature.get(key):
+                lookup[feature[key].strip().casefold()] = feature['id']
+    return lookup
+
+
+FEATURE_COLUMNS = ('ozellikler_ic', 'ozellikler_dis', 'ozellikler_konum')
+
+
+def listing_feature_ids(data, lookup):
+    """Feature ids selected in a listing's ozellikler_ic / _dis / _konum columns."""
+    ids = set()
+    for column in FEATURE_COLUMNS:
+        for value in parse_feature_list(data.get(column)):
+            key = value.strip().casefold() if isinstance(value, str) else value
+            if key in lookup:
+                ids.add(lookup[key])
+    return sorted(ids)
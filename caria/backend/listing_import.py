@@ -0,0 +1,116 @@
+import codecs
+import json
+
+# Incremental record parsing for the bulk listing import.
+# Accepts NDJSON (one object per line) or a single JSON array of objects and
+# yields records as soon as they are complete, so large exports are never held
+# in memory as a whole.
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+# A record cut off by a chunk boundary fails to decode either inside an
+# unterminated string or at most this far from the end of the buffer (the
+# longest partial token is "-Infinit"); any other error is in the data itself
+_PARTIAL_TOKEN = len("-Infinity")
+
+
+def _skip(buf, pos):
+    while pos < len(buf) and buf[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+async def _text(chunks):
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def iter_records(chunks):
+    """Yields (row number, record) pairs from an async iterator of byte chunks.
+
+    A row that cannot be decoded yields a str error instead of a dict. NDJSON
+    carries on after a bad line; a malformed JSON array stops at the first
+    syntax error, without reading further, because the rest of the stream
+    cannot be realigned."""
+    buf = ""
+    pos = 0
+    mode = None
+    row = 0
+    expect = "value"
+    async for text in _text(chunks):
+        buf = buf[pos:] + text
+        pos = 0
+        if mode is None:
+            pos = _skip(buf, pos)
+            if pos == len(buf):
+                continue
+            mode = "array" if buf[pos] == "[" else "ndjson"
+            if mode == "array":
+                pos += 1
+
+        if mode == "ndjson":
+            while True:
+                end = buf.find("\n", pos)
+                if end < 0:
+                    break
+                line = buf[pos:end].strip()
+                pos = end + 1
+                if line:
+                    row += 1
+                    yield row, _load_line(line)
+            continue
+
+        while expect != "done":
+            pos = _skip(buf, pos)
+            if pos == len(buf):
+                break
+            if expect == "separator":
+                if buf[pos] not in ",]":
+                    yield row + 1, f"Expected ',' or ']' after record {row}"
+                    return
+                expect = "value" if buf[pos] == "," else "done"
+                pos += 1
+                continue
+            if buf[pos] == "]" and row == 0:
+                expect = "done"
+                pos += 1
+                continue
+            try:
+                record, pos = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if e.msg.startswith("Unterminated string") or len(buf) - e.pos <= _PARTIAL_TOKEN:
+                    break  # incomplete; wait for the next chunk
+                yield row + 1, f"Invalid JSON: {e.msg}"
+                return
+            row += 1
+            yield row, record if isinstance(record, dict) else "Record must be a JSON object"
+            expect = "separator"
+
+    if mode == "ndjson":
+        line = buf[pos:].strip()
+        if line:
+            yield row + 1, _load_line(line)
+    elif mode == "array" and expect != "done":
+        rest = buf[pos:].strip()
+        if rest:
+            try:
+                _decoder.raw_decode(rest)
+                yield row + 1, "Unterminated JSON array"
+            except json.JSONDecodeError as e:
+                yield row + 1, f"Invalid JSON: {e.msg}"
+        else:
+            yield row + 1, "Unterminated JSON array"
+
+
+def _load_line(line):
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        return f"Invalid JSON: {e.msg}"
+    return record if isinstance(record, dict) else "Record must be a JSON object"
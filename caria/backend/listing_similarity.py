@@ -0,0 +1,267 @@
+import threading
+
+import numpy as np
+
+import change_feed
+from listing_fields import FEATURE_COLUMNS
+
+# "Similar properties" index.
+# Every listing becomes a vector of standardised numeric fields (log price,
+# beds, baths, log areas), region and property-type one-hots and feature bits
+# from listing_features. Rows are unit length, so a dot product is the cosine
+# similarity. The top SIMILAR_K neighbours of each listing are stored in
+# listing_similar (see migrate_listing_similar.py) and kept current by refresh().
+
+SIMILAR_K = 12
+CHUNK_ROWS = 512
+# Ids bound per IN (...) list; older SQLite builds allow 999 variables per statement
+MAX_VARIABLES = 500
+
+NUMERIC_WEIGHTS = {
+    'price_amount': 2.0,
+    'beds': 1.0,
+    'baths': 0.5,
+    'closed_area_m2': 1.0,
+    'plot_area_m2': 0.5,
+}
+LOG_SCALED = {'price_amount', 'closed_area_m2', 'plot_area_m2'}
+# Columns whose change moves a listing's vector
+VECTOR_COLUMNS = set(NUMERIC_WEIGHTS) | {'region', 'property_type', *FEATURE_COLUMNS}
+REGION_WEIGHT = 1.5
+TYPE_WEIGHT = 1.5
+FEATURE_WEIGHT = 1.0
+
+
+def _one_hot(values, weight):
+    keys = sorted({v for v in values if v})
+    index = {k: i for i, k in enumerate(keys)}
+    block = np.zeros((len(values), len(keys)))
+    for row, value in enumerate(values):
+        if value:
+            block[row, index[value]] = weight
+    return block
+
+
+def _batches(values, size=MAX_VARIABLES):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _read_rows(db, listing_ids=None):
+    """(id, numeric fields..., region, property_type) rows, of every listing or of `listing_ids`."""
+    sql = f"SELECT id, {', '.join(NUMERIC_WEIGHTS)}, region, property_type FROM listings"
+    if listing_ids is None:
+        return db.execute(sql).fetchall()
+    rows = []
+    for batch in _batches(listing_ids):
+        rows += db.execute(f"{sql} WHERE id IN ({', '.join('?' for _ in batch)})", batch).fetchall()
+    return rows
+
+
+def _read_features(db, listing_ids=None):
+    """(listing_id, feature_id) pairs, of every listing or of `listing_ids`."""
+    sql = "SELECT listing_id, feature_id FROM listing_features"
+    if listing_ids is None:
+        return db.execute(sql).fetchall()
+    pairs = []
+    for batch in _batches(listing_ids):
+        pairs += db.execute(f"{sql} WHERE listing_id IN ({', '.join('?' for _ in batch)})", batch).fetchall()
+    return pairs
+
+
+def build_vectors(rows, pairs):
+    """Returns (listing ids, unit-length feature matrix), ordered by id, from
+    _read_rows() rows and _read_features() pairs."""
+    rows = sorted(rows, key=lambda r: r[0])
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    if not len(ids):
+        return ids, np.zeros((0, 0))
+
+    numeric = np.array([[np.nan if v is None else v for v in r[1:1 + len(NUMERIC_WEIGHTS)]] for r in rows], dtype=float)
+    for j, name in enumerate(NUMERIC_WEIGHTS):
+        if name in LOG_SCALED:
+            numeric[:, j] = np.log1p(np.clip(numeric[:, j], 0, None))
+    # Missing values sit at the column mean, i.e. contribute nothing after standardising
+    present = ~np.isnan(numeric)
+    mean = np.nansum(numeric, axis=0) / np.maximum(present.sum(axis=0), 1)
+    numeric = np.where(present, numeric, mean)
+    std = numeric.std(axis=0)
+    std[std == 0] = 1
+    numeric = (numeric - numeric.mean(axis=0)) / std * np.array(list(NUMERIC_WEIGHTS.values()))
+
+    regions = _one_hot([(r[-2] or '').strip().casefold() for r in rows], REGION_WEIGHT)
+    types = _one_hot([(r[-1] or '').strip().casefold() for r in rows], TYPE_WEIGHT)
+
+    position = {int(i): n for n, i in enumerate(ids)}
+    feature_ids = sorted({f for _, f in pairs})
+    feature_index = {f: n for n, f in enumerate(feature_ids)}
+    features = np.zeros((len(ids), len(feature_ids)))
+    for listing_id, feature_id in pairs:
+        if listing_id in position:
+            features[position[listing_id], feature_index[feature_id]] = 1
+    # Scale each listing's bits so long feature lists do not dominate the vector
+    counts = features.sum(axis=1, keepdims=True)
+    features = np.divide(features, np.sqrt(counts), out=features, where=counts > 0) * FEATURE_WEIGHT
+
+    vectors = np.hstack([numeric, regions, types, features])
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return ids, vectors / norms
+
+
+def load_vectors(db):
+    """Returns (listing ids, unit-length feature matrix), ordered by id."""
+    return build_vectors(_read_rows(db), _read_features(db))
+
+
+class ListingVectors:
+    """The vector inputs of every listing, kept between refresh() calls.
+
+    sync() re-reads only the listings change_log (see change_feed.py) recorded
+    since the previous sync, and the whole table when that history is gone.
+    Scaling depends on every listing, so the matrix itself is rebuilt from the
+    kept rows, in numpy, whenever one of them changed."""
+
+    def __init__(self):
+        self.token = None
+        self.rows = {}
+        self.features = {}
+        self.matrix = None
+        self.loads = 0
+        # Refreshes compute on pooled connections, several at a time
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Forgets everything; the next sync() reads the whole table."""
+        self.token = None
+
+    def sync(self, db):
+        """Returns (listing ids, unit-length feature matrix), ordered by id."""
+        with self._lock:
+            return self._sync(db)
+
+    def _sync(self, db):
+        latest = change_feed.current_token(db)
+        if self.token is not None and latest == self.token:
+            return self.matrix
+
+        oldest = db.execute("SELECT MIN(seq) FROM change_log").fetchone()[0]
+        # A token ahead of the log means a rolled-back group commit; one below it, pruned history
+        if self.token is None or self.token > latest or (oldest is not None and oldest > self.token + 1):
+            self.rows = {r[0]: tuple(r) for r in _read_rows(db)}
+            self.features = {}
+            for listing_id, feature_id in _read_features(db):
+                self.features.setdefault(listing_id, []).append(feature_id)
+            self.loads += 1
+        else:
+            changed = [r[0] for r in db.execute(
+                "SELECT DISTINCT row_id FROM change_log WHERE table_name = 'listings' AND seq > ? AND seq <= ?",
+                (self.token, latest),
+            )]
+            for listing_id in changed:
+                self.rows.pop(listing_id, None)
+                self.features.pop(listing_id, None)
+            self.rows.update((r[0], tuple(r)) for r in _read_rows(db, changed))
+            for listing_id, feature_id in _read_features(db, changed):
+                self.features.setdefault(listing_id, []).append(feature_id)
+
+        pairs = [(listing_id, f) for listing_id, ids in self.features.items() for f in ids]
+        self.matrix = build_vectors(self.rows.values(), pairs)
+        self.token = latest
+        return self.matrix
+
+
+def top_k(ids, vectors, rows, k=SIMILAR_K):
+    """Yields (listing_id, [(similar_id, score), ...]) for the row positions in `rows`."""
+    k = min(k, len(ids) - 1)
+    rows = np.asarray(rows, dtype=np.int64)
+    for start in range(0, len(rows), CHUNK_ROWS):
+        chunk = rows[start:start + CHUNK_ROWS]
+        sims = vectors[chunk] @ vectors.T
+        sims[np.arange(len(chunk)), chunk] = -np.inf
+        if k <= 0:
+            for row in chunk:
+                yield int(ids[row]), []
+            continue
+        best = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        for n, row in enumerate(chunk):
+            order = best[n][np.argsort(-sims[n, best[n]], kind='stable')]
+            yield int(ids[row]), [(int(ids[j]), round(float(sims[n, j]), 6)) for j in order]
+
+
+def store(db, neighbours):
+    """Replaces the stored lists of the listings in `neighbours`, as yielded by top_k()."""
+    listing_ids = []
+    values = []
+    for listing_id, similar in neighbours:
+        listing_ids.append((listing_id,))
+        values += [(listing_id, rank, similar_id, score) for rank, (similar_id, score) in enumerate(similar)]
+    db.executemany("DELETE FROM listing_similar WHERE listing_id = ?", listing_ids)
+    db.executemany(
+        "INSERT INTO listing_similar (listing_id, rank, similar_id, score) VALUES (?, ?, ?, ?)", values
+    )
+    return len(listing_ids)
+
+
+def rebuild(db, k=SIMILAR_K):
+    """Recomputes every listing's neighbours. The caller commits."""
+    ids, vectors = load_vectors(db)
+    db.execute("DELETE FROM listing_similar")
+    return store(db, top_k(ids, vectors, range(len(ids)), k))
+
+
+def refreshed_neighbours(db, listing_ids, vectors=None, k=SIMILAR_K):
+    """The (listing_id, [(similar_id, score), ...]) lists to store after
+    `listing_ids` were added, changed or deleted. Only reads, so it can run on
+    a pooled connection and leave the writer just the store().
+
+    Recomputed rows are the changed listings themselves, listings whose stored
+    list mentions one of them, listings a changed listing now outscores the
+    k-th neighbour of, and listings left short (the delete trigger drops
+    references to removed rows). Scaling is recomputed on every call, so
+    untouched lists can drift slightly from a full rebuild(). `vectors` is a
+    ListingVectors kept by the caller; without one every listing is read."""
+    ids, vectors = vectors.sync(db) if vectors is not None else load_vectors(db)
+    if not len(ids):
+        return []
+    position = {int(i): n for n, i in enumerate(ids)}
+    changed = [position[i] for i in listing_ids if i in position]
+    dirty = set(changed)
+
+    for batch in _batches(listing_ids):
+        for (listing_id,) in db.execute(
+            f"SELECT DISTINCT listing_id FROM listing_similar WHERE similar_id IN ({', '.join('?' for _ in batch)})",
+            batch,
+        ):
+            if listing_id in position:
+                dirty.add(position[listing_id])
+
+    wanted = min(k, len(ids) - 1)
+    kth = np.full(len(ids), -np.inf)
+    stored = np.zeros(len(ids), dtype=np.int64)
+    for listing_id, low, count in db.execute(
+        "SELECT listing_id, MIN(score), COUNT(*) FROM listing_similar GROUP BY listing_id"
+    ):
+        if listing_id in position:
+            kth[position[listing_id]] = low
+            stored[position[listing_id]] = count
+    dirty.update(np.flatnonzero(stored < wanted).tolist())
+    for row in changed:
+        sims = vectors @ vectors[row]
+        sims[row] = -np.inf
+        dirty.update(np.flatnonzero(sims > kth).tolist())
+
+    return list(top_k(ids, vectors, sorted(dirty), k))
+
+
+def refresh(db, listing_ids, vectors=None, k=SIMILAR_K):
+    """refreshed_neighbours() and store() in one go. The caller commits."""
+    return store(db, refreshed_neighbours(db, listing_ids, vectors, k))
+
+
+def listings_changed_since(db, token):
+    """Whether a listings write committed after change_log `token`."""
+    return db.execute(
+        "SELECT 1 FROM change_log WHERE seq > ? AND table_name = 'listings' LIMIT 1", (token,)
+    ).fetchone() is not None
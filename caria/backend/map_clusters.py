@@ -0,0 +1,116 @@
+import math
+import threading
+
+# Grid clustering for the listings map.
+# Each zoom level gets a grid of CELLS_PER_TILE x CELLS_PER_TILE cells per map
+# tile (~64px at 256px tiles); listings in the same cell form one cluster.
+# Grids are computed once per zoom and kept until a listing's coordinates or
+# price actually change. Each grid maps (row, col) to its cluster, so a
+# viewport only looks at the cells it covers.
+
+CELLS_PER_TILE = 4
+MAX_ZOOM = 20
+
+
+def cell_size(zoom):
+    """Cell edge in degrees at `zoom`."""
+    return 360.0 / (2 ** zoom * CELLS_PER_TILE)
+
+
+class ClusterIndex:
+    def __init__(self, load_points, version_fn):
+        """`load_points(db)` returns (id, slug, lat, lng, price_amount, price_currency)
+        tuples in a stable order;
+        `version_fn()` returns a version that moves whenever a write may have
+        changed one of those columns."""
+        self.load_points = load_points
+        self.version_fn = version_fn
+        self.version = None
+        self.points = ()
+        self.grids = {}
+        self.loads = 0
+        self.builds = 0
+        self._lock = threading.Lock()
+
+    def refresh(self, db):
+        version = self.version_fn()
+        if self.version == version:
+            return
+        with self._lock:
+            if self.version == version:
+                return
+            points = tuple(self.load_points(db))
+            self.loads += 1
+            # Edits that leave every point and price alone keep the cached grids
+            if points != self.points:
+                self.points = points
+                self.grids = {}
+            self.version = version
+
+    def grid(self, db, zoom):
+        self.refresh(db)
+        grid = self.grids.get(zoom)
+        if grid is None:
+            with self._lock:
+                grid = self.grids.get(zoom)
+                if grid is None:
+                    grid = self._build(zoom)
+                    self.grids[zoom] = grid
+                    self.builds += 1
+        return grid
+
+    def clusters(self, db, zoom, box):
+        """Clusters at `zoom` whose centre lies in box = (min_lat, min_lng, max_lat, max_lng),
+        in (row, col) order."""
+        min_lat, min_lng, max_lat, max_lng = box
+        grid = self.grid(db, zoom)
+        # A centre lies in its own cell, so only the cells the box covers can match
+        size = cell_size(zoom)
+        rows = range(math.floor(min_lat / size), math.floor(max_lat / size) + 1)
+        cols = range(math.floor(min_lng / size), math.floor(max_lng / size) + 1)
+        if len(rows) * len(cols) < len(grid):
+            candidates = (grid[key] for key in ((r, c) for r in rows for c in cols) if key in grid)
+        else:
+            candidates = grid.values()
+        return [
+            c for c in candidates
+            if min_lat <= c['lat'] <= max_lat and min_lng <= c['lng'] <= max_lng
+        ]
+
+    def _build(self, zoom):
+        size = cell_size(zoom)
+        cells = {}
+        for listing_id, slug, lat, lng, price, currency in self.points:
+            key = (math.floor(lat / size), math.floor(lng / size))
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = {
+                    'count': 0, 'lat_sum': 0.0, 'lng_sum': 0.0,
+                    'prices': [], 'currencies': set(), 'first': (listing_id, slug),
+                }
+            cell['count'] += 1
+            cell['lat_sum'] += lat
+            cell['lng_sum'] += lng
+            if price is not None:
+                cell['prices'].append(price)
+                cell['currencies'].add(currency)
+
+        grid = {}
+        for row, col in sorted(cells):
+            cell = cells[row, col]
+            # Amounts in different currencies don't compare: mixed cells get no price range
+            single_currency = len(cell['currencies']) == 1
+            cluster = {
+                'key': f"{zoom}/{row}/{col}",
+                'count': cell['count'],
+                'lat': cell['lat_sum'] / cell['count'],
+                'lng': cell['lng_sum'] / cell['count'],
+                'price_min': min(cell['prices']) if single_currency else None,
+                'price_max': max(cell['prices']) if single_currency else None,
+                'currency': next(iter(cell['currencies'])) if single_currency else None,
+                'bounds': [col * size, row * size, (col + 1) * size, (row + 1) * size],
+            }
+            if cell['count'] == 1:
+                cluster['id'], cluster['slug'] = cell['first']
+            grid[row, col] = cluster
+        return grid
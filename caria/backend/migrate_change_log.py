@@ -0,0 +1,50 @@
+# Schema step: change_log and its per-table triggers (registered in schema.py).
+
+from change_feed import CHANGE_TABLES
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    for table in CHANGE_TABLES:
+        cursor.execute(f"PRAGMA table_info({table})")
+        columns = [r[1] for r in cursor.fetchall()]
+        if 'updated_at' not in columns:
+            print(f"Adding updated_at to {table}...")
+            # ALTER TABLE cannot add a CURRENT_TIMESTAMP default; the insert trigger fills it instead
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN updated_at TIMESTAMP")
+            backfill = "COALESCE(created_at, CURRENT_TIMESTAMP)" if 'created_at' in columns else "CURRENT_TIMESTAMP"
+            cursor.execute(f"UPDATE {table} SET updated_at = {backfill}")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND name=?", (f"{table}_changes_ai",))
+        if cursor.fetchone():
+            continue
+        print(f"Creating change triggers on {table}...")
+        # The nested UPDATE does not re-fire the trigger running it (recursive_triggers is off),
+        # and the WHEN clause keeps the insert trigger's own UPDATE out of the update trigger
+        cursor.execute(f"""
+            CREATE TRIGGER {table}_changes_ai AFTER INSERT ON {table} BEGIN
+                UPDATE {table} SET updated_at = CURRENT_TIMESTAMP WHERE id = new.id AND new.updated_at IS NULL;
+                INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', new.id, 'upsert');
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER {table}_changes_au AFTER UPDATE ON {table} WHEN old.updated_at IS NOT NULL BEGIN
+                UPDATE {table} SET updated_at = CURRENT_TIMESTAMP WHERE id = new.id AND new.updated_at IS old.updated_at;
+                INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', new.id, 'upsert');
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER {table}_changes_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', old.id, 'delete');
+            END
+        """)
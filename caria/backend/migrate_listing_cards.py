@@ -0,0 +1,156 @@
+# Schema step: listing_cards, the narrow card-shaped copy of listings (registered in schema.py).
+
+# Listing columns copied onto each card; advisor_name / _slug / _portrait are added from card_advisors
+CARD_LISTING_COLUMNS = [
+    'id', 'slug', 'title', 'title_en', 'location', 'region', 'property_type', 'status', 'tag',
+    'price', 'price_amount', 'price_currency', 'beds', 'baths', 'area', 'closed_area_m2',
+    'beds_room_count', 'baths_count', 'closed_area', 'image', 'featured_image',
+    'is_featured', 'is_featured_slider', 'advisor_id',
+]
+CARD_ADVISOR_COLUMNS = ['advisor_name', 'advisor_slug', 'advisor_portrait']
+
+CARD_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_listing_cards_status ON listing_cards(status)",
+    "CREATE INDEX IF NOT EXISTS idx_listing_cards_region ON listing_cards(region COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_listing_cards_featured ON listing_cards(is_featured)",
+    "CREATE INDEX IF NOT EXISTS idx_listing_cards_slider ON listing_cards(is_featured_slider)",
+    "CREATE INDEX IF NOT EXISTS idx_listing_cards_advisor ON listing_cards(advisor_id)",
+    "CREATE INDEX IF NOT EXISTS idx_listing_cards_price ON listing_cards(price_amount)",
+]
+
+# Trigger bodies use ON CONFLICT upserts: an INSERT OR REPLACE inside a trigger
+# would take the outer statement's conflict policy (e.g. the bulk import's upsert)
+def card_select(where="WHERE true"):
+    listing = ", ".join(f"l.{c}" for c in CARD_LISTING_COLUMNS)
+    updates = ", ".join(f"{c}=excluded.{c}" for c in CARD_LISTING_COLUMNS + CARD_ADVISOR_COLUMNS if c != 'id')
+    return f"""
+        INSERT INTO listing_cards ({", ".join(CARD_LISTING_COLUMNS + CARD_ADVISOR_COLUMNS)})
+        SELECT {listing}, a.name, a.slug, a.portrait
+        FROM listings l LEFT JOIN card_advisors a ON a.id = l.advisor_id
+        {where}
+        ON CONFLICT(id) DO UPDATE SET {updates}
+    """
+
+def refresh_advisor_sql(advisor_id):
+    return f"""
+        UPDATE listing_cards SET (advisor_name, advisor_slug, advisor_portrait) =
+            (SELECT name, slug, portrait FROM card_advisors WHERE id = {advisor_id})
+        WHERE advisor_id = {advisor_id};
+    """
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='listing_cards'")
+    if cursor.fetchone():
+        print("listing_cards already exists.")
+    else:
+        print("Creating listing_cards...")
+        cursor.execute("""
+            CREATE TABLE card_advisors (
+                id INTEGER PRIMARY KEY,
+                name TEXT,
+                slug TEXT,
+                portrait TEXT,
+                is_static INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        cursor.execute(f"""
+            CREATE TABLE listing_cards (
+                id INTEGER PRIMARY KEY,
+                {", ".join(c for c in CARD_LISTING_COLUMNS + CARD_ADVISOR_COLUMNS if c != 'id')}
+            )
+        """)
+        for statement in CARD_INDEXES:
+            cursor.execute(statement)
+
+        watched = ", ".join(c for c in CARD_LISTING_COLUMNS if c != 'id')
+        cursor.execute(f"CREATE TRIGGER listing_cards_ai AFTER INSERT ON listings BEGIN {card_select('WHERE l.id = new.id')}; END")
+        cursor.execute(f"CREATE TRIGGER listing_cards_au AFTER UPDATE OF {watched} ON listings BEGIN {card_select('WHERE l.id = new.id')}; END")
+        cursor.execute("CREATE TRIGGER listing_cards_ad AFTER DELETE ON listings BEGIN DELETE FROM listing_cards WHERE id = old.id; END")
+
+        upsert_advisor = """
+            INSERT INTO card_advisors (id, name, slug, portrait, is_static)
+            SELECT new.id, new.fullName, new.slug, new.portraitUrl, 0
+            WHERE NOT EXISTS (SELECT 1 FROM card_advisors WHERE id = new.id AND is_static = 1)
+            ON CONFLICT(id) DO UPDATE SET name=excluded.name, slug=excluded.slug, portrait=excluded.portrait;
+        """
+        cursor.execute(f"CREATE TRIGGER card_advisors_ai AFTER INSERT ON advisors BEGIN {upsert_advisor} {refresh_advisor_sql('new.id')} END")
+        cursor.execute(f"""
+            CREATE TRIGGER card_advisors_au AFTER UPDATE OF fullName, slug, portraitUrl ON advisors BEGIN
+                {upsert_advisor} {refresh_advisor_sql('new.id')}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER card_advisors_ad AFTER DELETE ON advisors BEGIN
+                DELETE FROM card_advisors WHERE id = old.id AND is_static = 0;
+                {refresh_advisor_sql('old.id')}
+            END
+        """)
+        cursor.execute("""
+            INSERT INTO card_advisors (id, name, slug, portrait)
+            SELECT id, fullName, slug, portraitUrl FROM advisors
+        """)
+
+        cursor.execute(card_select())
+        print(f"Backfilled {cursor.rowcount} listing cards.")
+
+def prefer_database_advisors(conn):
+    """Schema step: advisors rows win over STATIC_ADVISORS with the same id. The
+    static cards move to card_static_advisors, the fallback restored when the
+    advisors row is deleted; card_advisors.is_static marks a card taken from it."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS card_static_advisors (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            slug TEXT,
+            portrait TEXT
+        )
+    """)
+    for trigger in ("card_advisors_ai", "card_advisors_au", "card_advisors_ad"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    upsert_advisor = """
+        INSERT INTO card_advisors (id, name, slug, portrait, is_static)
+        VALUES (new.id, new.fullName, new.slug, new.portraitUrl, 0)
+        ON CONFLICT(id) DO UPDATE SET name=excluded.name, slug=excluded.slug, portrait=excluded.portrait, is_static=0;
+    """
+    cursor.execute(f"CREATE TRIGGER card_advisors_ai AFTER INSERT ON advisors BEGIN {upsert_advisor} {refresh_advisor_sql('new.id')} END")
+    cursor.execute(f"""
+        CREATE TRIGGER card_advisors_au AFTER UPDATE OF fullName, slug, portraitUrl ON advisors BEGIN
+            {upsert_advisor} {refresh_advisor_sql('new.id')}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER card_advisors_ad AFTER DELETE ON advisors BEGIN
+            DELETE FROM card_advisors WHERE id = old.id;
+            INSERT INTO card_advisors (id, name, slug, portrait, is_static)
+            SELECT id, name, slug, portrait, 1 FROM card_static_advisors WHERE id = old.id;
+            {refresh_advisor_sql('old.id')}
+        END
+    """)
+
+def sync_static_advisors(conn, static_advisors):
+    """`static_advisors` is server.STATIC_ADVISORS, the fallback for ids with no
+    advisors row. They live in code, so schema.migrate() re-syncs them on every start."""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM card_static_advisors")
+    cursor.executemany(
+        "INSERT INTO card_static_advisors (id, name, slug, portrait) VALUES (?, ?, ?, ?)",
+        [(a['id'], a.get('fullName') or a.get('name'), a.get('slug'), a.get('portraitUrl')) for a in static_advisors],
+    )
+    cursor.execute("DELETE FROM card_advisors WHERE is_static = 1")
+    cursor.execute("""
+        INSERT OR REPLACE INTO card_advisors (id, name, slug, portrait, is_static)
+        SELECT id, fullName, slug, portraitUrl, 0 FROM advisors
+    """)
+    cursor.execute("""
+        INSERT INTO card_advisors (id, name, slug, portrait, is_static)
+        SELECT id, name, slug, portrait, 1 FROM card_static_advisors
+        WHERE id NOT IN (SELECT id FROM advisors)
+    """)
+    cursor.execute("""
+        UPDATE listing_cards SET (advisor_name, advisor_slug, advisor_portrait) =
+            (SELECT name, slug, portrait FROM card_advisors WHERE card_advisors.id = listing_cards.advisor_id)
+    """)
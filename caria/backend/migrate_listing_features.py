@@ -0,0 +1,35 @@
+# Schema step: listing_features, the normalised ozellikler_* selections (registered in schema.py).
+
+from listing_fields import feature_lookup, listing_feature_ids
+
+def upgrade(conn, features):
+    """`features` is the feature catalogue (server.STATIC_FEATURES)."""
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='listing_features'")
+    if cursor.fetchone():
+        print("listing_features already exists.")
+    else:
+        print("Creating listing_features...")
+        # (feature_id, listing_id) answers "listings with feature X"; the second index serves per-listing rewrites
+        cursor.execute("""
+            CREATE TABLE listing_features (
+                listing_id INTEGER NOT NULL,
+                feature_id INTEGER NOT NULL,
+                PRIMARY KEY (feature_id, listing_id)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("CREATE INDEX idx_listing_features_listing ON listing_features(listing_id, feature_id)")
+        cursor.execute("""
+            CREATE TRIGGER listing_features_ad AFTER DELETE ON listings BEGIN
+                DELETE FROM listing_features WHERE listing_id = old.id;
+            END
+        """)
+
+        lookup = feature_lookup(features)
+        cursor.execute("SELECT id, ozellikler_ic, ozellikler_dis, ozellikler_konum FROM listings")
+        pairs = []
+        for row in cursor.fetchall():
+            pairs += [(row['id'], feature_id) for feature_id in listing_feature_ids(dict(row), lookup)]
+        cursor.executemany("INSERT INTO listing_features (listing_id, feature_id) VALUES (?, ?)", pairs)
+        print(f"Backfilled {len(pairs)} listing features.")
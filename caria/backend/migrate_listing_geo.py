@@ -0,0 +1,43 @@
+# Schema step: R*Tree index over listing coordinates (registered in schema.py).
+
+# listings.latitude / longitude are text; a row is indexed only when both parse to
+# a real, non-zero coordinate (CAST turns junk into 0.0).
+def _valid(prefix):
+    return (
+        f"NULLIF(TRIM({prefix}.latitude), '') IS NOT NULL AND NULLIF(TRIM({prefix}.longitude), '') IS NOT NULL"
+        f" AND CAST({prefix}.latitude AS REAL) BETWEEN -90 AND 90 AND CAST({prefix}.latitude AS REAL) <> 0"
+        f" AND CAST({prefix}.longitude AS REAL) BETWEEN -180 AND 180 AND CAST({prefix}.longitude AS REAL) <> 0"
+    )
+
+def _point(prefix):
+    lat = f"CAST({prefix}.latitude AS REAL)"
+    lng = f"CAST({prefix}.longitude AS REAL)"
+    return f"{prefix}.id, {lat}, {lat}, {lng}, {lng}"
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='listings_geo'")
+    if cursor.fetchone():
+        print("listings_geo already exists.")
+    else:
+        print("Creating listings_geo (R*Tree)...")
+        cursor.execute("CREATE VIRTUAL TABLE listings_geo USING rtree(id, min_lat, max_lat, min_lng, max_lng)")
+        cursor.execute(f"""
+            CREATE TRIGGER listings_geo_ai AFTER INSERT ON listings WHEN {_valid('new')} BEGIN
+                INSERT INTO listings_geo VALUES ({_point('new')});
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER listings_geo_ad AFTER DELETE ON listings BEGIN
+                DELETE FROM listings_geo WHERE id = old.id;
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER listings_geo_au AFTER UPDATE OF latitude, longitude ON listings BEGIN
+                DELETE FROM listings_geo WHERE id = old.id;
+                INSERT INTO listings_geo SELECT {_point('new')} WHERE {_valid('new')};
+            END
+        """)
+        cursor.execute(f"INSERT INTO listings_geo SELECT {_point('l')} FROM listings l WHERE {_valid('l')}")
+        print(f"Indexed {cursor.rowcount} listings with coordinates.")
@@ -0,0 +1,44 @@
+# Schema step: FTS5 index over listings (registered in schema.py).
+
+# Columns of listings indexed for full-text search, in bm25 weight order (see server.py)
+FTS_COLUMNS = ['title', 'title_en', 'description', 'description_en', 'location', 'neighborhood', 'city', 'reference']
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='listings_fts'")
+    if cursor.fetchone():
+        print("listings_fts already exists.")
+    else:
+        cols = ", ".join(FTS_COLUMNS)
+        new_cols = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+        old_cols = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+        print("Creating listings_fts (FTS5, external content)...")
+        # External content table: the text lives in listings only, the FTS table holds the index
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE listings_fts USING fts5(
+                {cols},
+                content='listings', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER listings_fts_ai AFTER INSERT ON listings BEGIN
+                INSERT INTO listings_fts(rowid, {cols}) VALUES (new.id, {new_cols});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER listings_fts_ad AFTER DELETE ON listings BEGIN
+                INSERT INTO listings_fts(listings_fts, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+            END
+        """)
+        # Only re-index when a searchable column changes (not on e.g. is_featured toggles)
+        cursor.execute(f"""
+            CREATE TRIGGER listings_fts_au AFTER UPDATE OF {cols} ON listings BEGIN
+                INSERT INTO listings_fts(listings_fts, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+                INSERT INTO listings_fts(rowid, {cols}) VALUES (new.id, {new_cols});
+            END
+        """)
+        cursor.execute("INSERT INTO listings_fts(listings_fts) VALUES ('rebuild')")
+        print("Indexed existing listings.")
@@ -0,0 +1,30 @@
+# Schema step: precomputed similar listings (registered in schema.py).
+
+import listing_similarity
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='listing_similar'")
+    if cursor.fetchone():
+        print("listing_similar already exists.")
+    else:
+        print("Creating listing_similar...")
+        cursor.execute("""
+            CREATE TABLE listing_similar (
+                listing_id INTEGER NOT NULL,
+                rank INTEGER NOT NULL,
+                similar_id INTEGER NOT NULL,
+                score REAL NOT NULL,
+                PRIMARY KEY (listing_id, rank)
+            ) WITHOUT ROWID
+        """)
+        # Finds the lists a changed or deleted listing appears in
+        cursor.execute("CREATE INDEX idx_listing_similar_similar ON listing_similar(similar_id)")
+        cursor.execute("""
+            CREATE TRIGGER listing_similar_ad AFTER DELETE ON listings BEGIN
+                DELETE FROM listing_similar WHERE listing_id = old.id OR similar_id = old.id;
+            END
+        """)
+        count = listing_similarity.rebuild(conn)
+        print(f"Computed neighbours for {count} listings.")
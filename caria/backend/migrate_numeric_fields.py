@@ -0,0 +1,28 @@
+# Schema step: typed area columns and normalised beds/baths (registered in schema.py).
+
+from listing_fields import normalize_listing_numbers
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("PRAGMA table_info(listings)")
+    existing_columns = [column[1] for column in cursor.fetchall()]
+
+    added = False
+    for col_name, col_type in [('closed_area_m2', 'REAL'), ('plot_area_m2', 'REAL')]:
+        if col_name not in existing_columns:
+            print(f"Adding column {col_name}...")
+            cursor.execute(f"ALTER TABLE listings ADD COLUMN {col_name} {col_type}")
+            added = True
+
+    if added:
+        # Backfill beds/baths/area and the typed areas from the text fields
+        cursor.execute("SELECT id, beds, baths, area, plotSize, beds_room_count, baths_count, closed_area, plot_area FROM listings")
+        updates = []
+        for row in cursor.fetchall():
+            data = normalize_listing_numbers(dict(row))
+            updates.append((data['beds'], data['baths'], data['area'], data['closed_area_m2'], data['plot_area_m2'], row['id']))
+        cursor.executemany(
+            "UPDATE listings SET beds=?, baths=?, area=?, closed_area_m2=?, plot_area_m2=? WHERE id=?", updates
+        )
+        print(f"Backfilled numeric fields for {len(updates)} listings.")
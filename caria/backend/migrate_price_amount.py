@@ -0,0 +1,23 @@
+# Schema step: typed price columns parsed from the display price (registered in schema.py).
+
+from listing_fields import parse_price
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("PRAGMA table_info(listings)")
+    existing_columns = [column[1] for column in cursor.fetchall()]
+
+    added = False
+    for col_name, col_type in [('price_amount', 'INTEGER'), ('price_currency', 'TEXT')]:
+        if col_name not in existing_columns:
+            print(f"Adding column {col_name}...")
+            cursor.execute(f"ALTER TABLE listings ADD COLUMN {col_name} {col_type}")
+            added = True
+
+    if added:
+        # Backfill the parsed price for every existing listing
+        cursor.execute("SELECT id, price FROM listings")
+        updates = [(*parse_price(price), listing_id) for listing_id, price in cursor.fetchall()]
+        cursor.executemany("UPDATE listings SET price_amount=?, price_currency=? WHERE id=?", updates)
+        print(f"Backfilled price_amount for {len(updates)} listings.")
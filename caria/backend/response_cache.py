@@ -0,0 +1,177 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+# In-process read-through cache for public GET responses, plus the per-table
+# version counters behind ETag / Last-Modified.
+# Entries are tagged with the tables they were built from, so a write only
+# drops the responses that actually depend on the table it touched. A tag can
+# also name a single column ("listings.is_featured") for responses that read
+# nothing else from the table.
+# A handler takes stamp(tags) before it queries and passes it to set(): a write
+# that commits in between bumps a version, and the (possibly stale) response
+# is not stored, as an invalidation may already have run before the set.
+
+
+class ResponseCache:
+    def __init__(self, max_entries=256, version_fn=None):
+        """`version_fn(table)` returns the table's current version (TableVersions.version)."""
+        self.max_entries = max_entries
+        self.version_fn = version_fn
+        self._entries = OrderedDict()   # key -> (value, tables)
+        self._by_table = {}             # table -> set of keys
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_sets = 0
+
+    @staticmethod
+    def make_key(route, query_items=()):
+        """Route plus its query parameters, independent of parameter order."""
+        return (route, tuple(sorted(query_items)))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def stamp(self, tags):
+        """Versions of the tables behind `tags`, to be taken before the response is built."""
+        if self.version_fn is None:
+            return None
+        return {table: self.version_fn(table) for table in {tag.split(".")[0] for tag in tags}}
+
+    def set(self, key, value, tables, stamp=None):
+        with self._lock:
+            if stamp is not None and any(self.version_fn(t) != v for t, v in stamp.items()):
+                self.stale_sets += 1
+                return
+            if key in self._entries:
+                self._forget(key)
+            self._entries[key] = (value, tuple(tables))
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._forget(oldest)
+                self.evictions += 1
+
+    def invalidate(self, *tables):
+        """Drops entries tagged with any of `tables`, including their column tags ("listings.price")."""
+        with self._lock:
+            for table in tables:
+                tags = [t for t in self._by_table if t == table or t.startswith(table + ".")]
+                self._drop(tags)
+
+    def invalidate_columns(self, table, columns):
+        """Drops entries that depend on the whole table or on one of `columns`;
+        entries tagged only with other columns of the table are kept."""
+        with self._lock:
+            self._drop([table] + [f"{table}.{c}" for c in columns])
+
+    def _drop(self, tags):
+        for tag in tags:
+            for key in list(self._by_table.get(tag, ())):
+                self._forget(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_sets": self.stale_sets,
+            }
+
+    def _forget(self, key):
+        _, tables = self._entries.pop(key)
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+
+class TableVersions:
+    """Monotonic per-table write counters.
+
+    Counters live in memory, so every ETag also carries the process boot epoch:
+    a restart can never hand out a tag that matched data from before it."""
+
+    def __init__(self):
+        self.boot_time = time.time()
+        self.epoch = format(int(self.boot_time * 1000), "x")
+        self._versions = {}
+        self._changed_at = {}
+        self._rewrites = {}          # table -> bump() calls, i.e. writes to any column
+        self._column_versions = {}   # "table.column" -> bump_columns() calls naming it
+        self._lock = threading.Lock()
+
+    def bump(self, *tables):
+        now = time.time()
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                self._rewrites[table] = self._rewrites.get(table, 0) + 1
+                self._changed_at[table] = now
+
+    def bump_columns(self, table, columns):
+        """Like bump(table) for a write that touched only `columns`."""
+        now = time.time()
+        with self._lock:
+            self._versions[table] = self._versions.get(table, 0) + 1
+            self._changed_at[table] = now
+            for column in columns:
+                key = f"{table}.{column}"
+                self._column_versions[key] = self._column_versions.get(key, 0) + 1
+
+    def version(self, table):
+        with self._lock:
+            return self._versions.get(table, 0)
+
+    def columns_version(self, table, columns):
+        """Counter that moves on every write that may have changed one of
+        `columns` of `table`: each bump(table) and each bump_columns() naming one."""
+        with self._lock:
+            return self._rewrites.get(table, 0) + sum(
+                self._column_versions.get(f"{table}.{c}", 0) for c in columns
+            )
+
+    def etag(self, tables, resource=""):
+        """Strong ETag for `resource` (route + query) built from `tables`."""
+        with self._lock:
+            parts = [f"{t}:{self._versions.get(t, 0)}" for t in sorted(tables)]
+        digest = hashlib.sha1(f"{resource}|{'|'.join(parts)}".encode()).hexdigest()[:20]
+        return f'"{self.epoch}-{digest}"'
+
+    def last_modified(self, tables):
+        """Unix time (rounded up to whole seconds, as HTTP dates are) of the
+        latest write to any of `tables`; the boot time if none happened yet."""
+        with self._lock:
+            latest = max([self._changed_at.get(t, self.boot_time) for t in tables] or [self.boot_time])
+        return math.ceil(latest)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._versions)
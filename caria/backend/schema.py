@@ -0,0 +1,480 @@
+import os
+import sqlite3
+import sys
+from collections import namedtuple
+from functools import partial
+
+import migrate_price_amount
+import migrate_numeric_fields
+import migrate_listing_search
+import migrate_listing_features
+import migrate_listing_geo
+import migrate_listing_similar
+import migrate_change_log
+import migrate_listing_cards
+
+# Versioned schema migrations.
+# The database records the last migration applied in PRAGMA user_version.
+# At startup every pending step runs, in order, on one connection inside a
+# single transaction that also stores the new version, so a failed upgrade
+# leaves the database exactly as it was. Steps must also cope with tables and
+# columns that already exist: databases older than this registry (version 0)
+# were built by the former one-off scripts and replay every step once.
+#
+# Add a step by appending to migrations() with the next version number;
+# never renumber or edit a step that has shipped.
+#
+#   python schema.py [caria.db]
+
+db_path = os.path.join(os.path.dirname(__file__), 'caria.db')
+
+Migration = namedtuple("Migration", "version name apply")
+
+BASE_TABLES = {
+    "listings": """
+        CREATE TABLE IF NOT EXISTS listings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            slug TEXT UNIQUE,
+            title TEXT,
+            location TEXT,
+            price TEXT,
+            beds INTEGER,
+            baths INTEGER,
+            area TEXT,
+            plotSize TEXT,
+            reference TEXT,
+            image TEXT,
+            tag TEXT,
+            region TEXT
+        )
+    """,
+    "site_content": """
+        CREATE TABLE IF NOT EXISTS site_content (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content_key TEXT UNIQUE,
+            value_tr TEXT,
+            value_en TEXT,
+            section TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    "sliders": """
+        CREATE TABLE IF NOT EXISTS sliders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT,
+            image_url TEXT,
+            link TEXT,
+            display_order INTEGER,
+            active BOOLEAN DEFAULT 1
+        )
+    """,
+    "media_assets": """
+        CREATE TABLE IF NOT EXISTS media_assets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT,
+            file_url TEXT,
+            file_type TEXT,
+            alt_text TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    "country_guides": """
+        CREATE TABLE IF NOT EXISTS country_guides (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            country_name_tr VARCHAR(255) NOT NULL,
+            country_name_en VARCHAR(255),
+            content_tr TEXT,
+            content_en TEXT,
+            image_url VARCHAR(255),
+            slug VARCHAR(255) UNIQUE NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    "seo_settings": """
+        CREATE TABLE IF NOT EXISTS seo_settings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            page_name VARCHAR(255) UNIQUE NOT NULL,
+            title_tr VARCHAR(255),
+            title_en VARCHAR(255),
+            description_tr TEXT,
+            description_en TEXT,
+            keywords_tr TEXT,
+            keywords_en TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    "inquiries": """
+        CREATE TABLE IF NOT EXISTS inquiries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT,
+            phone TEXT,
+            message TEXT,
+            property_id INTEGER,
+            status TEXT DEFAULT 'new',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    "pages": """
+        CREATE TABLE IF NOT EXISTS pages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            slug TEXT UNIQUE NOT NULL,
+            content_html TEXT,
+            banner_title TEXT,
+            banner_url TEXT,
+            active INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    "page_blocks": """
+        CREATE TABLE IF NOT EXISTS page_blocks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            page_id INTEGER,
+            block_type TEXT,
+            block_data TEXT,
+            sort_order INTEGER DEFAULT 0,
+            active INTEGER DEFAULT 1
+        )
+    """,
+    "menus": """
+        CREATE TABLE IF NOT EXISTS menus (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            url TEXT NOT NULL,
+            menu_type TEXT DEFAULT 'header', -- 'header' or 'footer'
+            display_order INTEGER DEFAULT 0
+        )
+    """,
+    "homepage_blocks": """
+        CREATE TABLE IF NOT EXISTS homepage_blocks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            block_type TEXT,
+            title TEXT,
+            subtitle TEXT,
+            content TEXT,
+            image_url TEXT,
+            video_url TEXT,
+            display_order INTEGER DEFAULT 0,
+            active BOOLEAN DEFAULT 1,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    "feature_definitions": """
+        CREATE TABLE IF NOT EXISTS feature_definitions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL, -- 'interior', 'exterior', 'general'
+            label_tr TEXT NOT NULL,
+            label_en TEXT NOT NULL
+        )
+    """,
+}
+
+ADVISORS_TABLE = """
+    CREATE TABLE advisors (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        fullName TEXT NOT NULL,
+        slug TEXT UNIQUE NOT NULL,
+        title_tr TEXT,
+        title_en TEXT,
+        email TEXT NOT NULL,
+        phone TEXT NOT NULL,
+        whatsappPhone TEXT,
+        portraitUrl TEXT,
+        coverImageUrl TEXT,
+        bioRichTextTR TEXT,
+        bioRichTextEN TEXT,
+        languages TEXT,
+        regions TEXT,
+        specialties TEXT,
+        socialLinks TEXT,
+        isActive BOOLEAN DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+INITIAL_FEATURE_DEFINITIONS = [
+    ('interior', 'Klima', 'Air Conditioning'),
+    ('interior', 'Beyaz Eşya', 'White Goods'),
+    ('interior', 'Mobilyalı', 'Furnished'),
+    ('interior', 'Yerden Isıtma', 'Underfloor Heating'),
+    ('interior', 'Şömine', 'Fireplace'),
+    ('exterior', 'Yüzme Havuzu', 'Swimming Pool'),
+    ('exterior', 'Otopark', 'Parking'),
+    ('exterior', 'Bahçe', 'Garden'),
+    ('exterior', 'Deniz Manzarası', 'Sea View'),
+    ('exterior', 'Barbekü', 'BBQ Area'),
+]
+
+# Columns added to the base tables over time, in the order they were introduced
+ADDED_COLUMNS = {
+    "listings": [
+        ("kocan_tipi", "TEXT"),
+        ("ozellikler_ic", "TEXT"),
+        ("ozellikler_dis", "TEXT"),
+        ("pdf_brosur", "TEXT"),
+        ("advisor_id", "INTEGER"),
+        ("status", "TEXT"),
+        ("description", "TEXT"),
+        ("beds_room_count", "INTEGER DEFAULT 0"),
+        ("baths_count", "INTEGER DEFAULT 0"),
+        ("plot_area", "TEXT"),
+        ("closed_area", "TEXT"),
+        ("balcony", "TEXT"),
+        ("distance_sea", "TEXT"),
+        ("distance_center", "TEXT"),
+        ("distance_airport", "TEXT"),
+        ("gallery", "TEXT"),
+        ("is_featured", "BOOLEAN DEFAULT 0"),
+        ("featured_image", "TEXT"),
+        ("ozellikler_konum", "TEXT"),
+        ("description_en", "TEXT"),
+        ("title_en", "TEXT"),
+        ("property_type", "TEXT"),
+        ("is_furnished", "TEXT"),
+        ("building_age", "TEXT"),
+        ("floor_level", "TEXT"),
+        ("site_within", "TEXT"),
+        ("is_featured_slider", "BOOLEAN DEFAULT 0"),
+        ("distance_hospital", "TEXT"),
+        ("distance_school", "TEXT"),
+        ("full_address", "TEXT"),
+        ("neighborhood", "TEXT"),
+        ("city", "TEXT"),
+        ("country_name", "TEXT"),
+        ("latitude", "TEXT"),
+        ("longitude", "TEXT"),
+    ],
+    "pages": [
+        ("gallery_json", "TEXT DEFAULT '[]'"),
+        ("category", "TEXT DEFAULT 'general'"),
+        ("status", "TEXT DEFAULT 'published'"),
+        ("hero_image", "TEXT"),
+        ("hero_title", "TEXT"),
+        ("hero_subtitle", "TEXT"),
+        ("seo_title", "TEXT"),
+        ("seo_description", "TEXT"),
+        ("sort_order", "INTEGER DEFAULT 0"),
+    ],
+}
+
+# Secondary indexes for the API's filters, sorts and keyset pagination
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_listings_region ON listings(region COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_property_type ON listings(property_type COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_status ON listings(status)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_is_featured ON listings(is_featured)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_price_amount ON listings(price_amount)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_currency_price ON listings(price_currency, price_amount)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_beds_num ON listings(beds)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_baths_num ON listings(baths)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_area ON listings(closed_area_m2)",
+    # keyset pagination seeks
+    "CREATE INDEX IF NOT EXISTS idx_listings_advisor ON listings(advisor_id)",
+    "CREATE INDEX IF NOT EXISTS idx_inquiries_created ON inquiries(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_pages_created ON pages(created_at)",
+]
+
+# Indexes matching the filters and sort orders of the API's own queries;
+# tests/test_query_plans.py fails when a statement needs one that is missing.
+# listings(region) and inquiries(created_at) are idx_listings_region and
+# idx_inquiries_created above.
+QUERY_INDEXES = [
+    # advisor profile: published listings of one advisor
+    "CREATE INDEX IF NOT EXISTS idx_listings_advisor_status ON listings(advisor_id, status)",
+    # category pages and the page list, both ordered by sort_order
+    "CREATE INDEX IF NOT EXISTS idx_pages_category ON pages(category, status, active, sort_order)",
+    "CREATE INDEX IF NOT EXISTS idx_pages_active ON pages(active, sort_order)",
+    "CREATE INDEX IF NOT EXISTS idx_page_blocks_page ON page_blocks(page_id, sort_order)",
+    "CREATE INDEX IF NOT EXISTS idx_sliders_active ON sliders(active, display_order)",
+]
+
+# Ascending listing sorts put NULL keys last with a leading `key IS NULL` term
+# (server.order_clause); the expressions must match it to serve the ORDER BY of
+# limit/page and unpaged reads. Cursor pages seek the plain key indexes instead
+# (server.keyset_ranges): a range on `key IS NULL, key` cannot be sought.
+SORT_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_listings_price_sort ON listings(price_amount IS NULL, price_amount)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_beds_sort ON listings(beds IS NULL, beds)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_area_sort ON listings(closed_area_m2 IS NULL, closed_area_m2)",
+    "CREATE INDEX IF NOT EXISTS idx_listing_cards_price_sort ON listing_cards(price_amount IS NULL, price_amount)",
+]
+
+# fields=card reads sort listing_cards on beds and area too, not only on price
+CARD_SORT_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_listing_cards_beds ON listing_cards(beds)",
+    "CREATE INDEX IF NOT EXISTS idx_listing_cards_area ON listing_cards(closed_area_m2)",
+    "CREATE INDEX IF NOT EXISTS idx_listing_cards_beds_sort ON listing_cards(beds IS NULL, beds)",
+    "CREATE INDEX IF NOT EXISTS idx_listing_cards_area_sort ON listing_cards(closed_area_m2 IS NULL, closed_area_m2)",
+]
+
+
+def table_columns(cursor, table):
+    return [row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def add_columns(cursor, table, columns):
+    """ALTER TABLE ADD COLUMN for each (name, definition) the table lacks; returns the names added."""
+    existing = table_columns(cursor, table)
+    added = []
+    for name, definition in columns:
+        if name not in existing:
+            print(f"Adding column {table}.{name}...")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+            added.append(name)
+    return added
+
+
+def create_base_tables(conn):
+    cursor = conn.cursor()
+    for statement in BASE_TABLES.values():
+        cursor.execute(statement)
+    cursor.execute(ADVISORS_TABLE.replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1))
+
+    cursor.execute("SELECT COUNT(*) FROM site_content")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("INSERT INTO site_content (content_key, value_tr, section) VALUES (?, ?, ?)",
+                       ('welcome_msg', 'Caria Estates - Mükemmel Yaşam Alanınıza Hoş Geldiniz', 'hero'))
+    cursor.execute("SELECT COUNT(*) FROM feature_definitions")
+    if cursor.fetchone()[0] == 0:
+        cursor.executemany("INSERT INTO feature_definitions (category, label_tr, label_en) VALUES (?, ?, ?)",
+                           INITIAL_FEATURE_DEFINITIONS)
+
+
+def upgrade_advisors(conn):
+    """The first advisors table (name, title, bio_html, image_url) becomes the
+    bilingual fullName/portraitUrl shape the admin edits."""
+    cursor = conn.cursor()
+    columns = table_columns(cursor, "advisors")
+    if 'fullName' in columns:
+        return
+    print("Rebuilding advisors table...")
+    cursor.execute("ALTER TABLE advisors RENAME TO advisors_old")
+    cursor.execute(ADVISORS_TABLE)
+    cursor.execute("""
+        INSERT INTO advisors (id, fullName, slug, title_tr, title_en, email, phone, bioRichTextTR, bioRichTextEN, portraitUrl, created_at)
+        SELECT id, name, slug, title, title, COALESCE(email, ''), COALESCE(phone, ''), bio_html, bio_html, image_url, created_at
+        FROM advisors_old
+    """)
+    cursor.execute("DROP TABLE advisors_old")
+
+
+def add_detail_columns(conn):
+    cursor = conn.cursor()
+    for table, columns in ADDED_COLUMNS.items():
+        add_columns(cursor, table, columns)
+
+
+def create_indexes(conn, statements=INDEXES):
+    cursor = conn.cursor()
+    for statement in statements:
+        cursor.execute(statement)
+
+
+def migrations(static_features, static_advisors):
+    """The ordered registry. `static_features` / `static_advisors` are the
+    catalogues kept in code (server.STATIC_FEATURES / STATIC_ADVISORS)."""
+    return [
+        Migration(1, "base tables", create_base_tables),
+        Migration(2, "advisors: fullName/portraitUrl shape", upgrade_advisors),
+        Migration(3, "listing and page detail columns", add_detail_columns),
+        Migration(4, "listings.price_amount / price_currency", migrate_price_amount.upgrade),
+        Migration(5, "listings.closed_area_m2 / plot_area_m2", migrate_numeric_fields.upgrade),
+        Migration(6, "listings_fts full-text index", migrate_listing_search.upgrade),
+        Migration(7, "listing_features", partial(migrate_listing_features.upgrade, features=static_features)),
+        Migration(8, "listings_geo R*Tree", migrate_listing_geo.upgrade),
+        Migration(9, "listing_similar", migrate_listing_similar.upgrade),
+        Migration(10, "change_log and updated_at", migrate_change_log.upgrade),
+        Migration(11, "listing_cards", migrate_listing_cards.upgrade),
+        Migration(12, "secondary indexes", create_indexes),
+        Migration(13, "API query indexes", partial(create_indexes, statements=QUERY_INDEXES)),
+        Migration(14, "NULLS-last sort indexes", partial(create_indexes, statements=SORT_INDEXES)),
+        Migration(15, "database advisors over static ones", migrate_listing_cards.prefer_database_advisors),
+        Migration(16, "listing_cards beds/area sort indexes", partial(create_indexes, statements=CARD_SORT_INDEXES)),
+    ]
+
+
+def migrate(path, static_features, static_advisors):
+    """Brings the database at `path` to the latest version; returns that version.
+    The catalogues are the ones migrations() takes."""
+    steps = migrations(static_features, static_advisors)
+
+    # Autocommit mode: the transaction below is the only one, opened and ended explicitly
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        pending = [step for step in steps if step.version > current]
+        for step in pending:
+            print(f"Migration {step.version}: {step.name}...")
+            step.apply(conn)
+        # Static advisors live in code, so their cards are re-synced on every start
+        migrate_listing_cards.sync_static_advisors(conn, static_advisors)
+        latest = steps[-1].version
+        if latest > current:
+            conn.execute(f"PRAGMA user_version = {latest}")
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    if pending:
+        print(f"Schema migrated from version {current} to {latest}.")
+    return latest
+
+
+Column = namedtuple("Column", "name type affinity notnull default pk")
+
+
+def affinity(declared):
+    """SQLite's column affinity for a declared type (https://sqlite.org/datatype3.html)."""
+    declared = (declared or "").upper()
+    if "INT" in declared:
+        return "INTEGER"
+    if any(t in declared for t in ("CHAR", "CLOB", "TEXT")):
+        return "TEXT"
+    if "BLOB" in declared or not declared:
+        return "BLOB"
+    if any(t in declared for t in ("REAL", "FLOA", "DOUB")):
+        return "REAL"
+    return "NUMERIC"
+
+
+class ColumnMap:
+    """table -> ordered {column name: Column}, read once after migrating.
+    Request code looks columns up here instead of running PRAGMA table_info."""
+
+    def __init__(self):
+        self.tables = {}
+
+    def load(self, conn):
+        tables = {}
+        names = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'").fetchall()
+        for (name,) in names:
+            tables[name] = {
+                row[1]: Column(row[1], row[2], affinity(row[2]), bool(row[3]), row[4], bool(row[5]))
+                for row in conn.execute(f'PRAGMA table_info("{name}")').fetchall()
+            }
+        self.tables = tables
+        return self
+
+    def columns(self, table):
+        """Column names of `table`, in table order."""
+        return list(self.tables.get(table, ()))
+
+    def column(self, table, name):
+        return self.tables.get(table, {}).get(name)
+
+    def has(self, table, name):
+        return name in self.tables.get(table, {})
+
+
+if __name__ == "__main__":
+    # server imports this module, so only the command line reaches for its catalogues
+    from server import STATIC_FEATURES, STATIC_ADVISORS
+    migrate(sys.argv[1] if len(sys.argv) > 1 else db_path, STATIC_FEATURES, STATIC_ADVISORS)
@@ -1,18 +1,45 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, File, UploadFile, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, File, UploadFile, Request, Query, Response, Body
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse, FileResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 import os
 import shutil
 import logging
 from pathlib import Path
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError, create_model
 from typing import List, Optional
 import uuid
 import sqlite3
 import json
+import hashlib
+import base64
+import threading
+import re
+import time
+import asyncio
 from typing import List, Optional, Any, Union
 
+from listing_fields import parse_price, normalize_listing_numbers, feature_lookup, listing_feature_ids, FEATURE_COLUMNS
+import schema
+import migrate_listing_cards
+import listing_similarity
+from geo import haversine_km, bbox_around, parse_bbox
+from map_clusters import ClusterIndex, MAX_ZOOM
+from listing_import import iter_records
+import change_feed
+from event_broker import EventBroker, format_event
+from sitemap import SitemapCache, lastmod, url_path
+from db import ConnectionPool, PoolTimeout, DatabaseExecutor, WriteQueue
+from response_cache import ResponseCache, TableVersions
+from advisor_registry import AdvisorRegistry
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -119,46 +146,488 @@ STATIC_ADVISORS = [
     }
 ]
 
+# Public GET responses are cached in-process and dropped per table on write
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get('RESPONSE_CACHE_SIZE', 256)),
+    version_fn=lambda table: table_versions.version(table),
+)
+
+def cache_key(request: Request):
+    return ResponseCache.make_key(request.url.path, request.query_params.multi_items())
+
+table_versions = TableVersions()
+
+events = EventBroker()
+
+def mark_changed(*tables):
+    """Call after a committed write: bumps the tables' versions, drops every
+    cached response built from them and tells connected admin clients."""
+    table_versions.bump(*tables)
+    response_cache.invalidate(*tables)
+    events.publish("change", {"tables": list(tables)})
+
+def mark_columns_changed(table, columns):
+    """Like mark_changed(table) for a write that touched only `columns`: cached
+    responses tagged with other columns of the table survive."""
+    table_versions.bump_columns(table, columns)
+    response_cache.invalidate_columns(table, columns)
+    events.publish("change", {"tables": [table], "columns": list(columns)})
+
+# Conditional GET: public routes (by path prefix) and the tables their bodies come from.
+# The ETag is derived from the table versions alone, so a matching If-None-Match
+# is answered with 304 before the handler (and the database) is reached.
+CONDITIONAL_ROUTES = [
+    ("/api/properties", ("listings", "advisors")),
+    ("/api/cms/sliders", ("sliders",)),
+    ("/api/cms/content", ("site_content",)),
+    ("/api/cms/menus", ("menus",)),
+    ("/api/cms/homepage", ("homepage_blocks",)),
+    ("/api/homepage/blocks", ("homepage_blocks",)),
+    ("/api/cms/country-guides", ("country_guides",)),
+    ("/api/cms/seo", ("seo_settings",)),
+    ("/api/cms/pages", ("pages",)),
+    ("/api/pages/", ("pages",)),
+    ("/api/cms-blocks/", ("pages", "page_blocks")),
+    ("/api/advisors", ("advisors", "listings")),
+    ("/api/cms/features", ()),
+    ("/sitemap", ("listings", "pages", "advisors")),
+]
+
+def conditional_tables(path):
+    for prefix, tables in CONDITIONAL_ROUTES:
+        if path.startswith(prefix):
+            return tables
+    return None
+
+def not_modified(request: Request, etag, last_modified):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = request.headers.get("if-modified-since")
+    # HTTP dates have whole seconds: until the second of the last write is
+    # over, another write could land in it unseen, so only the ETag can tell
+    if if_modified_since and time.time() > last_modified:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    tables = conditional_tables(request.url.path) if request.method == "GET" else None
+    if tables is None:
+        return await call_next(request)
+
+    resource = f"{request.url.path}?{request.url.query}"
+    etag = table_versions.etag(tables, resource)
+    last_modified = table_versions.last_modified(tables)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
+
+# Static and database advisors, indexed by id and slug; reloads after advisor writes
+advisors = AdvisorRegistry(STATIC_ADVISORS, lambda: table_versions.version("advisors"))
+
 # Database Connection Helper
+db_pool = ConnectionPool(
+    DB_PATH,
+    size=int(os.environ.get('DB_POOL_SIZE', 8)),
+    timeout=float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+)
+
+# Handlers are async, but sqlite3 blocks: their bodies run on these threads
+# (@db_executor.offload) so a slow query or a lock wait never stalls the event loop
+db_executor = DatabaseExecutor(db_pool.size)
+
+# Pool connections only read. Every write is a job for the single writer, which
+# group-commits the jobs arriving within a few milliseconds (see db.WriteQueue)
+db_writer = WriteQueue(DB_PATH, window=float(os.environ.get('DB_WRITE_WINDOW_MS', 2)) / 1000)
+
 def get_db():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
+    try:
+        conn = db_pool.acquire()
+    except PoolTimeout as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=503, detail="Database busy, please retry")
     try:
         yield conn
     finally:
-        conn.close()
+        db_pool.release(conn)
+
+
+# Listing filters & sorting
+# Filters run on the typed columns that add_property derives on write
+# (see listing_fields): price_amount, beds, baths and closed_area_m2.
+PRICE_SQL = "price_amount"
+BEDS_SQL = "beds"
+BATHS_SQL = "baths"
+AREA_SQL = "closed_area_m2"
+
+# sort name -> (key expression, direction); ties are always broken on id
+PROPERTY_SORTS = {
+    "newest": ("id", "DESC"),
+    "oldest": ("id", "ASC"),
+    "price_asc": (PRICE_SQL, "ASC"),
+    "price_desc": (PRICE_SQL, "DESC"),
+    "beds_asc": (BEDS_SQL, "ASC"),
+    "beds_desc": (BEDS_SQL, "DESC"),
+    "area_asc": (AREA_SQL, "ASC"),
+    "area_desc": (AREA_SQL, "DESC"),
+}
+
+def build_property_filters(region=None, property_type=None, status=None, beds_min=None, beds_max=None,
+                           baths_min=None, baths_max=None, price_min=None, price_max=None, is_featured=None,
+                           currency=None, area_min=None, area_max=None):
+    """Turns the /properties query parameters into a WHERE clause and its parameters."""
+    clauses = []
+    params = []
+    if region:
+        clauses.append("region = ? COLLATE NOCASE")
+        params.append(region)
+    if property_type:
+        clauses.append("property_type = ? COLLATE NOCASE")
+        params.append(property_type)
+    if status:
+        clauses.append("status = ?")
+        params.append(status)
+    if currency:
+        clauses.append("price_currency = ?")
+        params.append(currency.upper())
+    for expr, op, value in (
+        (BEDS_SQL, ">=", beds_min), (BEDS_SQL, "<=", beds_max),
+        (BATHS_SQL, ">=", baths_min), (BATHS_SQL, "<=", baths_max),
+        (PRICE_SQL, ">=", price_min), (PRICE_SQL, "<=", price_max),
+        (AREA_SQL, ">=", area_min), (AREA_SQL, "<=", area_max),
+    ):
+        if value is not None:
+            clauses.append(f"{expr} {op} ?")
+            params.append(value)
+    if is_featured is not None:
+        clauses.append("is_featured = ?")
+        params.append(1 if is_featured else 0)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+# Keyset (cursor) pagination
+# A cursor is an opaque token holding the (sort key, id) of the last row served,
+# so the next page is an index seek instead of an ever-growing OFFSET.
+DEFAULT_PAGE_SIZE = 20
+
+def order_clause(key_expr, direction):
+    """Listings without a value (e.g. "Contact for price") come last in either
+    direction: DESC already puts NULLs last, ASC leads with `key IS NULL`
+    (served by the schema's sort indexes). Cursor pages keep this order but
+    read it as keyset_ranges, which index seeks can serve."""
+    if key_expr == "id":
+        return f"id {direction}"
+    if direction == "ASC":
+        return f"{key_expr} IS NULL, {key_expr} ASC, id ASC"
+    return f"{key_expr} DESC, id DESC"
+
+def encode_cursor(scope, key, last_id):
+    raw = json.dumps([scope, key, last_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token, scope):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        token_scope, key, last_id = json.loads(raw)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if token_scope != scope or not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Cursor does not belong to this listing")
+    # The key is bound as a query parameter; anything but a scalar is a forged cursor
+    if key is not None and not isinstance(key, (int, float, str)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key, last_id
+
+def keyset_ranges(key_expr, direction, cursor=None):
+    """The rows after `cursor` ((key, last_id), or None for the first page) in
+    order_clause(key_expr, direction), as (predicate or None, params, ORDER BY)
+    ranges to read in turn: the non-NULL keys, then the NULL tail by id. Each
+    is a range of an index on key_expr, so every one is a seek; an
+    `OR key IS NULL` or a leading `key IS NULL` term would turn it into a scan."""
+    op = ">" if direction == "ASC" else "<"
+    if key_expr == "id":
+        return [(f"id {op} ?", [cursor[1]], f"id {direction}") if cursor else (None, [], f"id {direction}")]
+    by_key = f"{key_expr} {direction}, id {direction}"
+    if cursor is None:
+        return [(f"{key_expr} IS NOT NULL", [], by_key), (f"{key_expr} IS NULL", [], f"id {direction}")]
+    key, last_id = cursor
+    if key is None:
+        return [(f"{key_expr} IS NULL AND id {op} ?", [last_id], f"id {direction}")]
+    return [(f"({key_expr}, id) {op} (?, ?)", [key, last_id], by_key), (f"{key_expr} IS NULL", [], f"id {direction}")]
+
+def keyset_query(table, where, params, order, cursor, limit, columns="*"):
+    """(sql, params) for the `limit` + 1 rows after `cursor` (see keyset_ranges)."""
+    key_expr, direction = order
+    selects = []
+    args = []
+    for predicate, extra, order_by in keyset_ranges(key_expr, direction, cursor):
+        clause = where
+        if predicate:
+            clause = f"{where} AND {predicate}" if where else f" WHERE {predicate}"
+        selects.append(f"SELECT {columns}, {key_expr} AS _sort_key FROM {table}{clause} ORDER BY {order_by} LIMIT ?")
+        args += list(params) + extra + [limit + 1]
+    if len(selects) == 1:
+        return selects[0], args
+    # UNION ALL reads its arms in turn and the outer LIMIT stops it, so the
+    # NULL tail is only searched once the non-NULL range runs out
+    sql = " UNION ALL ".join(f"SELECT * FROM ({select})" for select in selects) + " LIMIT ?"
+    return sql, args + [limit + 1]
+
+def fetch_keyset_page(db, table, where, params, order, token, limit, scope, columns="*"):
+    """Fetches one cursor page of `table`. `where` is "" or a " WHERE ..." clause;
+    `columns` must include id."""
+    cursor = decode_cursor(token, scope) if token else None
+    sql, args = keyset_query(table, where, params, order, cursor, limit, columns)
+    rows = [dict(row) for row in db.execute(sql, args).fetchall()]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(scope, rows[-1]['_sort_key'], rows[-1]['id'])
+    for row in rows:
+        row.pop('_sort_key', None)
+    return rows, next_cursor
+
+# Sparse fieldsets (?fields=)
+# A preset name or a comma-separated column list; presets can be mixed with columns.
+LISTING_FIELD_PRESETS = {
+    "card": [
+        "id", "slug", "title", "title_en", "location", "region", "property_type", "status", "tag",
+        "price", "price_amount", "price_currency", "beds", "baths", "area",
+        "beds_room_count", "baths_count", "closed_area", "image", "featured_image",
+        "is_featured", "is_featured_slider", "advisor_name", "advisor_slug", "advisor_portrait",
+    ],
+    "map": [
+        "id", "slug", "title", "latitude", "longitude", "region", "property_type",
+        "price", "price_amount", "price_currency", "image",
+    ],
+    "detail": None,  # every column
+}
+# Computed from the advisor merge rather than selected
+ADVISOR_FIELDS = ("advisor_name", "advisor_portrait", "advisor_slug", "advisor")
+
+# Columns of every table, read once at startup after the schema migrations ran
+db_schema = schema.ColumnMap()
+
+def resolve_listing_fields(fields):
+    """Returns (SELECT column list, requested field names), or (None, None) for every column."""
+    if not fields:
+        return None, None
+    requested = []
+    for name in (f.strip() for f in fields.split(",")):
+        if not name:
+            continue
+        if name in LISTING_FIELD_PRESETS:
+            if LISTING_FIELD_PRESETS[name] is None:
+                return None, None
+            requested += LISTING_FIELD_PRESETS[name]
+        else:
+            requested.append(name)
+
+    columns = db_schema.columns("listings")
+    unknown = [n for n in requested if n not in columns and n not in ADVISOR_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    select = [n for n in dict.fromkeys(requested) if n in columns]
+    # id drives cursors, advisor_id the advisor merge; both are dropped again if not asked for
+    if "id" not in select:
+        select.insert(0, "id")
+    if any(n in ADVISOR_FIELDS for n in requested) and "advisor_id" not in select:
+        select.append("advisor_id")
+    return ", ".join(select), set(requested)
+
+# Every field a listing_cards row carries (see migrate_listing_cards.py)
+CARD_FIELDS = set(migrate_listing_cards.CARD_LISTING_COLUMNS + migrate_listing_cards.CARD_ADVISOR_COLUMNS)
+
+def listing_source(columns, requested):
+    """("listing_cards", columns) when the narrow card table holds every requested
+    field, advisor fields included; otherwise ("listings", columns) and the
+    advisor fields are merged in Python as before."""
+    if requested is None or not requested <= CARD_FIELDS:
+        return "listings", columns
+    return "listing_cards", ", ".join(columns.split(", ") + [f for f in ADVISOR_FIELDS if f in requested])
+
+def qualified_columns(columns, alias):
+    """Prefixes a resolve_listing_fields() column list for use in a join."""
+    return ", ".join(f"{alias}.{c}" for c in columns.split(", ")) if columns else f"{alias}.*"
+
+def project_fields(rows, requested):
+    if requested is None:
+        return rows
+    return [{k: v for k, v in row.items() if k in requested} for row in rows]
+
+def wants_advisor(requested):
+    return requested is None or any(n in ADVISOR_FIELDS for n in requested)
+
+# Feature facets over listing_features (see migrate_listing_features.py)
+FEATURE_LOOKUP = feature_lookup(STATIC_FEATURES)
+
+def sync_listing_features(cursor, listing_id, data):
+    """Rewrites the listing's rows in listing_features from its ozellikler_* JSON."""
+    cursor.execute("DELETE FROM listing_features WHERE listing_id = ?", (listing_id,))
+    cursor.executemany(
+        "INSERT INTO listing_features (listing_id, feature_id) VALUES (?, ?)",
+        [(listing_id, feature_id) for feature_id in listing_feature_ids(data, FEATURE_LOOKUP)],
+    )
+
+def parse_feature_ids(features):
+    ids = []
+    for part in (features or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if part.casefold() not in FEATURE_LOOKUP and part not in FEATURE_LOOKUP:
+            raise HTTPException(status_code=400, detail=f"Unknown feature '{part}'")
+        ids.append(FEATURE_LOOKUP.get(part, FEATURE_LOOKUP.get(part.casefold())))
+    return sorted(set(ids))
+
+# Geospatial lookups over the listings_geo R*Tree (see migrate_listing_geo.py)
+def fetch_listings_in_box(db, box, columns, status=None, limit=None):
+    """Listings whose coordinates fall inside box = (min_lat, min_lng, max_lat, max_lng),
+    at most `limit` of them by id. The R*Tree narrows the candidates; its 32-bit bounds
+    are rounded outward, so the exact text coordinates are re-checked. Rows carry
+    `_lat` / `_lng` as floats."""
+    min_lat, min_lng, max_lat, max_lng = box
+    sql = f"""
+        SELECT {qualified_columns(columns, "l")},
+               CAST(l.latitude AS REAL) AS _lat, CAST(l.longitude AS REAL) AS _lng
+        FROM listings_geo g
+        JOIN listings l ON l.id = g.id
+        WHERE g.max_lat >= ? AND g.min_lat <= ? AND g.max_lng >= ? AND g.min_lng <= ?
+          AND CAST(l.latitude AS REAL) BETWEEN ? AND ?
+          AND CAST(l.longitude AS REAL) BETWEEN ? AND ?{" AND l.status = ?" if status else ""}
+        ORDER BY l.id{" LIMIT ?" if limit is not None else ""}
+    """
+    params = [min_lat, max_lat, min_lng, max_lng, min_lat, max_lat, min_lng, max_lng]
+    if status:
+        params.append(status)
+    if limit is not None:
+        params.append(limit)
+    return [dict(row) for row in db.execute(sql, params).fetchall()]
+
+# The listings columns load_cluster_points() reads; other edits keep the loaded points
+CLUSTER_COLUMNS = ("slug", "latitude", "longitude", "price_amount", "price_currency")
+
+def load_cluster_points(db):
+    rows = db.execute("""
+        SELECT l.id, l.slug, CAST(l.latitude AS REAL), CAST(l.longitude AS REAL), l.price_amount, l.price_currency
+        FROM listings_geo g JOIN listings l ON l.id = g.id
+        ORDER BY l.id
+    """).fetchall()
+    return [tuple(row) for row in rows]
+
+map_clusters = ClusterIndex(load_cluster_points, lambda: table_versions.columns_version("listings", CLUSTER_COLUMNS))
+
+# Precomputed neighbours in listing_similar (see listing_similarity.py)
+listing_vectors = listing_similarity.ListingVectors()
+SIMILAR_STALE_WARNING = "Similar listings could not be refreshed; run listing_similarity.rebuild()"
+
+# A refresh computed on a snapshot that a later listing write made stale is redone
+SIMILAR_REFRESH_ATTEMPTS = 3
+
+def store_similar_if_current(conn, token, neighbours):
+    """Writer job: stores `neighbours` unless a listing write committed after
+    `token`, the change_log position they were computed at. Returns the number
+    of lists stored, or None when they are stale."""
+    if listing_similarity.listings_changed_since(conn, token):
+        return None
+    return listing_similarity.store(conn, neighbours)
+
+def compute_similar(listing_ids):
+    """(change token, neighbour lists) from one read transaction on a pooled connection."""
+    conn = db_pool.acquire()
+    try:
+        conn.execute("BEGIN")
+        token = change_feed.current_token(conn)
+        return token, listing_similarity.refreshed_neighbours(conn, listing_ids, listing_vectors)
+    finally:
+        db_pool.release(conn)
 
+def refresh_similar(listing_ids):
+    """Runs after the listing write has committed, so a failure leaves the old
+    neighbour lists in place rather than failing the write. Returns a warning
+    for the write's response when it failed, else None.
 
-# Helper function to map new field names to legacy ones for frontend compatibility
-def map_property_fields(prop):
-    """Maps beds_room_count, baths_count, closed_area to beds, baths, area for frontend"""
-    # Parse beds from beds_room_count (e.g., "3+1" -> 3)
-    beds_room = prop.get('beds_room_count', '')
-    if beds_room and isinstance(beds_room, str) and '+' in beds_room:
-        try:
-            prop['beds'] = int(beds_room.split('+')[0])
-        except:
-            prop['beds'] = prop.get('beds', 0)
-    elif beds_room:
-        try:
-            prop['beds'] = int(beds_room)
-        except:
-            prop['beds'] = prop.get('beds', 0)
-    
-    # Parse baths from baths_count
-    baths_count = prop.get('baths_count', '')
-    if baths_count:
-        try:
-            prop['baths'] = int(baths_count)
-        except:
-            prop['baths'] = prop.get('baths', 0)
-    
-    # Map closed_area to area
-    closed_area = prop.get('closed_area', '')
-    if closed_area:
-        prop['area'] = closed_area
-    
-    return prop
+    The numpy work runs on this thread against a pooled connection; the writer
+    only stores the result. If other listing writes keep landing in between,
+    the last attempt computes inside the writer job instead."""
+    try:
+        for _ in range(SIMILAR_REFRESH_ATTEMPTS):
+            token, neighbours = compute_similar(listing_ids)
+            if db_writer.submit(store_similar_if_current, token, neighbours) is not None:
+                break
+        else:
+            db_writer.submit(listing_similarity.refresh, listing_ids, listing_vectors)
+    except Exception as e:
+        logger.error(f"Similar listings refresh failed for {listing_ids}: {str(e)}")
+        import traceback
+        logger.error(traceback.format_exc())
+        # The kept vectors may have seen rows of a rolled-back group; re-read them next time
+        listing_vectors.reset()
+        return SIMILAR_STALE_WARNING
+    return None
+
+def with_warning(result, warning):
+    if warning:
+        result["warning"] = warning
+    return result
+
+# Full-text search over listings_fts (see migrate_listing_search.py)
+# bm25 weights follow the FTS column order: titles count most, then reference, places, descriptions
+SEARCH_RANK_SQL = "bm25(listings_fts, 10.0, 10.0, 1.0, 1.0, 3.0, 3.0, 3.0, 5.0)"
+
+def build_search_query(q):
+    """Turns free text into an FTS5 query: every word must match, as a prefix.
+    Quoting each term keeps user input from being parsed as FTS syntax."""
+    terms = re.findall(r"\w+", q or "")
+    return " ".join(f'"{term}"*' for term in terms)
+
+# Listing catalogue snapshot
+def encode_json(value):
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class ListingSnapshot:
+    """The unfiltered GET /properties body, encoded once per change of its tables
+    and then served as-is, with no per-request row conversion."""
+
+    def __init__(self, tables=("listings", "advisors")):
+        self.tables = tables
+        self.version = None
+        self.body = None
+        self.builds = 0
+        self._lock = threading.Lock()
+
+    def get(self, db):
+        version = tuple(table_versions.version(t) for t in self.tables)
+        if self.version == version:
+            return self.body
+        with self._lock:
+            if self.version != version:
+                rows = db.execute("SELECT * FROM listings ORDER BY id ASC").fetchall()
+                self.body = encode_json(advisors.enrich(db, [dict(row) for row in rows]))
+                # Read before building: a write that lands mid-build forces the next rebuild
+                self.version = version
+                self.builds += 1
+            return self.body
+
+listing_snapshot = ListingSnapshot()
 
 # Models
 class LoginRequest(BaseModel):
@@ -331,6 +800,34 @@ class Property(BaseModel):
     latitude: Optional[str] = ""
     longitude: Optional[str] = ""
 
+# Every Property field optional, for PATCH; only the fields sent are written
+PropertyPatch = create_model(
+    "PropertyPatch",
+    **{name: (Optional[field.annotation], None) for name, field in Property.model_fields.items() if name != 'id'},
+)
+
+# Free-text fields normalize_listing_numbers() derives the typed columns from
+LISTING_NUMBER_SOURCES = ['beds', 'baths', 'area', 'plotSize', 'beds_room_count', 'baths_count', 'closed_area', 'plot_area']
+LISTING_NUMBER_COLUMNS = ['beds', 'baths', 'area', 'closed_area_m2', 'plot_area_m2']
+
+JSON_LIST_FIELDS = ['ozellikler_ic', 'ozellikler_dis', 'ozellikler_konum', 'gallery']
+
+def ensure_json(val):
+    if val is None: return "[]"
+    if isinstance(val, (list, dict)):
+        return json.dumps(val)
+    return str(val)
+
+def listing_values(item):
+    """Column values for a Property: list fields JSON-encoded, typed price/number columns filled."""
+    full_data = item.dict()
+    for field in JSON_LIST_FIELDS:
+        if field in full_data:
+            full_data[field] = ensure_json(full_data[field])
+    full_data['price_amount'], full_data['price_currency'] = parse_price(item.price)
+    normalize_listing_numbers(full_data)
+    return full_data
+
 # Routes
 api_router = APIRouter(prefix="/api")
 
@@ -339,121 +836,599 @@ async def root():
     return {"status": "online", "message": "Caria Estates API (SQLite)"}
 
 @api_router.get("/properties")
-async def get_properties(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM listings")
-    rows = cursor.fetchall()
-    properties = [dict(row) for row in rows]
+@db_executor.offload
+def get_properties(
+    request: Request,
+    region: Optional[str] = None,
+    property_type: Optional[str] = None,
+    status: Optional[str] = None,
+    beds_min: Optional[int] = None,
+    beds_max: Optional[int] = None,
+    baths_min: Optional[int] = None,
+    baths_max: Optional[int] = None,
+    price_min: Optional[int] = None,
+    price_max: Optional[int] = None,
+    currency: Optional[str] = None,
+    area_min: Optional[float] = None,
+    area_max: Optional[float] = None,
+    is_featured: Optional[bool] = None,
+    sort: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    page_cursor: Optional[str] = Query(None, alias="cursor"),
+    fields: Optional[str] = None,
+    db: sqlite3.Connection = Depends(get_db),
+):
+    """Listings, optionally filtered. Passing `limit` returns a page with a total count;
+    passing `cursor` (empty for the first page) switches to keyset pagination;
+    `fields` (a preset such as card/map/detail or a column list) narrows each row."""
+    if not request.query_params:
+        # Hot path: the whole catalogue, already encoded
+        return Response(content=listing_snapshot.get(db), media_type="application/json")
+
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    stamp = response_cache.stamp(("listings", "advisors"))
+
+    if sort and sort not in PROPERTY_SORTS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort '{sort}'. Use one of: {', '.join(PROPERTY_SORTS)}")
+    where, params = build_property_filters(
+        region, property_type, status, beds_min, beds_max,
+        baths_min, baths_max, price_min, price_max, is_featured, currency, area_min, area_max,
+    )
+    order = PROPERTY_SORTS.get(sort, ("id", "ASC"))
+    columns, requested = resolve_listing_fields(fields)
+    table, columns = listing_source(columns, requested)
+
+    next_cursor = None
+    if page_cursor is not None:
+        limit = limit or DEFAULT_PAGE_SIZE
+        properties, next_cursor = fetch_keyset_page(
+            db, table, where, params, order, page_cursor, limit, f"properties:{sort or ''}",
+            columns or "*",
+        )
+    else:
+        sql = f"SELECT {columns or '*'} FROM {table}{where} ORDER BY {order_clause(*order)}"
+        if limit:
+            rows = db.execute(sql + " LIMIT ? OFFSET ?", params + [limit, (page - 1) * limit]).fetchall()
+        else:
+            rows = db.execute(sql, params).fetchall()
+        properties = [dict(row) for row in rows]
     
-    # Manually merge static advisor data and map fields
-    for prop in properties:
-        # Map new field names to legacy ones for frontend compatibility
-        map_property_fields(prop)
-        
-        advisor_id = prop.get('advisor_id')
-        if advisor_id:
-            advisor = next((a for a in STATIC_ADVISORS if a['id'] == advisor_id), None)
-            if advisor:
-                prop['advisor_name'] = advisor.get('fullName')
-                prop['advisor_portrait'] = advisor.get('portraitUrl')
-                prop['advisor_slug'] = advisor.get('slug')
-                prop['advisor'] = advisor
+    if table == "listings" and wants_advisor(requested):
+        advisors.enrich(db, properties)
+    properties = project_fields(properties, requested)
+
+    if page_cursor is not None:
+        result = {"items": properties, "next_cursor": next_cursor, "limit": limit}
+    elif not limit:
+        # Without a limit the full (filtered) list is returned, as the frontend expects
+        result = properties
+    else:
+        total = db.execute(f"SELECT COUNT(*) FROM {table}{where}", params).fetchone()[0]
+        result = {"items": properties, "total": total, "page": page, "limit": limit}
 
-    return properties
+    response_cache.set(key, result, ("listings", "advisors"), stamp)
+    return result
 
 @api_router.post("/properties")
-async def add_property(item: Property, db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def add_property(item: Property):
     try:
-        cursor = db.cursor()
-        
-        # 1. Fetch actual column names from the database
-        cursor.execute("PRAGMA table_info(listings)")
-        db_cols = [r[1] for r in cursor.fetchall()]
-
-        # 2. Prepare data mapping
-        def ensure_json(val):
-            if val is None: return "[]"
-            if isinstance(val, (list, dict)):
-                return json.dumps(val)
-            return str(val)
-
-        # Build a dictionary of all potential fields from the item
-        full_data = item.dict()
-        
-        # Special handling for JSON fields
-        json_fields = ['ozellikler_ic', 'ozellikler_dis', 'ozellikler_konum', 'gallery']
-        for field in json_fields:
-            if field in full_data:
-                full_data[field] = ensure_json(full_data[field])
+        # 1. Column names of the listings table
+        db_cols = db_schema.columns("listings")
+
+        # 2. Prepare data mapping (JSON fields, typed columns for SQL range filters and sorting)
+        full_data = listing_values(item)
 
         # Filter out fields that don't exist in the DB
         valid_data = {k: v for k, v in full_data.items() if k in db_cols and k != 'id'}
-        
-        if item.id:
-            # UPDATE flow
-            columns = ", ".join([f"{k}=?" for k in valid_data.keys()])
-            values = list(valid_data.values()) + [item.id]
-            logger.info(f"Updating property ID {item.id} with columns: {list(valid_data.keys())}")
-            cursor.execute(f"UPDATE listings SET {columns} WHERE id=?", values)
-        else:
-            # INSERT flow
-            columns = ", ".join(valid_data.keys())
-            placeholders = ", ".join(["?" for _ in valid_data])
-            values = list(valid_data.values())
-            logger.info(f"Inserting new property with columns: {list(valid_data.keys())}")
-            cursor.execute(f"INSERT INTO listings ({columns}) VALUES ({placeholders})", values)
-            
-        db.commit()
-        return {"status": "success", "id": cursor.lastrowid if not item.id else item.id}
+
+        def write(conn):
+            cursor = conn.cursor()
+            if item.id:
+                # UPDATE flow
+                columns = ", ".join([f"{k}=?" for k in valid_data.keys()])
+                values = list(valid_data.values()) + [item.id]
+                logger.info(f"Updating property ID {item.id} with columns: {list(valid_data.keys())}")
+                cursor.execute(f"UPDATE listings SET {columns} WHERE id=?", values)
+            else:
+                # INSERT flow
+                columns = ", ".join(valid_data.keys())
+                placeholders = ", ".join(["?" for _ in valid_data])
+                values = list(valid_data.values())
+                logger.info(f"Inserting new property with columns: {list(valid_data.keys())}")
+                cursor.execute(f"INSERT INTO listings ({columns}) VALUES ({placeholders})", values)
+            listing_id = item.id or cursor.lastrowid
+            sync_listing_features(cursor, listing_id, full_data)
+            return listing_id
+
+        listing_id = db_writer.submit(write)
+        warning = refresh_similar([listing_id])
+        mark_changed("listings")
+        events.publish("listing", {"id": listing_id, "slug": item.slug, "action": "updated" if item.id else "created"})
+        return with_warning({"status": "success", "id": listing_id}, warning)
     except Exception as e:
         logger.error(f"Error in add_property: {str(e)}")
         import traceback
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+IMPORT_BATCH_SIZE = 500
+
+def upsert_listing_batch(cursor, batch, db_cols):
+    """Upserts [(row, Property)] on slug with one executemany; returns per-row results."""
+    data = [listing_values(item) for _, item in batch]
+    cols = [k for k in data[0] if k in db_cols and k != 'id']
+    slugs = [d['slug'] for d in data]
+    placeholders = ", ".join("?" for _ in slugs)
+
+    cursor.execute(f"SELECT slug FROM listings WHERE slug IN ({placeholders})", slugs)
+    existing = {r[0] for r in cursor.fetchall()}
+    updates = ", ".join(f"{c}=excluded.{c}" for c in cols if c != 'slug')
+    cursor.executemany(
+        f"INSERT INTO listings ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)}) "
+        f"ON CONFLICT(slug) DO UPDATE SET {updates}",
+        [[d[c] for c in cols] for d in data],
+    )
+    cursor.execute(f"SELECT slug, id FROM listings WHERE slug IN ({placeholders})", slugs)
+    ids = dict(cursor.fetchall())
+
+    cursor.executemany("DELETE FROM listing_features WHERE listing_id = ?", [(ids[slug],) for slug in slugs])
+    cursor.executemany(
+        "INSERT INTO listing_features (listing_id, feature_id) VALUES (?, ?)",
+        [(ids[d['slug']], f) for d in data for f in listing_feature_ids(d, FEATURE_LOOKUP)],
+    )
+    return [
+        {"row": row, "slug": item.slug, "id": ids[item.slug],
+         "status": "updated" if item.slug in existing else "inserted"}
+        for row, item in batch
+    ]
+
+def import_listing_batches(conn, batches):
+    cursor = conn.cursor()
+    db_cols = db_schema.columns("listings")
+    results = []
+    for batch in batches:
+        results += upsert_listing_batch(cursor, batch, db_cols)
+    return results
+
+@api_router.post("/properties/import")
+async def import_properties(request: Request):
+    """Bulk upsert on slug from an NDJSON or JSON-array body of Property records.
+    Rows are validated as they stream in; invalid rows are reported and skipped.
+    Every IMPORT_BATCH_SIZE valid rows are written as they arrive, one writer
+    job (and transaction) per batch, so neither the body nor the writer is held
+    for the whole upload. A failed batch ends the import; the batches before it
+    stay written."""
+    results = []
+    batch = []
+    seen = set()
+    failure = None
+
+    async def write_batch():
+        nonlocal failure
+        try:
+            results.extend(await db_executor.run(db_writer.submit, import_listing_batches, [list(batch)]))
+            mark_changed("listings")
+        except Exception as e:
+            logger.error(f"Error in import_properties: {str(e)}")
+            failure = e
+        batch.clear()
+
+    async for row, record in iter_records(request.stream()):
+        if isinstance(record, str):
+            results.append({"row": row, "status": "error", "errors": [record]})
+            continue
+        try:
+            item = Property(**record)
+        except ValidationError as e:
+            errors = [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+            results.append({"row": row, "slug": record.get('slug'), "status": "error", "errors": errors})
+            continue
+        if item.slug in seen:
+            results.append({"row": row, "slug": item.slug, "status": "error", "errors": ["Duplicate slug in import"]})
+            continue
+        seen.add(item.slug)
+        batch.append((row, item))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await write_batch()
+            if failure is not None:
+                break
+    if batch and failure is None:
+        await write_batch()
+
+    results.sort(key=lambda r: r['row'])
+    written = [r['id'] for r in results if r['status'] != 'error']
+    warning = None
+    if written:
+        warning = await db_executor.run(refresh_similar, written)
+        mark_changed("listings")
+    if failure is not None:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: {str(failure)} ({len(written)} rows were written before it)",
+        )
+    counts = {status: sum(1 for r in results if r['status'] == status) for status in ("inserted", "updated", "error")}
+    logger.info(f"Imported listings: {counts}")
+    return with_warning(
+        {"inserted": counts["inserted"], "updated": counts["updated"], "failed": counts["error"], "results": results},
+        warning,
+    )
+
+@api_router.get("/properties/facets")
+@db_executor.offload
+def get_property_facets(
+    request: Request,
+    features: Optional[str] = None,
+    region: Optional[str] = None,
+    property_type: Optional[str] = None,
+    status: Optional[str] = None,
+    price_min: Optional[int] = None,
+    price_max: Optional[int] = None,
+    currency: Optional[str] = None,
+    beds_min: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=200),
+    fields: Optional[str] = "card",
+    db: sqlite3.Connection = Depends(get_db),
+):
+    """Listings having every feature in `features` (ids or titles, comma-separated),
+    plus, for each feature, how many of those listings also have it."""
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    stamp = response_cache.stamp(("listings", "advisors"))
+
+    feature_ids = parse_feature_ids(features)
+    where, params = build_property_filters(
+        region, property_type, status, beds_min, None, None, None, price_min, price_max, None, currency,
+    )
+    if feature_ids:
+        placeholders = ", ".join("?" for _ in feature_ids)
+        predicate = (
+            f"id IN (SELECT listing_id FROM listing_features WHERE feature_id IN ({placeholders})"
+            " GROUP BY listing_id HAVING COUNT(*) = ?)"
+        )
+        where = f"{where} AND {predicate}" if where else f" WHERE {predicate}"
+        params = params + feature_ids + [len(feature_ids)]
+
+    # Per-feature counts and the total over the matching set, in one grouped query
+    counts = dict(db.execute(f"""
+        WITH matched AS (SELECT id FROM listings{where})
+        SELECT feature_id, COUNT(*) FROM listing_features
+        WHERE listing_id IN matched GROUP BY feature_id
+        UNION ALL
+        SELECT NULL, COUNT(*) FROM matched
+    """, params).fetchall())
+    total = counts.pop(None, 0)
+
+    columns, requested = resolve_listing_fields(fields)
+    rows = db.execute(
+        f"SELECT {columns or '*'} FROM listings{where} ORDER BY id ASC LIMIT ?", params + [limit]
+    ).fetchall()
+    items = [dict(row) for row in rows]
+    if wants_advisor(requested):
+        advisors.enrich(db, items)
+
+    result = {
+        "items": project_fields(items, requested),
+        "total": total,
+        "selected": feature_ids,
+        "facets": [
+            {**{k: f[k] for k in ("id", "category", "title_tr", "title_en")}, "count": counts.get(f["id"], 0)}
+            for f in STATIC_FEATURES if f["is_active"]
+        ],
+    }
+    response_cache.set(key, result, ("listings", "advisors"), stamp)
+    return result
+
+@api_router.get("/properties/within")
+@db_executor.offload
+def get_properties_within(
+    request: Request,
+    bbox: str,
+    status: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=2000),
+    fields: Optional[str] = "map",
+    db: sqlite3.Connection = Depends(get_db),
+):
+    """Listings inside the map viewport; bbox is west,south,east,north."""
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    stamp = response_cache.stamp(("listings", "advisors"))
+
+    try:
+        box = parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bbox: {e}")
+
+    columns, requested = resolve_listing_fields(fields)
+    # One row past the limit tells whether the viewport holds more
+    rows = fetch_listings_in_box(db, box, columns, status, limit + 1)
+    truncated = len(rows) > limit
+    rows = rows[:limit]
+    if wants_advisor(requested):
+        advisors.enrich(db, rows)
+    for row in rows:
+        row.pop('_lat')
+        row.pop('_lng')
+
+    result = {"items": project_fields(rows, requested), "count": len(rows), "truncated": truncated}
+    response_cache.set(key, result, ("listings", "advisors"), stamp)
+    return result
+
+@api_router.get("/properties/nearby")
+@db_executor.offload
+def get_properties_nearby(
+    request: Request,
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(5, gt=0, le=200),
+    status: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=500),
+    fields: Optional[str] = "card",
+    db: sqlite3.Connection = Depends(get_db),
+):
+    """Listings within `radius_km` of a point, nearest first, with distance_km."""
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    stamp = response_cache.stamp(("listings", "advisors"))
+
+    columns, requested = resolve_listing_fields(fields)
+    rows = []
+    for row in fetch_listings_in_box(db, bbox_around(lat, lng, radius_km), columns, status):
+        distance = haversine_km(lat, lng, row.pop('_lat'), row.pop('_lng'))
+        if distance <= radius_km:
+            row['distance_km'] = round(distance, 3)
+            rows.append(row)
+    rows.sort(key=lambda r: r['distance_km'])
+    rows = rows[:limit]
+    if wants_advisor(requested):
+        advisors.enrich(db, rows)
+    if requested is not None:
+        requested = requested | {"distance_km"}
+
+    result = {"items": project_fields(rows, requested), "count": len(rows)}
+    response_cache.set(key, result, ("listings", "advisors"), stamp)
+    return result
+
+@api_router.get("/properties/clusters")
+@db_executor.offload
+def get_property_clusters(
+    bbox: str,
+    zoom: int = Query(..., ge=0, le=MAX_ZOOM),
+    db: sqlite3.Connection = Depends(get_db),
+):
+    """Grid clusters (count, centre, price range) for the map viewport at `zoom`.
+    The price range is only given for clusters whose priced listings share a currency.
+    Single-listing clusters carry the listing id and slug."""
+    try:
+        box = parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bbox: {e}")
+    clusters = map_clusters.clusters(db, zoom, box)
+    return {"zoom": zoom, "clusters": clusters, "total": sum(c['count'] for c in clusters)}
+
+@api_router.get("/properties/search")
+@db_executor.offload
+def search_properties(
+    request: Request,
+    q: str,
+    status: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=100),
+    fields: Optional[str] = "card",
+    db: sqlite3.Connection = Depends(get_db),
+):
+    """BM25-ranked full-text search with highlighted snippets."""
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    stamp = response_cache.stamp(("listings", "advisors"))
+
+    match = build_search_query(q)
+    if not match:
+        raise HTTPException(status_code=400, detail="Search query is empty")
+
+    columns, requested = resolve_listing_fields(fields)
+    select = qualified_columns(columns, "l")
+    sql = f"""
+        SELECT {select},
+               highlight(listings_fts, 0, '<mark>', '</mark>') AS title_highlight,
+               snippet(listings_fts, -1, '<mark>', '</mark>', '…', 24) AS snippet,
+               {SEARCH_RANK_SQL} AS rank
+        FROM listings_fts
+        JOIN listings l ON l.id = listings_fts.rowid
+        WHERE listings_fts MATCH ?{" AND l.status = ?" if status else ""}
+        ORDER BY rank
+        LIMIT ?
+    """
+    params = [match] + ([status] if status else []) + [limit]
+    rows = [dict(row) for row in db.execute(sql, params).fetchall()]
+
+    if wants_advisor(requested):
+        advisors.enrich(db, rows)
+    if requested is not None:
+        requested = requested | {"title_highlight", "snippet", "rank"}
+    result = {"query": q, "items": project_fields(rows, requested)}
+    response_cache.set(key, result, ("listings", "advisors"), stamp)
+    return result
+
 @api_router.get("/properties/{slug}")
-async def get_property(slug: str, db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def get_property(slug: str, request: Request, fields: Optional[str] = None, db: sqlite3.Connection = Depends(get_db)):
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    stamp = response_cache.stamp(("listings", "advisors"))
+
+    columns, requested = resolve_listing_fields(fields)
     cursor = db.cursor()
-    cursor.execute("SELECT * FROM listings WHERE slug=?", (slug,))
+    cursor.execute(f"SELECT {columns or '*'} FROM listings WHERE slug=?", (slug,))
     row = cursor.fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Property not found")
     
     prop = dict(row)
-    # Map new field names to legacy ones for frontend compatibility
-    map_property_fields(prop)
-    
-    if prop.get('advisor_id'):
-        cursor.execute("SELECT * FROM advisors WHERE id=?", (prop['advisor_id'],))
-        adv = cursor.fetchone()
-        if adv:
-            prop['advisor'] = dict(adv)
+    if prop.get('advisor_id') and wants_advisor(requested):
+        advisor = advisors.get(db, prop['advisor_id'])
+        if advisor:
+            prop['advisor'] = advisor
+    prop = project_fields([prop], requested)[0]
+    if requested is None:
+        tags = ("listings", "advisors")
+    else:
+        # A sparse detail response only goes stale when one of its own columns changes
+        tags = ("advisors", "listings.slug", *(f"listings.{c}" for c in columns.split(", ")))
+    response_cache.set(key, prop, tags, stamp)
     return prop
 
+@api_router.get("/properties/{slug}/similar")
+@db_executor.offload
+def get_similar_properties(
+    slug: str,
+    request: Request,
+    limit: int = Query(6, ge=1, le=listing_similarity.SIMILAR_K),
+    fields: Optional[str] = "card",
+    db: sqlite3.Connection = Depends(get_db),
+):
+    """Nearest listings by price, rooms, area, region, type and features, with a similarity score."""
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    stamp = response_cache.stamp(("listings", "advisors"))
+
+    listing = db.execute("SELECT id FROM listings WHERE slug=?", (slug,)).fetchone()
+    if not listing:
+        raise HTTPException(status_code=404, detail="Property not found")
+
+    columns, requested = resolve_listing_fields(fields)
+    rows = db.execute(f"""
+        SELECT {qualified_columns(columns, "l")}, s.score AS similarity
+        FROM listing_similar s
+        JOIN listings l ON l.id = s.similar_id
+        WHERE s.listing_id = ?
+        ORDER BY s.rank
+        LIMIT ?
+    """, (listing['id'], limit)).fetchall()
+    rows = [dict(row) for row in rows]
+    if wants_advisor(requested):
+        advisors.enrich(db, rows)
+    if requested is not None:
+        requested = requested | {"similarity"}
+
+    result = {"items": project_fields(rows, requested), "count": len(rows)}
+    response_cache.set(key, result, ("listings", "advisors"), stamp)
+    return result
+
+@api_router.patch("/properties/{id}")
+@db_executor.offload
+def patch_property(id: int, patch: PropertyPatch):
+    """Partial update: writes only the sent fields whose value differs from the
+    stored one (plus the typed columns derived from them). Returns the changed columns.
+    The stored row is read, compared and written in one writer job, so a
+    concurrent PATCH cannot slip in between the read and the write."""
+    changes = patch.model_dump(exclude_unset=True)
+    for field in JSON_LIST_FIELDS:
+        if field in changes:
+            changes[field] = ensure_json(changes[field])
+    if 'price' in changes:
+        changes['price_amount'], changes['price_currency'] = parse_price(changes['price'])
+
+    db_cols = db_schema.columns("listings")
+    needed = set(changes)
+    touches_numbers = any(f in changes for f in LISTING_NUMBER_SOURCES)
+    if touches_numbers:
+        needed |= set(LISTING_NUMBER_SOURCES) | set(LISTING_NUMBER_COLUMNS)
+    touches_features = any(f in changes for f in FEATURE_COLUMNS)
+    if touches_features:
+        needed |= set(FEATURE_COLUMNS)
+    needed = [c for c in db_cols if c in needed]
+
+    def write(conn):
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT id{''.join(', ' + c for c in needed)} FROM listings WHERE id=?", (id,))
+        row = cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Property not found")
+        current = dict(row)
+
+        updates = dict(changes)
+        if touches_numbers:
+            data = {**current, **updates}
+            normalize_listing_numbers(data)
+            updates.update({c: data[c] for c in LISTING_NUMBER_COLUMNS})
+
+        # sqlite stores booleans as 0/1
+        updates = {k: int(v) if isinstance(v, bool) else v for k, v in updates.items() if k in db_cols}
+        changed = {k: v for k, v in updates.items() if current.get(k) != v}
+        if changed:
+            assignments = ", ".join(f"{k}=?" for k in changed)
+            cursor.execute(f"UPDATE listings SET {assignments} WHERE id=?", list(changed.values()) + [id])
+            if any(f in changed for f in FEATURE_COLUMNS):
+                sync_listing_features(cursor, id, {**current, **changed})
+        return changed
+
+    try:
+        changed = db_writer.submit(write)
+    except sqlite3.IntegrityError as e:
+        raise HTTPException(status_code=409, detail=f"Conflict: {str(e)}")
+    if not changed:
+        return {"status": "unchanged", "id": id, "changed": []}
+
+    logger.info(f"Patched property ID {id}: {list(changed)}")
+    warning = None
+    if listing_similarity.VECTOR_COLUMNS & set(changed):
+        warning = refresh_similar([id])
+    mark_columns_changed("listings", list(changed))
+    return with_warning({"status": "success", "id": id, "changed": list(changed)}, warning)
+
 @api_router.delete("/properties/{id}")
-async def delete_property(id: int, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("DELETE FROM listings WHERE id=?", (id,))
-    db.commit()
-    return {"status": "success"}
+@db_executor.offload
+def delete_property(id: int):
+    db_writer.execute("DELETE FROM listings WHERE id=?", (id,))
+    warning = refresh_similar([id])
+    mark_changed("listings")
+    events.publish("listing", {"id": id, "action": "deleted"})
+    return with_warning({"status": "success"}, warning)
 
 # Inquiry Endpoints
 @api_router.get("/inquiries")
-async def get_inquiries(db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def get_inquiries(
+    page_cursor: Optional[str] = Query(None, alias="cursor"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=200),
+    db: sqlite3.Connection = Depends(get_db),
+):
+    if page_cursor is not None:
+        items, next_cursor = fetch_keyset_page(
+            db, "inquiries", "", [], ("created_at", "DESC"), page_cursor, limit, "inquiries"
+        )
+        return {"items": items, "next_cursor": next_cursor, "limit": limit}
     cursor = db.cursor()
     cursor.execute("SELECT * FROM inquiries ORDER BY created_at DESC")
     rows = cursor.fetchall()
     return [dict(row) for row in rows]
 
 @api_router.post("/inquiries")
-async def add_inquiry(item: Inquiry, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("""
+@db_executor.offload
+def add_inquiry(item: Inquiry):
+    result = db_writer.execute("""
         INSERT INTO inquiries (name, email, phone, message, property_id, status)
         VALUES (?, ?, ?, ?, ?, ?)
     """, (item.name, item.email, item.phone, item.message, item.property_id, item.status))
-    db.commit()
-    return {"status": "success", "id": cursor.lastrowid}
+    mark_changed("inquiries")
+    events.publish("inquiry", {**item.dict(), "id": result.lastrowid})
+    return {"status": "success", "id": result.lastrowid}
 
 @api_router.post("/upload")
 async def upload_file(request: Request, file: UploadFile = File(...)):
@@ -469,12 +1444,86 @@ async def upload_file(request: Request, file: UploadFile = File(...)):
     return {"url": url}
 
 @api_router.delete("/inquiries/{id}")
-async def delete_inquiry(id: int, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("DELETE FROM inquiries WHERE id=?", (id,))
-    db.commit()
+@db_executor.offload
+def delete_inquiry(id: int):
+    db_writer.execute("DELETE FROM inquiries WHERE id=?", (id,))
+    mark_changed("inquiries")
     return {"status": "success"}
 
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    return response_cache.stats()
+
+@api_router.get("/db/stats")
+async def get_db_stats():
+    return {**db_pool.stats(), "executor": db_executor.stats(), "writer": db_writer.stats()}
+
+SSE_HEARTBEAT_SECONDS = 15
+
+@api_router.get("/events")
+async def stream_events(request: Request):
+    """Server-Sent Events for the admin dashboard: "inquiry" (the new inquiry),
+    "listing" (id and action) and "change" (tables touched by any write).
+    Reconnecting clients send Last-Event-ID; "reset" means events were missed."""
+    queue = events.subscribe(request.headers.get("last-event-id") or None)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if queue.closed:
+                        break
+                    yield ": ping\n\n"
+                    continue
+                yield format_event(message)
+                if queue.closed and queue.empty():
+                    break
+        finally:
+            events.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@api_router.get("/events/stats")
+async def get_event_stats():
+    return events.stats()
+
+CHANGE_LOG_RETENTION_DAYS = int(os.environ.get('CHANGE_LOG_RETENTION_DAYS', 30))
+
+@api_router.get("/changes")
+@db_executor.offload
+def get_changes(
+    since: Optional[str] = None,
+    tables: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=5000),
+    db: sqlite3.Connection = Depends(get_db),
+):
+    """Rows created, updated or deleted since `since`. Without a token only the
+    current token is returned: load the tables in full, then sync from it.
+    410 means the token is older than the retained history."""
+    names = change_feed.CHANGE_TABLES
+    if tables:
+        names = tuple(t.strip() for t in tables.split(",") if t.strip())
+        unknown = [t for t in names if t not in change_feed.CHANGE_TABLES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown tables: {', '.join(unknown)}")
+    if since is None:
+        return {"token": str(change_feed.current_token(db)), "has_more": False, "changes": {}}
+    try:
+        token = int(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid token")
+    try:
+        return change_feed.changes_since(db, token, names, limit)
+    except change_feed.StaleToken:
+        raise HTTPException(status_code=410, detail="Token expired, reload in full")
+
 # Feature Definitions Endpoints
 @api_router.get("/cms/features")
 async def get_features():
@@ -509,32 +1558,48 @@ async def login(request: LoginRequest):
 
 # CMS Endpoints
 @api_router.get("/cms/sliders")
-async def get_sliders(db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def get_sliders(request: Request, db: sqlite3.Connection = Depends(get_db)):
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    stamp = response_cache.stamp(("sliders",))
+
     cursor = db.cursor()
     cursor.execute("SELECT * FROM sliders WHERE active = 1 ORDER BY display_order")
-    rows = cursor.fetchall()
-    return [dict(row) for row in rows]
+    rows = [dict(row) for row in cursor.fetchall()]
+    response_cache.set(key, rows, ("sliders",), stamp)
+    return rows
 
 @api_router.post("/cms/sliders")
-async def add_slider(item: SliderItem, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("INSERT INTO sliders (title, image_url, link, display_order, active) VALUES (?, ?, ?, ?, ?)",
-                   (item.title, item.image_url, item.link, item.display_order, item.active))
-    db.commit()
-    return {"status": "success", "id": cursor.lastrowid}
+@db_executor.offload
+def add_slider(item: SliderItem):
+    result = db_writer.execute("INSERT INTO sliders (title, image_url, link, display_order, active) VALUES (?, ?, ?, ?, ?)",
+                               (item.title, item.image_url, item.link, item.display_order, item.active))
+    mark_changed("sliders")
+    return {"status": "success", "id": result.lastrowid}
 
 @api_router.get("/cms/content")
-async def get_content(db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def get_content(request: Request, db: sqlite3.Connection = Depends(get_db)):
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    stamp = response_cache.stamp(("site_content",))
+
     cursor = db.cursor()
     cursor.execute("SELECT * FROM site_content")
-    rows = cursor.fetchall()
-    return [dict(row) for row in rows]
+    rows = [dict(row) for row in cursor.fetchall()]
+    response_cache.set(key, rows, ("site_content",), stamp)
+    return rows
 
 @api_router.post("/cms/content")
 @api_router.post("/cms/update")
-async def update_content(item: SiteContent, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("""
+@db_executor.offload
+def update_content(item: SiteContent):
+    db_writer.execute("""
         INSERT INTO site_content (content_key, value_tr, value_en, section)
         VALUES (?, ?, ?, ?)
         ON CONFLICT(content_key) DO UPDATE SET
@@ -542,46 +1607,62 @@ async def update_content(item: SiteContent, db: sqlite3.Connection = Depends(get
         value_en=excluded.value_en,
         section=excluded.section
     """, (item.content_key, item.value_tr, item.value_en, item.section))
-    db.commit()
+    mark_changed("site_content")
     return {"status": "success"}
 
 # Country Guides Endpoints
 @api_router.get("/cms/country-guides")
-async def get_country_guides(db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def get_country_guides(request: Request, db: sqlite3.Connection = Depends(get_db)):
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    stamp = response_cache.stamp(("country_guides",))
+
     cursor = db.cursor()
     cursor.execute("SELECT * FROM country_guides")
-    rows = cursor.fetchall()
-    return [dict(row) for row in rows]
+    rows = [dict(row) for row in cursor.fetchall()]
+    response_cache.set(key, rows, ("country_guides",), stamp)
+    return rows
 
 @api_router.post("/cms/country-guides")
-async def update_country_guide(item: CountryGuide, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
+@db_executor.offload
+def update_country_guide(item: CountryGuide):
     if item.id:
-        cursor.execute("""
+        db_writer.execute("""
             UPDATE country_guides SET 
             country_name_tr=?, country_name_en=?, content_tr=?, content_en=?, image_url=?, slug=?
             WHERE id=?
         """, (item.country_name_tr, item.country_name_en, item.content_tr, item.content_en, item.image_url, item.slug, item.id))
     else:
-        cursor.execute("""
+        db_writer.execute("""
             INSERT INTO country_guides (country_name_tr, country_name_en, content_tr, content_en, image_url, slug)
             VALUES (?, ?, ?, ?, ?, ?)
         """, (item.country_name_tr, item.country_name_en, item.content_tr, item.content_en, item.image_url, item.slug))
-    db.commit()
+    mark_changed("country_guides")
     return {"status": "success"}
 
 # SEO Settings Endpoints
 @api_router.get("/cms/seo")
-async def get_seo_settings(db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def get_seo_settings(request: Request, db: sqlite3.Connection = Depends(get_db)):
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    stamp = response_cache.stamp(("seo_settings",))
+
     cursor = db.cursor()
     cursor.execute("SELECT * FROM seo_settings")
-    rows = cursor.fetchall()
-    return [dict(row) for row in rows]
+    rows = [dict(row) for row in cursor.fetchall()]
+    response_cache.set(key, rows, ("seo_settings",), stamp)
+    return rows
 
 @api_router.post("/cms/seo")
-async def update_seo_settings(item: SEOSetting, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("""
+@db_executor.offload
+def update_seo_settings(item: SEOSetting):
+    db_writer.execute("""
         INSERT INTO seo_settings (page_name, title_tr, title_en, description_tr, description_en, keywords_tr, keywords_en)
         VALUES (?, ?, ?, ?, ?, ?, ?)
         ON CONFLICT(page_name) DO UPDATE SET
@@ -592,12 +1673,22 @@ async def update_seo_settings(item: SEOSetting, db: sqlite3.Connection = Depends
         keywords_tr=excluded.keywords_tr,
         keywords_en=excluded.keywords_en
     """, (item.page_name, item.title_tr, item.title_en, item.description_tr, item.description_en, item.keywords_tr, item.keywords_en))
-    db.commit()
+    mark_changed("seo_settings")
     return {"status": "success"}
 
 # Dynamic Pages Endpoints
 @api_router.get("/cms/pages")
-async def get_pages(db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def get_pages(
+    page_cursor: Optional[str] = Query(None, alias="cursor"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=200),
+    db: sqlite3.Connection = Depends(get_db),
+):
+    if page_cursor is not None:
+        items, next_cursor = fetch_keyset_page(
+            db, "pages", "", [], ("created_at", "DESC"), page_cursor, limit, "pages"
+        )
+        return {"items": items, "next_cursor": next_cursor, "limit": limit}
     cursor = db.cursor()
     cursor.execute("SELECT * FROM pages ORDER BY created_at DESC")
     rows = cursor.fetchall()
@@ -605,7 +1696,8 @@ async def get_pages(db: sqlite3.Connection = Depends(get_db)):
 
 @api_router.get("/cms/pages/{slug}")
 @api_router.get("/pages/{slug}")
-async def get_page_by_slug(slug: str, db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def get_page_by_slug(slug: str, db: sqlite3.Connection = Depends(get_db)):
     cursor = db.cursor()
     cursor.execute("SELECT * FROM pages WHERE slug = ?", (slug,))
     row = cursor.fetchone()
@@ -614,187 +1706,218 @@ async def get_page_by_slug(slug: str, db: sqlite3.Connection = Depends(get_db)):
     return dict(row)
 
 @api_router.post("/cms/pages")
-async def save_page(item: Page, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
+@db_executor.offload
+def save_page(item: Page):
     if item.id:
-        cursor.execute("""
+        result = db_writer.execute("""
             UPDATE pages SET title=?, slug=?, content_html=?, banner_title=?, banner_url=?, active=?, gallery_json=?, updated_at=CURRENT_TIMESTAMP
             WHERE id=?
         """, (item.title, item.slug, item.content_html, item.banner_title, item.banner_url, item.active, item.gallery_json, item.id))
     else:
-        cursor.execute("""
+        result = db_writer.execute("""
             INSERT INTO pages (title, slug, content_html, banner_title, banner_url, active, gallery_json)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         """, (item.title, item.slug, item.content_html, item.banner_title, item.banner_url, item.active, item.gallery_json))
-    db.commit()
-    return {"status": "success", "id": cursor.lastrowid if not item.id else item.id}
+    mark_changed("pages")
+    return {"status": "success", "id": result.lastrowid if not item.id else item.id}
 
 @api_router.delete("/cms/pages/{id}")
-async def delete_page(id: int, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("DELETE FROM pages WHERE id=?", (id,))
-    db.commit()
+@db_executor.offload
+def delete_page(id: int):
+    db_writer.execute("DELETE FROM pages WHERE id=?", (id,))
+    mark_changed("pages")
     return {"status": "success"}
 
 # Menu Endpoints
 @api_router.get("/cms/menus")
-async def get_menus(db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def get_menus(request: Request, db: sqlite3.Connection = Depends(get_db)):
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    stamp = response_cache.stamp(("menus",))
+
     cursor = db.cursor()
     cursor.execute("SELECT * FROM menus ORDER BY display_order ASC")
-    rows = cursor.fetchall()
-    return [dict(row) for row in rows]
+    rows = [dict(row) for row in cursor.fetchall()]
+    response_cache.set(key, rows, ("menus",), stamp)
+    return rows
 
 @api_router.post("/cms/menus")
-async def save_menu(item: Menu, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
+@db_executor.offload
+def save_menu(item: Menu):
     if item.id:
-        cursor.execute("""
+        result = db_writer.execute("""
             UPDATE menus SET title=?, url=?, menu_type=?, display_order=?
             WHERE id=?
         """, (item.title, item.url, item.menu_type, item.display_order, item.id))
     else:
-        cursor.execute("""
+        result = db_writer.execute("""
             INSERT INTO menus (title, url, menu_type, display_order)
             VALUES (?, ?, ?, ?)
         """, (item.title, item.url, item.menu_type, item.display_order))
-    db.commit()
-    return {"status": "success", "id": cursor.lastrowid if not item.id else item.id}
+    mark_changed("menus")
+    return {"status": "success", "id": result.lastrowid if not item.id else item.id}
 
 @api_router.delete("/cms/menus/{id}")
-async def delete_menu(id: int, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("DELETE FROM menus WHERE id=?", (id,))
-    db.commit()
+@db_executor.offload
+def delete_menu(id: int):
+    db_writer.execute("DELETE FROM menus WHERE id=?", (id,))
+    mark_changed("menus")
     return {"status": "success"}
 
 # Homepage Blocks Endpoints
 @api_router.get("/cms/homepage")
 @api_router.get("/homepage/blocks")
-async def get_homepage_blocks(db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def get_homepage_blocks(request: Request, db: sqlite3.Connection = Depends(get_db)):
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    stamp = response_cache.stamp(("homepage_blocks",))
+
     cursor = db.cursor()
     cursor.execute("SELECT * FROM homepage_blocks WHERE active = 1 ORDER BY display_order ASC")
-    rows = cursor.fetchall()
-    return [dict(row) for row in rows]
+    rows = [dict(row) for row in cursor.fetchall()]
+    response_cache.set(key, rows, ("homepage_blocks",), stamp)
+    return rows
 
 @api_router.post("/cms/homepage")
 @api_router.post("/homepage/blocks")
-async def save_homepage_block(item: HomepageBlock, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
+@db_executor.offload
+def save_homepage_block(item: HomepageBlock):
     if item.id:
-        cursor.execute("""
+        result = db_writer.execute("""
             UPDATE homepage_blocks SET 
             block_type=?, title=?, subtitle=?, content=?, image_url=?, video_url=?, display_order=?, active=?, updated_at=CURRENT_TIMESTAMP
             WHERE id=?
         """, (item.block_type, item.title, item.subtitle, item.content, item.image_url, item.video_url, item.display_order, item.active, item.id))
     else:
-        cursor.execute("""
+        result = db_writer.execute("""
             INSERT INTO homepage_blocks (block_type, title, subtitle, content, image_url, video_url, display_order, active)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, (item.block_type, item.title, item.subtitle, item.content, item.image_url, item.video_url, item.display_order, item.active))
-    db.commit()
-    return {"status": "success", "id": cursor.lastrowid if not item.id else item.id}
+    mark_changed("homepage_blocks")
+    return {"status": "success", "id": result.lastrowid if not item.id else item.id}
 
 @api_router.delete("/cms/homepage/{id}")
-async def delete_homepage_block(id: int, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("DELETE FROM homepage_blocks WHERE id=?", (id,))
-    db.commit()
+@db_executor.offload
+def delete_homepage_block(id: int):
+    db_writer.execute("DELETE FROM homepage_blocks WHERE id=?", (id,))
+    mark_changed("homepage_blocks")
     return {"status": "success"}
 
 # Advisor Endpoints
 @api_router.get("/advisors")
-async def get_advisors():
-    """Returns the static advisors list."""
-    return STATIC_ADVISORS
+@db_executor.offload
+def get_advisors(db: sqlite3.Connection = Depends(get_db)):
+    """Every advisor by id: those added in the admin, and the static ones they don't replace."""
+    return advisors.all(db)
 
 @api_router.get("/advisors/{slug}")
-async def get_advisor_by_slug(slug: str, db: sqlite3.Connection = Depends(get_db)):
-    # Check static advisors first
-    static_advisor = next((a for a in STATIC_ADVISORS if a['slug'] == slug), None)
-    if static_advisor:
-        # For static advisors, we just return the data (they might have no listings in DB yet)
-        advisor = {**static_advisor}
-        # Attempt to fetch listings anyway
-        cursor = db.cursor()
-        cursor.execute("SELECT * FROM listings WHERE advisor_id = ? AND status='published'", (advisor['id'],))
-        advisor['listings'] = [dict(r) for r in cursor.fetchall()]
-        return advisor
-
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM advisors WHERE slug = ?", (slug,))
-    row = cursor.fetchone()
-    if not row:
+@db_executor.offload
+def get_advisor_by_slug(slug: str, db: sqlite3.Connection = Depends(get_db)):
+    found = advisors.get_by_slug(db, slug)
+    if not found:
         raise HTTPException(status_code=404, detail="Advisor not found")
-    
-    advisor = dict(row)
-    
-    if not advisor.get('isActive'):
+
+    if not found.get('isActive'):
         # Return restricted data if inactive
-        return {"name": advisor['fullName'], "isActive": False, "status": "Advisor not available"}
+        return {"name": found.get('fullName', ''), "isActive": False, "status": "Advisor not available"}
 
+    advisor = {**found}
     # Also fetch this advisor's listings (PUBLIC: only published)
+    cursor = db.cursor()
     cursor.execute("SELECT * FROM listings WHERE advisor_id = ? AND status='published'", (advisor['id'],))
     advisor['listings'] = [dict(r) for r in cursor.fetchall()]
-    
-    advisor['name'] = advisor.get('fullName', '')
     return advisor
 
 @api_router.get("/advisors/{id}/listings")
-async def get_advisor_listings(id: int, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM listings WHERE advisor_id = ?", (id,))
-    rows = cursor.fetchall()
-    return [dict(row) for row in rows]
+@db_executor.offload
+def get_advisor_listings(
+    id: int,
+    page_cursor: Optional[str] = Query(None, alias="cursor"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=200),
+    fields: Optional[str] = None,
+    db: sqlite3.Connection = Depends(get_db),
+):
+    columns, requested = resolve_listing_fields(fields)
+    table, columns = listing_source(columns, requested)
+    next_cursor = None
+    if page_cursor is not None:
+        items, next_cursor = fetch_keyset_page(
+            db, table, " WHERE advisor_id = ?", [id], ("id", "ASC"), page_cursor, limit, f"advisor:{id}",
+            columns or "*",
+        )
+    else:
+        cursor = db.cursor()
+        cursor.execute(f"SELECT {columns or '*'} FROM {table} WHERE advisor_id = ?", (id,))
+        items = [dict(row) for row in cursor.fetchall()]
+
+    if table == "listings" and requested is not None and wants_advisor(requested):
+        advisors.enrich(db, items)
+    items = project_fields(items, requested)
+    if page_cursor is not None:
+        return {"items": items, "next_cursor": next_cursor, "limit": limit}
+    return items
 
 @api_router.post("/advisors")
-async def save_advisor(item: Advisor, db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def save_advisor(item: Advisor):
     try:
-        cursor = db.cursor()
         logger.info(f"Saving advisor: {item.name}")
-    
-        # Slug generation if missing
-        if not item.slug:
-            import re
-            base_slug = item.name.lower().replace(" ", "-") if item.name else "advisor"
-            base_slug = re.sub(r'[^\w\-]', '', base_slug)
-            if not base_slug: base_slug = "advisor"
-            slug = base_slug
-            counter = 1
-            while True:
-                cursor.execute("SELECT id FROM advisors WHERE slug = ? AND id != ?", (slug, item.id or -1))
-                if not cursor.fetchone():
-                    break
-                counter += 1
-                slug = f"{base_slug}-{counter}"
-            item.slug = slug
 
-        if item.id:
-            cursor.execute("""
-                UPDATE advisors SET 
-                    fullName=?, slug=?, title_tr=?, title_en=?, email=?, phone=?, 
-                    whatsappPhone=?, portraitUrl=?, coverImageUrl=?, bioRichTextTR=?, bioRichTextEN=?, 
-                    languages=?, regions=?, specialties=?, socialLinks=?, isActive=?
-                WHERE id=?
-            """, (
-                item.name, item.slug, item.title_tr, item.title_en, item.email, item.phone,
-                item.whatsappPhone, item.portraitUrl, item.coverImageUrl, item.bioRichTextTR, item.bioRichTextEN,
-                item.languages, item.regions, item.specialties, item.socialLinks, item.isActive, item.id
-            ))
-        else:
-            cursor.execute("""
-                INSERT INTO advisors (
-                    fullName, slug, title_tr, title_en, email, phone, 
-                    whatsappPhone, portraitUrl, coverImageUrl, bioRichTextTR, bioRichTextEN, 
-                    languages, regions, specialties, socialLinks, isActive
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                item.name, item.slug, item.title_tr, item.title_en, item.email, item.phone,
-                item.whatsappPhone, item.portraitUrl, item.coverImageUrl, item.bioRichTextTR, item.bioRichTextEN,
-                item.languages, item.regions, item.specialties, item.socialLinks, item.isActive
-            ))
-        db.commit()
-        return {"status": "success", "id": cursor.lastrowid if not item.id else item.id}
+        # Slug lookup and write share one job, so two saves can't claim the same slug
+        def write(conn):
+            cursor = conn.cursor()
+            # Slug generation if missing
+            if not item.slug:
+                import re
+                base_slug = item.name.lower().replace(" ", "-") if item.name else "advisor"
+                base_slug = re.sub(r'[^\w\-]', '', base_slug)
+                if not base_slug: base_slug = "advisor"
+                slug = base_slug
+                counter = 1
+                while True:
+                    cursor.execute("SELECT id FROM advisors WHERE slug = ? AND id != ?", (slug, item.id or -1))
+                    if not cursor.fetchone():
+                        break
+                    counter += 1
+                    slug = f"{base_slug}-{counter}"
+                item.slug = slug
+
+            if item.id:
+                cursor.execute("""
+                    UPDATE advisors SET 
+                        fullName=?, slug=?, title_tr=?, title_en=?, email=?, phone=?, 
+                        whatsappPhone=?, portraitUrl=?, coverImageUrl=?, bioRichTextTR=?, bioRichTextEN=?, 
+                        languages=?, regions=?, specialties=?, socialLinks=?, isActive=?
+                    WHERE id=?
+                """, (
+                    item.name, item.slug, item.title_tr, item.title_en, item.email, item.phone,
+                    item.whatsappPhone, item.portraitUrl, item.coverImageUrl, item.bioRichTextTR, item.bioRichTextEN,
+                    item.languages, item.regions, item.specialties, item.socialLinks, item.isActive, item.id
+                ))
+            else:
+                cursor.execute("""
+                    INSERT INTO advisors (
+                        fullName, slug, title_tr, title_en, email, phone, 
+                        whatsappPhone, portraitUrl, coverImageUrl, bioRichTextTR, bioRichTextEN, 
+                        languages, regions, specialties, socialLinks, isActive
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    item.name, item.slug, item.title_tr, item.title_en, item.email, item.phone,
+                    item.whatsappPhone, item.portraitUrl, item.coverImageUrl, item.bioRichTextTR, item.bioRichTextEN,
+                    item.languages, item.regions, item.specialties, item.socialLinks, item.isActive
+                ))
+            return cursor.lastrowid if not item.id else item.id
+
+        advisor_id = db_writer.submit(write)
+        mark_changed("advisors")
+        return {"status": "success", "id": advisor_id}
     except Exception as e:
         logger.error(f"Error saving advisor: {str(e)}")
         import traceback
@@ -802,12 +1925,27 @@ async def save_advisor(item: Advisor, db: sqlite3.Connection = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.delete("/advisors/{id}")
-async def delete_advisor(id: int, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("DELETE FROM advisors WHERE id=?", (id,))
-    db.commit()
+@db_executor.offload
+def delete_advisor(id: int):
+    db_writer.execute("DELETE FROM advisors WHERE id=?", (id,))
+    mark_changed("advisors")
     return {"status": "success"}
 
+@app.on_event("startup")
+def prepare_database():
+    schema.migrate(DB_PATH, STATIC_FEATURES, STATIC_ADVISORS)
+    with sqlite3.connect(DB_PATH) as conn:
+        db_schema.load(conn)
+        change_feed.prune(conn, CHANGE_LOG_RETENTION_DAYS)
+        conn.row_factory = sqlite3.Row
+        listing_snapshot.get(conn)
+
+@app.on_event("shutdown")
+def close_database():
+    db_executor.shutdown()
+    db_writer.close()
+    db_pool.close_all()
+
 if __name__ == "__main__":
     import uvicorn
     # Seed initial CMS pages if they don't exist
@@ -843,7 +1981,8 @@ class CMSPage(BaseModel):
 
 # Get all CMS pages (with optional category filter)
 @api_router.get("/cms-blocks/pages")
-async def get_cms_pages_list(category: Optional[str] = None, db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def get_cms_pages_list(category: Optional[str] = None, db: sqlite3.Connection = Depends(get_db)):
     cursor = db.cursor()
     if category:
         cursor.execute("SELECT * FROM pages WHERE category = ? AND active = 1 ORDER BY sort_order ASC", (category,))
@@ -854,7 +1993,14 @@ async def get_cms_pages_list(category: Optional[str] = None, db: sqlite3.Connect
 
 # Get single CMS page with blocks
 @api_router.get("/cms-blocks/page/{slug}")
-async def get_cms_page_full(slug: str, db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def get_cms_page_full(slug: str, request: Request, db: sqlite3.Connection = Depends(get_db)):
+    key = cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    stamp = response_cache.stamp(("pages", "page_blocks"))
+
     cursor = db.cursor()
     
     # Get page
@@ -881,14 +2027,14 @@ async def get_cms_page_full(slug: str, db: sqlite3.Connection = Depends(get_db))
             block['block_data'] = {}
     
     page['blocks'] = blocks
+    response_cache.set(key, page, ("pages", "page_blocks"), stamp)
     return page
 
 # Save CMS page with blocks
 @api_router.post("/cms-blocks/page")
-async def save_cms_page_full(page_data: dict, db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def save_cms_page_full(page_data: dict):
     try:
-        cursor = db.cursor()
-        
         page_id = page_data.get('id')
         blocks = page_data.get('blocks', [])
         
@@ -899,67 +2045,71 @@ async def save_cms_page_full(page_data: dict, db: sqlite3.Connection = Depends(g
             import re
             slug = re.sub(r'[^a-z0-9-]', '', slug)
         
-        if page_id:
-            # Update existing page
-            cursor.execute("""
-                UPDATE pages SET 
-                    title = ?, slug = ?, category = ?, status = ?,
-                    hero_image = ?, hero_title = ?, hero_subtitle = ?,
-                    seo_title = ?, seo_description = ?, sort_order = ?,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (
-                page_data.get('title', ''),
-                slug,
-                page_data.get('category', 'general'),
-                page_data.get('status', 'published'),
-                page_data.get('hero_image', ''),
-                page_data.get('hero_title', ''),
-                page_data.get('hero_subtitle', ''),
-                page_data.get('seo_title', ''),
-                page_data.get('seo_description', ''),
-                page_data.get('sort_order', 0),
-                page_id
-            ))
-        else:
-            # Insert new page
-            cursor.execute("""
-                INSERT INTO pages (title, slug, category, status, hero_image, hero_title, hero_subtitle, seo_title, seo_description, sort_order, active)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
-            """, (
-                page_data.get('title', ''),
-                slug,
-                page_data.get('category', 'general'),
-                page_data.get('status', 'published'),
-                page_data.get('hero_image', ''),
-                page_data.get('hero_title', ''),
-                page_data.get('hero_subtitle', ''),
-                page_data.get('seo_title', ''),
-                page_data.get('seo_description', ''),
-                page_data.get('sort_order', 0)
-            ))
-            page_id = cursor.lastrowid
-        
-        # Delete existing blocks and re-insert
-        cursor.execute("DELETE FROM page_blocks WHERE page_id = ?", (page_id,))
-        
-        # Insert blocks
-        for idx, block in enumerate(blocks):
-            block_data = block.get('block_data', {})
-            if isinstance(block_data, dict):
-                block_data = json.dumps(block_data)
-            
-            cursor.execute("""
-                INSERT INTO page_blocks (page_id, block_type, block_data, sort_order, active)
-                VALUES (?, ?, ?, ?, 1)
-            """, (
-                page_id,
-                block.get('block_type', 'TEXT_SECTION'),
-                block_data,
-                idx
-            ))
-        
-        db.commit()
+        def write(conn, page_id):
+            cursor = conn.cursor()
+            if page_id:
+                # Update existing page
+                cursor.execute("""
+                    UPDATE pages SET 
+                        title = ?, slug = ?, category = ?, status = ?,
+                        hero_image = ?, hero_title = ?, hero_subtitle = ?,
+                        seo_title = ?, seo_description = ?, sort_order = ?,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (
+                    page_data.get('title', ''),
+                    slug,
+                    page_data.get('category', 'general'),
+                    page_data.get('status', 'published'),
+                    page_data.get('hero_image', ''),
+                    page_data.get('hero_title', ''),
+                    page_data.get('hero_subtitle', ''),
+                    page_data.get('seo_title', ''),
+                    page_data.get('seo_description', ''),
+                    page_data.get('sort_order', 0),
+                    page_id
+                ))
+            else:
+                # Insert new page
+                cursor.execute("""
+                    INSERT INTO pages (title, slug, category, status, hero_image, hero_title, hero_subtitle, seo_title, seo_description, sort_order, active)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+                """, (
+                    page_data.get('title', ''),
+                    slug,
+                    page_data.get('category', 'general'),
+                    page_data.get('status', 'published'),
+                    page_data.get('hero_image', ''),
+                    page_data.get('hero_title', ''),
+                    page_data.get('hero_subtitle', ''),
+                    page_data.get('seo_title', ''),
+                    page_data.get('seo_description', ''),
+                    page_data.get('sort_order', 0)
+                ))
+                page_id = cursor.lastrowid
+
+            # Delete existing blocks and re-insert
+            cursor.execute("DELETE FROM page_blocks WHERE page_id = ?", (page_id,))
+
+            # Insert blocks
+            for idx, block in enumerate(blocks):
+                block_data = block.get('block_data', {})
+                if isinstance(block_data, dict):
+                    block_data = json.dumps(block_data)
+
+                cursor.execute("""
+                    INSERT INTO page_blocks (page_id, block_type, block_data, sort_order, active)
+                    VALUES (?, ?, ?, ?, 1)
+                """, (
+                    page_id,
+                    block.get('block_type', 'TEXT_SECTION'),
+                    block_data,
+                    idx
+                ))
+            return page_id
+
+        page_id = db_writer.submit(write, page_id)
+        mark_changed("pages", "page_blocks")
         return {"status": "success", "id": page_id, "slug": slug}
     except Exception as e:
         logger.error(f"Error saving CMS page: {str(e)}")
@@ -967,18 +2117,24 @@ async def save_cms_page_full(page_data: dict, db: sqlite3.Connection = Depends(g
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+def delete_page_with_blocks(conn, page_id):
+    # Delete blocks first
+    conn.execute("DELETE FROM page_blocks WHERE page_id = ?", (page_id,))
+    # Delete page
+    conn.execute("DELETE FROM pages WHERE id = ?", (page_id,))
+
 # Delete CMS page
 @api_router.delete("/cms/pages/full/{page_id}")
-async def delete_cms_page_full(page_id: int, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("DELETE FROM page_blocks WHERE page_id = ?", (page_id,))
-    cursor.execute("DELETE FROM pages WHERE id = ?", (page_id,))
-    db.commit()
+@db_executor.offload
+def delete_cms_page_full(page_id: int):
+    db_writer.submit(delete_page_with_blocks, page_id)
+    mark_changed("pages", "page_blocks")
     return {"status": "success"}
 
 # Get pages by category (for menus)
 @api_router.get("/cms-blocks/pages/category/{category}")
-async def get_pages_by_category(category: str, db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def get_pages_by_category(category: str, db: sqlite3.Connection = Depends(get_db)):
     cursor = db.cursor()
     cursor.execute("""
         SELECT id, title, slug, hero_title, sort_order 
@@ -991,7 +2147,8 @@ async def get_pages_by_category(category: str, db: sqlite3.Connection = Depends(
 
 # Block CRUD Endpoints
 @api_router.get("/cms-blocks/pages/{page_id}/blocks")
-async def get_page_blocks(page_id: int, db: sqlite3.Connection = Depends(get_db)):
+@db_executor.offload
+def get_page_blocks(page_id: int, db: sqlite3.Connection = Depends(get_db)):
     cursor = db.cursor()
     cursor.execute("""
         SELECT id, page_id, block_type, block_data, sort_order, active 
@@ -1011,26 +2168,28 @@ async def get_page_blocks(page_id: int, db: sqlite3.Connection = Depends(get_db)
     return blocks
 
 @api_router.post("/cms-blocks/pages/{page_id}/blocks")
-async def create_page_block(page_id: int, request: Request, db: sqlite3.Connection = Depends(get_db)):
-    data = await request.json()
-    cursor = db.cursor()
-    
-    # Get max sort_order
-    cursor.execute("SELECT COALESCE(MAX(sort_order), 0) + 1 FROM page_blocks WHERE page_id = ?", (page_id,))
-    sort_order = cursor.fetchone()[0]
-    
-    cursor.execute("""
-        INSERT INTO page_blocks (page_id, block_type, block_data, sort_order, active)
-        VALUES (?, ?, ?, ?, ?)
-    """, (page_id, data.get('block_type'), json.dumps(data.get('data', {})), sort_order, 1))
-    db.commit()
-    return {"id": cursor.lastrowid, "message": "Block created"}
+@db_executor.offload
+def create_page_block(page_id: int, data: dict = Body(...)):
+    def write(conn):
+        cursor = conn.cursor()
+
+        # Get max sort_order
+        cursor.execute("SELECT COALESCE(MAX(sort_order), 0) + 1 FROM page_blocks WHERE page_id = ?", (page_id,))
+        sort_order = cursor.fetchone()[0]
+
+        cursor.execute("""
+            INSERT INTO page_blocks (page_id, block_type, block_data, sort_order, active)
+            VALUES (?, ?, ?, ?, ?)
+        """, (page_id, data.get('block_type'), json.dumps(data.get('data', {})), sort_order, 1))
+        return cursor.lastrowid
+
+    block_id = db_writer.submit(write)
+    mark_changed("page_blocks")
+    return {"id": block_id, "message": "Block created"}
 
 @api_router.put("/cms-blocks/blocks/{block_id}")
-async def update_block(block_id: int, request: Request, db: sqlite3.Connection = Depends(get_db)):
-    data = await request.json()
-    cursor = db.cursor()
-    
+@db_executor.offload
+def update_block(block_id: int, data: dict = Body(...)):
     updates = []
     params = []
     
@@ -1049,41 +2208,92 @@ async def update_block(block_id: int, request: Request, db: sqlite3.Connection =
     
     if updates:
         params.append(block_id)
-        cursor.execute(f"UPDATE page_blocks SET {', '.join(updates)} WHERE id = ?", params)
-        db.commit()
+        db_writer.execute(f"UPDATE page_blocks SET {', '.join(updates)} WHERE id = ?", params)
+        mark_changed("page_blocks")
     
     return {"message": "Block updated"}
 
 @api_router.delete("/cms-blocks/blocks/{block_id}")
-async def delete_block(block_id: int, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("DELETE FROM page_blocks WHERE id = ?", (block_id,))
-    db.commit()
+@db_executor.offload
+def delete_block(block_id: int):
+    db_writer.execute("DELETE FROM page_blocks WHERE id = ?", (block_id,))
+    mark_changed("page_blocks")
     return {"message": "Block deleted"}
 
 @api_router.put("/cms-blocks/pages/{page_id}/blocks/reorder")
-async def reorder_blocks(page_id: int, request: Request, db: sqlite3.Connection = Depends(get_db)):
-    data = await request.json()
+@db_executor.offload
+def reorder_blocks(page_id: int, data: dict = Body(...)):
     block_ids = data.get('block_ids', [])
-    cursor = db.cursor()
-    
-    for idx, block_id in enumerate(block_ids):
-        cursor.execute("UPDATE page_blocks SET sort_order = ? WHERE id = ? AND page_id = ?", (idx, block_id, page_id))
-    
-    db.commit()
+    db_writer.submit(lambda conn: conn.executemany(
+        "UPDATE page_blocks SET sort_order = ? WHERE id = ? AND page_id = ?",
+        [(idx, block_id, page_id) for idx, block_id in enumerate(block_ids)],
+    ))
+    mark_changed("page_blocks")
     return {"message": "Blocks reordered"}
 
 @api_router.delete("/cms-blocks/pages/{page_id}")
-async def delete_cms_page(page_id: int, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    # Delete blocks first
-    cursor.execute("DELETE FROM page_blocks WHERE page_id = ?", (page_id,))
-    # Delete page
-    cursor.execute("DELETE FROM pages WHERE id = ?", (page_id,))
-    db.commit()
+@db_executor.offload
+def delete_cms_page(page_id: int):
+    db_writer.submit(delete_page_with_blocks, page_id)
+    mark_changed("pages", "page_blocks")
     return {"message": "Page and blocks deleted"}
 
+# ============================================
+# SITEMAP
+# ============================================
 
+# Frontend routes per source table. Country guides have no page of their own
+# in the SPA (they are shown on the home page), so they are not listed.
+SITEMAP_ROUTES = {
+    "listings": "/properties/{slug}",
+    "pages": "/{slug}",
+    "advisors": "/advisor/{slug}",
+}
+SITEMAP_HIDDEN_STATUSES = ("draft", "passive", "inactive")
+sitemaps = SitemapCache(os.environ.get('SITEMAP_CACHE_DIR', str(ROOT_DIR / 'sitemap_cache')))
+
+def iter_sitemap_urls(db, base_url):
+    placeholders = ", ".join("?" for _ in SITEMAP_HIDDEN_STATUSES)
+    for slug, updated in db.execute(f"""
+        SELECT slug, updated_at FROM listings
+        WHERE slug IS NOT NULL AND slug != '' AND COALESCE(status, '') NOT IN ({placeholders})
+        ORDER BY id
+    """, SITEMAP_HIDDEN_STATUSES):
+        yield base_url + url_path(SITEMAP_ROUTES["listings"], slug), lastmod(updated)
+    for slug, updated in db.execute(
+        "SELECT slug, updated_at FROM pages WHERE status = 'published' AND active = 1 ORDER BY sort_order, id"
+    ):
+        yield base_url + url_path(SITEMAP_ROUTES["pages"], slug), lastmod(updated)
+    for advisor in advisors.all(db):
+        if advisor.get('isActive') and advisor.get('slug'):
+            yield base_url + url_path(SITEMAP_ROUTES["advisors"], advisor['slug']), lastmod(advisor.get('created_at'))
+
+def sitemap_signature(db):
+    """Changes whenever a listed URL may have: the change_log token moves on every
+    listing or page write, and advisors (which have no change log) and the route
+    set are hashed. Unlike table_versions it means the same after a restart."""
+    listed = [(a.get('slug'), bool(a.get('isActive')), str(a.get('created_at'))) for a in advisors.all(db)]
+    digest = hashlib.sha1(json.dumps([SITEMAP_ROUTES, SITEMAP_HIDDEN_STATUSES, listed]).encode()).hexdigest()
+    return f"{change_feed.current_token(db)}:{digest[:16]}"
+
+def sitemap_response(request: Request, db, name):
+    base_url = (os.environ.get('SITE_URL') or str(request.base_url)).rstrip('/')
+    signature = sitemap_signature(db)
+    files = sitemaps.ensure(signature, base_url, lambda: iter_sitemap_urls(db, base_url))
+    if name not in files:
+        raise HTTPException(status_code=404, detail="Sitemap not found")
+    return FileResponse(sitemaps.path(name), media_type="application/xml")
+
+# Served from the site root: a sitemap may only list URLs below its own location
+@app.get("/sitemap.xml")
+@db_executor.offload
+def get_sitemap(request: Request, db: sqlite3.Connection = Depends(get_db)):
+    return sitemap_response(request, db, "sitemap.xml")
+
+@app.get("/sitemap-{part}.xml")
+@db_executor.offload
+def get_sitemap_part(part: int, request: Request, db: sqlite3.Connection = Depends(get_db)):
+    return sitemap_response(request, db, f"sitemap-{part}.xml")
 
 app.include_router(api_router)
 
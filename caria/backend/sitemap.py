@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+# sitemap.xml generation.
+# URLs are streamed from the database straight into files in the cache
+# directory, so memory stays flat however many listings there are. Above
+# MAX_URLS per file the output is split into sitemap-N.xml parts plus a
+# sitemap index. Files are rebuilt only when the signature passed in changes;
+# until then they are served from disk. The signature of the files on disk is
+# kept next to them (SIGNATURE_FILE), so a restart or another worker sharing
+# the directory reuses them instead of rebuilding. Every file is written aside
+# and renamed into place, the signature last.
+
+MAX_URLS = 50000
+SIGNATURE_FILE = "sitemap.json"
+XMLNS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+def lastmod(value):
+    """W3C date from a SQLite timestamp ("2024-05-01 10:00:00"), or None."""
+    if not value:
+        return None
+    return str(value)[:10]
+
+
+def url_path(template, slug):
+    return template.format(slug=quote(str(slug), safe=""))
+
+
+class SitemapCache:
+    def __init__(self, cache_dir, max_urls=MAX_URLS):
+        self.cache_dir = cache_dir
+        self.max_urls = max_urls
+        self.signature = None
+        self.files = []
+        self.builds = 0
+        self._lock = threading.Lock()
+
+    def ensure(self, signature, base_url, iter_urls):
+        """Returns the file names making up the sitemap ("sitemap.xml" first),
+        rebuilding them when `signature` (a str that survives restarts) or
+        `base_url` changed since the last build.
+        `iter_urls()` yields (absolute url, lastmod or None)."""
+        key = [signature, base_url]
+        if self.signature == key:
+            return self.files
+        with self._lock:
+            if self.signature != key:
+                self._adopt()
+            if self.signature != key:
+                self.files = self._build(base_url, iter_urls)
+                self.signature = key
+                self.builds += 1
+                self._save()
+            return self.files
+
+    def path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _build(self, base_url, iter_urls):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+        parts = []
+        out = None
+        count = 0
+        for loc, modified in iter_urls():
+            if out is None or count == self.max_urls:
+                if out is not None:
+                    self._close_urlset(out)
+                parts.append(f"sitemap-{len(parts) + 1}.xml")
+                out = open(self.path(parts[-1]) + suffix, "w", encoding="utf-8")
+                out.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{XMLNS}">\n')
+                count = 0
+            out.write(f"<url><loc>{escape(loc)}</loc>")
+            if modified:
+                out.write(f"<lastmod>{modified}</lastmod>")
+            out.write("</url>\n")
+            count += 1
+        if out is None:
+            parts.append("sitemap-1.xml")
+            out = open(self.path(parts[-1]) + suffix, "w", encoding="utf-8")
+            out.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{XMLNS}">\n')
+        self._close_urlset(out)
+
+        if len(parts) == 1:
+            os.replace(self.path(parts[0]) + suffix, self.path("sitemap.xml") + suffix)
+            files = ["sitemap.xml"]
+        else:
+            # Parts must be in place before the index that points at them
+            for name in parts:
+                os.replace(self.path(name) + suffix, self.path(name))
+            today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+            with open(self.path("sitemap.xml") + suffix, "w", encoding="utf-8") as index:
+                index.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{XMLNS}">\n')
+                for name in parts:
+                    index.write(f"<sitemap><loc>{escape(base_url + '/' + name)}</loc><lastmod>{today}</lastmod></sitemap>\n")
+                index.write("</sitemapindex>\n")
+            files = ["sitemap.xml"] + parts
+        os.replace(self.path("sitemap.xml") + suffix, self.path("sitemap.xml"))
+        return files
+
+    def _adopt(self):
+        """Takes over the files on disk, as recorded in SIGNATURE_FILE, if they are all there."""
+        try:
+            with open(self.path(SIGNATURE_FILE), encoding="utf-8") as f:
+                saved = json.load(f)
+            signature, files = saved["signature"], saved["files"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        if files and all(os.path.exists(self.path(name)) for name in files):
+            self.signature, self.files = signature, files
+
+    def _save(self):
+        temp = self.path(SIGNATURE_FILE) + f".{os.getpid()}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump({"signature": self.signature, "files": self.files}, f)
+        os.replace(temp, self.path(SIGNATURE_FILE))
+
+    @staticmethod
+    def _close_urlset(out):
+        out.write("</urlset>\n")
+        out.close()
@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+# The backend is a flat set of modules run from its own directory (uvicorn server:app)
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+# Imported below: keep the sitemap files of a test run out of the backend directory
+os.environ.setdefault("SITEMAP_CACHE_DIR", tempfile.mkdtemp(prefix="caria-sitemaps-"))
+
+import server  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+@contextmanager
+def running_app(db_path, sitemap_dir):
+    """The API on a fresh database at `db_path`, migrated as at startup.
+
+    Versions, caches and registries are module state keyed on in-memory table
+    versions, so each app gets new ones instead of inheriting another
+    database's. The executor outlives the app: the client is used without its
+    lifespan, whose shutdown would stop the executor for every later test."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(server, "DB_PATH", Path(db_path))
+        mp.setattr(server.db_pool, "path", str(db_path))
+        mp.setattr(server.db_writer, "path", str(db_path))
+        mp.setattr(server, "table_versions", server.TableVersions())
+        mp.setattr(server, "response_cache", server.ResponseCache(
+            server.response_cache.max_entries, server.response_cache.version_fn))
+        mp.setattr(server, "events", server.EventBroker())
+        mp.setattr(server, "listing_snapshot", server.ListingSnapshot())
+        mp.setattr(server, "map_clusters", server.ClusterIndex(
+            server.load_cluster_points,
+            lambda: server.table_versions.columns_version("listings", server.CLUSTER_COLUMNS)))
+        mp.setattr(server, "advisors", server.AdvisorRegistry(
+            server.STATIC_ADVISORS, lambda: server.table_versions.version("advisors")))
+        mp.setattr(server, "sitemaps", server.SitemapCache(str(sitemap_dir)))
+        mp.setattr(server, "listing_vectors", server.listing_similarity.ListingVectors())
+        server.prepare_database()
+        try:
+            yield TestClient(server.app)
+        finally:
+            server.db_writer.close()
+            server.db_pool.close_all()
+
+
+@pytest.fixture
+def client(tmp_path):
+    with running_app(tmp_path / "caria.db", tmp_path / "sitemaps") as client:
+        yield client
+
+
+@pytest.fixture
+def add_listing(client):
+    """add_listing(slug, **fields) creates a listing through the API and returns its id."""
+    def add(slug, **fields):
+        response = client.post("/api/properties", json={"slug": slug, "title": slug.replace("-", " ").title(), **fields})
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+    return add
@@ -0,0 +1,73 @@
+import server
+
+
+def add_advisor(advisor_id, name, slug):
+    server.db_writer.execute(
+        "INSERT INTO advisors (id, fullName, slug, email, phone, portraitUrl, isActive) VALUES (?, ?, ?, ?, ?, ?, 1)",
+        (advisor_id, name, slug, f"{slug}@cariaestates.com", "+90 548 000 0000", f"{slug}.jpg"),
+    )
+    server.mark_changed("advisors")
+
+
+def card_advisor(client, slug):
+    """The advisor name as the card table and the detail endpoint report it."""
+    card = client.get("/api/properties", params={"fields": "card"}).json()[0]
+    detail = client.get(f"/api/properties/{slug}").json()
+    return card["advisor_name"], detail["advisor"]["fullName"]
+
+
+def test_static_advisors_are_the_fallback(client, add_listing):
+    add_listing("villa", advisor_id=1)
+    static = server.STATIC_ADVISORS[0]
+    assert card_advisor(client, "villa") == (static["fullName"], static["fullName"])
+    assert client.get(f"/api/advisors/{static['slug']}").json()["id"] == 1
+
+
+def test_database_advisors_resolve_by_id_and_slug(client, add_listing):
+    add_listing("villa", advisor_id=100)
+    add_advisor(100, "Mehmet Kaya", "mehmet-kaya")
+    assert card_advisor(client, "villa") == ("Mehmet Kaya", "Mehmet Kaya")
+    assert client.get("/api/advisors/mehmet-kaya").json()["id"] == 100
+    assert 100 in [a["id"] for a in client.get("/api/advisors").json()]
+
+
+def test_database_row_overrides_the_static_advisor(client, add_listing):
+    add_listing("villa", advisor_id=1)
+    add_advisor(1, "Ayşe Demir", "ayse-demir")
+    assert card_advisor(client, "villa") == ("Ayşe Demir", "Ayşe Demir")
+    assert client.get("/api/advisors/ayse-demir").json()["fullName"] == "Ayşe Demir"
+    # The replaced static advisor is no longer served under its old slug
+    assert client.get(f"/api/advisors/{server.STATIC_ADVISORS[0]['slug']}").status_code == 404
+
+    client.delete("/api/advisors/1")
+    static = server.STATIC_ADVISORS[0]
+    assert card_advisor(client, "villa") == (static["fullName"], static["fullName"])
+
+
+def test_advisor_list_merges_both_sources_by_id(client):
+    add_advisor(1, "Ayşe Demir", "ayse-demir")
+    add_advisor(100, "Mehmet Kaya", "mehmet-kaya")
+    listed = client.get("/api/advisors").json()
+    ids = [a["id"] for a in listed]
+    assert ids == sorted({a["id"] for a in server.STATIC_ADVISORS} | {100})
+    assert listed[0]["fullName"] == "Ayşe Demir"
+
+
+def test_restart_keeps_database_advisor_on_cards(client, add_listing):
+    add_listing("villa", advisor_id=1)
+    add_advisor(1, "Ayşe Demir", "ayse-demir")
+    server.schema.migrate(server.DB_PATH, server.STATIC_FEATURES, server.STATIC_ADVISORS)
+    server.response_cache.clear()
+    assert card_advisor(client, "villa")[0] == "Ayşe Demir"
+
+
+def test_registry_reloads_only_after_an_advisors_write(client, add_listing):
+    add_listing("villa", advisor_id=1)
+    client.get("/api/advisors")
+    loads = server.advisors.loads
+    client.get("/api/properties", params={"sort": "newest"})
+    assert server.advisors.loads == loads
+
+    add_advisor(100, "Mehmet Kaya", "mehmet-kaya")
+    client.get("/api/advisors")
+    assert server.advisors.loads == loads + 1
@@ -0,0 +1,59 @@
+import sqlite3
+
+import change_feed
+import server
+
+
+def changes(client, **params):
+    response = client.get("/api/changes", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_delta_since_a_token(client, add_listing):
+    villa = add_listing("villa")
+    token = changes(client)["token"]
+
+    flat = add_listing("flat")
+    client.patch(f"/api/properties/{villa}", json={"title": "Sea villa"})
+    client.patch(f"/api/properties/{villa}", json={"title": "Hill villa"})
+    client.post("/api/cms/menus", json={"title": "Home", "url": "/"})
+    client.delete(f"/api/properties/{flat}")
+
+    delta = changes(client, since=token)
+    listings = delta["changes"]["listings"]
+    # Repeated edits collapse into the latest row; the deleted listing is only a tombstone
+    assert [(row["id"], row["title"]) for row in listings["upserted"]] == [(villa, "Hill villa")]
+    assert listings["deleted"] == [flat]
+    assert [row["title"] for row in delta["changes"]["menus"]["upserted"]] == ["Home"]
+    assert changes(client, since=delta["token"])["changes"] == {}
+
+
+def test_tables_filter_and_paging(client, add_listing):
+    token = changes(client)["token"]
+    for n in range(3):
+        add_listing(f"listing-{n}")
+    client.post("/api/cms/menus", json={"title": "Home", "url": "/"})
+
+    assert set(changes(client, since=token, tables="menus")["changes"]) == {"menus"}
+    seen = []
+    while True:
+        page = changes(client, since=token, tables="listings", limit=2)
+        seen += [row["slug"] for row in page["changes"].get("listings", {}).get("upserted", [])]
+        token = page["token"]
+        if not page["has_more"]:
+            break
+    assert seen == ["listing-0", "listing-1", "listing-2"]
+
+
+def test_bad_and_expired_tokens(client, add_listing):
+    assert client.get("/api/changes", params={"since": "abc"}).status_code == 400
+    assert client.get("/api/changes", params={"since": "0", "tables": "inquiries"}).status_code == 400
+    assert client.get("/api/changes", params={"since": "999"}).status_code == 410
+
+    add_listing("villa")
+    add_listing("flat")
+    with sqlite3.connect(server.db_writer.path) as db:
+        db.execute("UPDATE change_log SET changed_at = datetime('now', '-40 days') WHERE row_id = 1")
+        assert change_feed.prune(db, 30) >= 1
+    assert client.get("/api/changes", params={"since": "0"}).status_code == 410
@@ -0,0 +1,60 @@
+import server
+
+
+def test_matching_etag_is_answered_with_304(client):
+    client.post("/api/cms/menus", json={"title": "Home", "url": "/"})
+    first = client.get("/api/cms/menus")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-cache"
+    etag = first.headers["ETag"]
+
+    response = client.get("/api/cms/menus", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+
+def test_write_to_the_table_changes_the_etag(client):
+    etag = client.get("/api/cms/menus").headers["ETag"]
+    client.post("/api/cms/menus", json={"title": "Home", "url": "/"})
+    response = client.get("/api/cms/menus", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [m["title"] for m in response.json()] == ["Home"]
+
+
+def test_write_to_another_table_keeps_the_etag(client):
+    etag = client.get("/api/cms/menus").headers["ETag"]
+    client.post("/api/cms/pages", json={"title": "About", "slug": "about"})
+    assert client.get("/api/cms/menus", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_etag_depends_on_the_query(client):
+    plain = client.get("/api/properties").headers["ETag"]
+    filtered = client.get("/api/properties", params={"region": "kyrenia"})
+    assert filtered.headers["ETag"] != plain
+    assert client.get("/api/properties", params={"region": "kyrenia"}, headers={"If-None-Match": plain}).status_code == 200
+
+
+def test_if_modified_since(client, monkeypatch):
+    last_modified = client.get("/api/cms/menus").headers["Last-Modified"]
+    monkeypatch.setattr(server.time, "time", lambda: server.table_versions.last_modified(["menus"]) + 1)
+    assert client.get("/api/cms/menus", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/api/cms/menus", headers={"If-Modified-Since": "garbage"}).status_code == 200
+
+
+def test_unconditional_routes_and_errors_get_no_etag(client):
+    assert "ETag" not in client.get("/api/inquiries").headers
+    assert "ETag" not in client.get("/api/properties/missing").headers
+
+
+def test_if_modified_since_is_not_trusted_within_the_last_write_second(client, monkeypatch):
+    last_modified = client.get("/api/cms/menus").headers["Last-Modified"]
+    # Still inside the second of the last write: a second write there keeps the same date
+    monkeypatch.setattr(server.time, "time", lambda: server.table_versions.last_modified(["menus"]) - 0.5)
+    client.post("/api/cms/menus", json={"title": "Home", "url": "/"})
+    assert client.get("/api/cms/menus").headers["Last-Modified"] == last_modified
+
+    response = client.get("/api/cms/menus", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 200
+    assert [m["title"] for m in response.json()] == ["Home"]
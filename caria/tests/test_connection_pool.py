@@ -0,0 +1,64 @@
+import sqlite3
+import threading
+
+import pytest
+
+import server
+from db import ConnectionPool, PoolTimeout
+
+
+@pytest.fixture
+def pool(tmp_path):
+    path = tmp_path / "pool.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (x)")
+    pool = ConnectionPool(str(path), size=2, timeout=0.05)
+    yield pool
+    pool.close_all()
+
+
+def test_connections_are_reused_and_configured(pool):
+    conn = pool.acquire()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert pool.stats()["created"] == 1
+
+
+def test_release_rolls_back_an_open_transaction(pool):
+    conn = pool.acquire()
+    conn.execute("INSERT INTO t VALUES (1)")
+    assert conn.in_transaction
+    pool.release(conn)
+    again = pool.acquire()
+    assert not again.in_transaction
+    assert again.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_acquire_waits_then_times_out(pool):
+    first, second = pool.acquire(), pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()["timeouts"] == 1
+
+    threading.Timer(0.01, pool.release, (first,)).start()
+    pool.timeout = 5
+    assert pool.acquire() is first
+    assert pool.stats()["waits"] == 1
+    pool.release(second)
+
+
+def test_exhausted_pool_answers_503(client, monkeypatch):
+    def exhausted():
+        raise PoolTimeout("No database connection free after 0s")
+    monkeypatch.setattr(server.db_pool, "acquire", exhausted)
+    assert client.get("/api/inquiries").status_code == 503
+
+
+def test_requests_share_pooled_connections(client):
+    client.get("/api/inquiries")
+    created = server.db_pool.stats()["created"]
+    for _ in range(5):
+        client.get("/api/inquiries")
+    assert server.db_pool.stats()["created"] == created
@@ -0,0 +1,39 @@
+import asyncio
+import inspect
+import threading
+
+from db import DatabaseExecutor
+
+
+def test_offloaded_handlers_run_on_the_executor():
+    executor = DatabaseExecutor(2)
+    try:
+        @executor.offload
+        def handler(listing_id: int, fields: str = None):
+            return threading.current_thread().name, listing_id, fields
+
+        # FastAPI reads the wrapped signature to resolve parameters and dependencies
+        assert list(inspect.signature(handler).parameters) == ["listing_id", "fields"]
+        thread, listing_id, fields = asyncio.run(handler(7, fields="card"))
+        assert thread.startswith("db") and (listing_id, fields) == (7, "card")
+        assert executor.stats()["completed"] == 1
+        assert executor.stats()["pending"] == 0
+    finally:
+        executor.shutdown()
+
+
+def test_the_event_loop_stays_free_while_a_job_blocks():
+    executor = DatabaseExecutor(1)
+    release = threading.Event()
+
+    async def run():
+        job = asyncio.ensure_future(executor.run(release.wait, 5))
+        # The loop keeps serving other work while the blocking job waits
+        await asyncio.sleep(0.01)
+        assert not job.done()
+        release.set()
+        return await job
+    try:
+        assert asyncio.run(run()) is True
+    finally:
+        executor.shutdown()
@@ -0,0 +1,101 @@
+import asyncio
+
+from event_broker import EventBroker, format_event
+
+
+def drain(queue):
+    messages = []
+    while not queue.empty():
+        messages.append(queue.get_nowait())
+    return messages
+
+
+def reconnect(broker, last_event_id):
+    """The (event, id) pairs a client reconnecting with `last_event_id` is sent first."""
+    async def run():
+        queue = broker.subscribe(last_event_id)
+        broker.unsubscribe(queue)
+        return [(event, event_id) for event_id, event, _ in drain(queue)]
+    return asyncio.run(run())
+
+
+def test_live_events_reach_subscribers():
+    broker = EventBroker()
+
+    async def run():
+        queue = broker.subscribe()
+        broker.publish("inquiry", {"id": 1})
+        await asyncio.sleep(0)
+        return drain(queue)
+    (message,) = asyncio.run(run())
+    assert message == (f"{broker.epoch}-1", "inquiry", '{"id": 1}')
+    assert format_event(message) == f'id: {broker.epoch}-1\nevent: inquiry\ndata: {{"id": 1}}\n\n'
+
+
+def test_reconnect_replays_missed_events():
+    broker = EventBroker()
+    for n in range(3):
+        broker.publish("listing", {"id": n})
+    assert reconnect(broker, f"{broker.epoch}-1") == [("listing", f"{broker.epoch}-2"), ("listing", f"{broker.epoch}-3")]
+    assert reconnect(broker, f"{broker.epoch}-3") == []
+
+
+def test_reset_when_history_is_gone():
+    broker = EventBroker(history=2)
+    for n in range(4):
+        broker.publish("listing", {"id": n})
+    assert reconnect(broker, f"{broker.epoch}-1") == [("reset", f"{broker.epoch}-4")]
+    assert reconnect(broker, f"{broker.epoch}-2") == [("listing", f"{broker.epoch}-3"), ("listing", f"{broker.epoch}-4")]
+
+
+def test_reset_for_ids_from_before_a_restart():
+    before = EventBroker()
+    for n in range(5):
+        before.publish("listing", {"id": n})
+    after = EventBroker()
+    after.publish("listing", {"id": 9})
+
+    # A new broker, even one whose counter is lower, does not replay from an old id
+    assert reconnect(after, f"{before.epoch}-5") == [("reset", f"{after.epoch}-1")]
+    assert reconnect(after, f"{before.epoch}-1") == [("reset", f"{after.epoch}-1")]
+    # Ids ahead of the broker, old numeric ids and garbage reset too, even with no history
+    assert reconnect(after, f"{after.epoch}-7") == [("reset", f"{after.epoch}-1")]
+    empty = EventBroker()
+    for last_event_id in ("3", "nonsense", f"{empty.epoch}-x"):
+        assert reconnect(empty, last_event_id) == [("reset", f"{empty.epoch}-0")]
+
+
+def test_reset_id_resumes_without_another_reset():
+    broker = EventBroker()
+    broker.publish("listing", {"id": 1})
+    ((_, reset_id),) = reconnect(broker, "stale")
+    broker.publish("listing", {"id": 2})
+    assert reconnect(broker, reset_id) == [("listing", f"{broker.epoch}-2")]
+
+
+def test_closed_loops_are_dropped_without_failing_the_publisher():
+    broker = EventBroker()
+
+    async def run():
+        return broker.subscribe()
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(run())
+    loop.close()
+
+    broker.publish("listing", {"id": 1})
+    assert broker.stats()["subscribers"] == 0
+    assert broker.stats()["published"] == 1
+
+
+def test_slow_subscribers_are_dropped_and_counted():
+    broker = EventBroker(queue_size=2)
+
+    async def run():
+        queue = broker.subscribe()
+        for n in range(3):
+            broker.publish("listing", {"id": n})
+        await asyncio.sleep(0)
+        return queue
+    queue = asyncio.run(run())
+    assert queue.closed and len(drain(queue)) == 2
+    assert broker.stats() == {"subscribers": 0, "published": 3, "dropped": 1}
@@ -0,0 +1,54 @@
+import pytest
+
+from listing_fields import feature_lookup, listing_feature_ids
+
+BBQ, TERRACE, GARDEN = 1, 3, 6
+
+
+@pytest.fixture
+def listings(add_listing):
+    add_listing("villa", region="KYRENIA", ozellikler_dis=["Barbekü", "Teras", "Bahçe"])
+    add_listing("bungalow", region="ISKELE", ozellikler_dis='["BBQ", "Garden"]')
+    add_listing("flat", region="KYRENIA", ozellikler_dis=["Terrace"])
+
+
+def facets(client, **params):
+    response = client.get("/api/properties/facets", params=params)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    return body, {f["id"]: f["count"] for f in body["facets"]}
+
+
+def test_listings_must_have_every_selected_feature(client, listings):
+    body, counts = facets(client, features="bbq,bahçe")
+    assert [item["slug"] for item in body["items"]] == ["villa", "bungalow"]
+    assert body["selected"] == [BBQ, GARDEN]
+    assert (body["total"], counts[TERRACE], counts[BBQ]) == (2, 1, 2)
+
+
+def test_counts_without_a_selection_cover_all_matching_listings(client, listings):
+    body, counts = facets(client, region="kyrenia")
+    assert body["total"] == 2
+    assert (counts[BBQ], counts[TERRACE], counts[GARDEN]) == (1, 2, 1)
+
+
+def test_counts_follow_listing_edits(client, listings):
+    listing_id = client.get("/api/properties/flat").json()["id"]
+    client.patch(f"/api/properties/{listing_id}", json={"ozellikler_dis": ["Terrace", "Garden"]})
+    assert facets(client)[1][GARDEN] == 3
+    client.delete(f"/api/properties/{listing_id}")
+    assert facets(client)[1][TERRACE] == 1
+
+
+def test_unknown_feature_is_rejected(client, listings):
+    response = client.get("/api/properties/facets", params={"features": "helipad"})
+    assert response.status_code == 400
+
+
+def test_listing_feature_ids_reads_titles_and_ids_from_every_column():
+    lookup = feature_lookup([
+        {"id": 1, "title_tr": "Barbekü", "title_en": "BBQ"},
+        {"id": 6, "title_tr": "Bahçe", "title_en": "Garden"},
+    ])
+    data = {"ozellikler_ic": '["garden"]', "ozellikler_dis": [1, "Unknown"], "ozellikler_konum": "not json"}
+    assert listing_feature_ids(data, lookup) == [1, 6]
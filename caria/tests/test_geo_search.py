@@ -0,0 +1,77 @@
+import pytest
+
+import server
+from geo import bbox_around, haversine_km, parse_bbox
+
+KYRENIA = (35.3364, 33.3199)
+NICOSIA = (35.1856, 33.3823)
+
+
+@pytest.fixture
+def listings(add_listing):
+    add_listing("kyrenia", latitude="35.3364", longitude="33.3199", status="published")
+    add_listing("bellapais", latitude="35.3070", longitude="33.3550", status="draft")
+    add_listing("nicosia", latitude="35.1856", longitude="33.3823", status="published")
+    add_listing("famagusta", latitude="35.1250", longitude="33.9410", status="published")
+    add_listing("no-coordinates", status="published")
+
+
+def slugs(body):
+    return [item["slug"] for item in body["items"]]
+
+
+def test_within_returns_listings_inside_the_box(client, listings):
+    body = client.get("/api/properties/within", params={"bbox": "33.2,35.1,33.5,35.4"}).json()
+    assert sorted(slugs(body)) == ["bellapais", "kyrenia", "nicosia"]
+    assert body["truncated"] is False
+
+    body = client.get("/api/properties/within", params={"bbox": "33.2,35.1,33.5,35.4", "status": "draft"}).json()
+    assert slugs(body) == ["bellapais"]
+
+
+def test_within_truncates_at_the_limit(client, listings):
+    body = client.get("/api/properties/within", params={"bbox": "33.0,35.0,34.0,35.5", "limit": 2}).json()
+    assert (body["count"], body["truncated"]) == (2, True)
+    assert slugs(body) == ["kyrenia", "bellapais"]
+    body = client.get("/api/properties/within", params={"bbox": "33.0,35.0,34.0,35.5", "limit": 4}).json()
+    assert (body["count"], body["truncated"]) == (4, False)
+
+
+def test_box_query_reads_one_row_past_the_limit(client, listings):
+    db = server.db_pool.acquire()
+    try:
+        statements = []
+        db.set_trace_callback(statements.append)
+        rows = server.fetch_listings_in_box(db, (35.0, 33.0, 35.5, 34.0), server.resolve_listing_fields("id,slug")[0], limit=3)
+        db.set_trace_callback(None)
+    finally:
+        server.db_pool.release(db)
+    assert [row["slug"] for row in rows] == ["kyrenia", "bellapais", "nicosia"]
+    assert statements[-1].rstrip().endswith("LIMIT 3")
+
+
+@pytest.mark.parametrize("bbox", ["33,35,34", "a,b,c,d", "34,35,33,36", "33,36,34,35"])
+def test_malformed_bbox_is_rejected(client, bbox):
+    assert client.get("/api/properties/within", params={"bbox": bbox}).status_code == 400
+
+
+def test_nearby_is_nearest_first_within_the_radius(client, listings):
+    body = client.get("/api/properties/nearby", params={"lat": KYRENIA[0], "lng": KYRENIA[1], "radius_km": 20}).json()
+    assert slugs(body) == ["kyrenia", "bellapais", "nicosia"]
+    distances = [item["distance_km"] for item in body["items"]]
+    assert distances[0] == 0 and distances == sorted(distances) and distances[-1] <= 20
+
+
+def test_geo_index_follows_edits(client, listings):
+    listing_id = client.get("/api/properties/famagusta").json()["id"]
+    client.patch(f"/api/properties/{listing_id}", json={"latitude": "35.3400", "longitude": "33.3100"})
+    body = client.get("/api/properties/nearby", params={"lat": KYRENIA[0], "lng": KYRENIA[1], "radius_km": 2}).json()
+    assert slugs(body) == ["kyrenia", "famagusta"]
+
+
+def test_geo_helpers():
+    assert haversine_km(*KYRENIA, *NICOSIA) == pytest.approx(17.6, abs=0.5)
+    min_lat, min_lng, max_lat, max_lng = bbox_around(*KYRENIA, 10)
+    assert haversine_km(*KYRENIA, max_lat, KYRENIA[1]) == pytest.approx(10, rel=0.01)
+    assert haversine_km(*KYRENIA, KYRENIA[0], max_lng) == pytest.approx(10, rel=0.01)
+    assert parse_bbox("33.2,35.1,33.5,35.4") == (35.1, 33.2, 35.4, 33.5)
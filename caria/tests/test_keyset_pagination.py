@@ -0,0 +1,116 @@
+import base64
+import json
+import sqlite3
+
+import pytest
+
+import server
+
+
+def walk(client, path, params=None):
+    """Follows next_cursor from the first page to the last; returns every item served."""
+    items = []
+    cursor = ""
+    while cursor is not None:
+        response = client.get(path, params={**(params or {}), "cursor": cursor})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        items += body["items"]
+        cursor = body["next_cursor"]
+    return items
+
+
+def forge(scope, key, last_id):
+    raw = json.dumps([scope, key, last_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def page_plan(table, order, cursor):
+    """EXPLAIN QUERY PLAN lines of the statement that reads the page after `cursor`."""
+    sql, args = server.keyset_query(table, "", [], order, cursor, 20)
+    with sqlite3.connect(server.db_writer.path) as db:
+        return [row[3] for row in db.execute(f"EXPLAIN QUERY PLAN {sql}", args)]
+
+
+def assert_seeks(plan, table):
+    assert any(line.startswith(f"SEARCH {table} ") for line in plan), plan
+    assert not [line for line in plan if line.startswith(f"SCAN {table}") or "TEMP B-TREE" in line], plan
+
+
+@pytest.fixture
+def listings(add_listing):
+    prices = ["£300,000", "Contact for price", "£150,000", "£300,000", "Contact for price", "€90,000", "£150,000"]
+    for n, price in enumerate(prices):
+        add_listing(f"listing-{n}", price=price, advisor_id=2 if n % 2 else None)
+
+
+@pytest.mark.parametrize("sort", [None, "newest", "price_asc", "price_desc", "beds_asc"])
+@pytest.mark.parametrize("fields", [None, "card"])
+def test_cursor_walk_matches_unpaged_order(client, listings, sort, fields):
+    params = {k: v for k, v in (("sort", sort), ("fields", fields)) if v}
+    expected = [item["id"] for item in client.get("/api/properties", params=params).json()]
+    served = walk(client, "/api/properties", {**params, "limit": 2})
+    assert [item["id"] for item in served] == expected
+    assert len(expected) == 7
+
+
+def test_ties_are_not_skipped_or_repeated(client, listings):
+    served = walk(client, "/api/properties", {"sort": "price_desc", "limit": 1})
+    assert [item["slug"] for item in served] == [
+        "listing-3", "listing-0", "listing-6", "listing-2", "listing-5", "listing-4", "listing-1",
+    ]
+
+
+def test_ties_and_null_prices_are_not_skipped_or_repeated(client, listings):
+    served = walk(client, "/api/properties", {"sort": "price_asc", "limit": 1})
+    prices = [item["price_amount"] for item in served]
+    assert prices == [90000, 150000, 150000, 300000, 300000, None, None]
+
+
+def test_inquiries_pages_and_advisor_listings(client, listings):
+    for n in range(5):
+        client.post("/api/inquiries", json={"name": f"n{n}", "email": "e@x"})
+        client.post("/api/cms/pages", json={"title": f"P{n}", "slug": f"p{n}"})
+    assert len(walk(client, "/api/inquiries", {"limit": 2})) == 5
+    assert len({item["id"] for item in walk(client, "/api/cms/pages", {"limit": 2})}) == 5
+    served = walk(client, "/api/advisors/2/listings", {"limit": 2})
+    assert [item["slug"] for item in served] == ["listing-1", "listing-3", "listing-5"]
+
+
+@pytest.mark.parametrize("token", [
+    "not-a-cursor",
+    forge("inquiries", None, 1),                       # another collection's cursor
+    forge("properties:price_asc", [1, 2], 1),          # key must be a scalar
+    forge("properties:price_asc", {"a": 1}, 1),
+    forge("properties:price_asc", 100, "1"),           # id must be an integer
+])
+def test_bad_cursors_are_rejected(client, listings, token):
+    response = client.get("/api/properties", params={"sort": "price_asc", "cursor": token})
+    assert response.status_code == 400
+
+
+def test_later_pages_seek_in_both_directions(client, listings):
+    first = client.get("/api/properties", params={"sort": "price_desc", "cursor": "", "limit": 2}).json()
+    cursor = server.decode_cursor(first["next_cursor"], "properties:price_desc")
+    assert cursor[0] == 300000
+    assert_seeks(page_plan("listings", server.PROPERTY_SORTS["price_desc"], cursor), "listings")
+
+    for n in range(2):
+        client.post("/api/inquiries", json={"name": f"n{n}", "email": "e@x"})
+    first = client.get("/api/inquiries", params={"cursor": "", "limit": 1}).json()
+    assert_seeks(page_plan("inquiries", ("created_at", "DESC"), server.decode_cursor(first["next_cursor"], "inquiries")),
+                 "inquiries")
+
+
+@pytest.mark.parametrize("sort", ["price_asc", "price_desc"])
+def test_null_key_cursor_seeks_the_tail(client, listings, sort):
+    served = walk(client, "/api/properties", {"sort": sort, "limit": 1})
+    token = client.get("/api/properties", params={"sort": sort, "cursor": "", "limit": len(served) - 1}).json()["next_cursor"]
+    cursor = server.decode_cursor(token, f"properties:{sort}")
+    assert cursor[0] is None
+    assert_seeks(page_plan("listings", server.PROPERTY_SORTS[sort], cursor), "listings")
+
+
+def test_decode_cursor_round_trip():
+    token = server.encode_cursor("properties:", 12.5, 7)
+    assert server.decode_cursor(token, "properties:") == (12.5, 7)
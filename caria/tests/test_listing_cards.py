@@ -0,0 +1,63 @@
+import sqlite3
+
+import pytest
+
+import migrate_listing_cards
+import server
+
+
+def cards():
+    with sqlite3.connect(server.db_writer.path) as db:
+        db.row_factory = sqlite3.Row
+        return {row["slug"]: dict(row) for row in db.execute("SELECT * FROM listing_cards")}
+
+
+def listing_rows():
+    columns = ", ".join(migrate_listing_cards.CARD_LISTING_COLUMNS)
+    with sqlite3.connect(server.db_writer.path) as db:
+        db.row_factory = sqlite3.Row
+        return {row["slug"]: dict(row) for row in db.execute(f"SELECT {columns} FROM listings")}
+
+
+def test_cards_mirror_listings_through_writes(client, add_listing):
+    villa = add_listing("villa", price="£450,000", beds_room_count="4+1", advisor_id=2)
+    flat = add_listing("flat", price="€95,000")
+    client.patch(f"/api/properties/{villa}", json={"price": "£470,000", "description": "not on cards"})
+    client.post("/api/properties/import", content='{"slug": "import", "title": "Imported"}\n')
+    client.delete(f"/api/properties/{flat}")
+
+    stored = cards()
+    rows = listing_rows()
+    assert set(stored) == set(rows) == {"villa", "import"}
+    for slug, row in rows.items():
+        assert {c: stored[slug][c] for c in row} == row
+    assert stored["villa"]["price_amount"] == 470000
+    assert stored["villa"]["advisor_name"] == server.STATIC_ADVISORS[1]["fullName"]
+
+
+def test_advisor_edits_reach_their_cards(client, add_listing):
+    add_listing("villa", advisor_id=50)
+    assert cards()["villa"]["advisor_name"] is None
+    server.db_writer.execute(
+        "INSERT INTO advisors (id, fullName, slug, email, phone, isActive) VALUES (50, 'Deniz Ak', 'deniz-ak', 'd@x', '1', 1)"
+    )
+    assert cards()["villa"]["advisor_slug"] == "deniz-ak"
+    server.db_writer.execute("UPDATE advisors SET fullName = 'Deniz Akın' WHERE id = 50")
+    assert cards()["villa"]["advisor_name"] == "Deniz Akın"
+    server.db_writer.execute("DELETE FROM advisors WHERE id = 50")
+    assert cards()["villa"]["advisor_name"] is None
+
+
+def test_card_endpoint_reads_the_card_table(client, add_listing):
+    add_listing("villa", price="£450,000", advisor_id=2)
+    plain = client.get("/api/properties", params={"fields": "card", "sort": "oldest"}).json()
+    detail = client.get("/api/properties", params={"fields": "card,description", "sort": "oldest"}).json()
+    assert plain == [{k: v for k, v in item.items() if k != "description"} for item in detail]
+
+
+@pytest.mark.parametrize("sort", list(server.PROPERTY_SORTS))
+def test_card_sorts_walk_an_index(client, sort):
+    order = server.order_clause(*server.PROPERTY_SORTS[sort])
+    with sqlite3.connect(server.db_writer.path) as db:
+        plan = [row[3] for row in db.execute(f"EXPLAIN QUERY PLAN SELECT id FROM listing_cards ORDER BY {order}")]
+    assert not [line for line in plan if "TEMP B-TREE" in line], plan
@@ -0,0 +1,94 @@
+import pytest
+
+from decimal import Decimal
+
+from listing_fields import normalize_listing_numbers, parse_area, parse_number, parse_price, parse_room_count
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("£850,000", (850000, "GBP")),
+    ("€1.250.000", (1250000, "EUR")),
+    ("250.000 EUR", (250000, "EUR")),
+    ("$1,200.50", (1200, "USD")),
+    ("3.500.000 TL", (3500000, "TRY")),
+    ("450 000", (450000, None)),
+    ("£1.5M", (1500000, "GBP")),
+    ("£2.3m", (2300000, "GBP")),
+    ("€250k", (250000, "EUR")),
+    ("1.200,50 EUR", (1200, "EUR")),
+    (450000, (450000, None)),
+    ("Contact for price", (None, None)),
+    ("", (None, None)),
+    (None, (None, None)),
+])
+def test_parse_price(text, expected):
+    assert parse_price(text) == expected
+
+
+def test_price_columns_are_stored_on_write(client, add_listing):
+    add_listing("gbp", price="£850,000")
+    add_listing("eur", price="250.000 EUR")
+    add_listing("poa", price="Contact for price")
+    stored = {item["slug"]: (item["price_amount"], item["price_currency"]) for item in client.get("/api/properties").json()}
+    assert stored == {"gbp": (850000, "GBP"), "eur": (250000, "EUR"), "poa": (None, None)}
+
+
+def test_price_range_is_numeric_and_currency_aware(client, add_listing):
+    add_listing("cheap", price="£99,000")
+    add_listing("mid", price="£250,000")
+    add_listing("dear", price="£1,100,000")
+    add_listing("euro", price="€200,000")
+
+    def slugs(**params):
+        return [item["slug"] for item in client.get("/api/properties", params=params).json()]
+
+    # As text "£1,100,000" < "£250,000"; as numbers it is not
+    assert slugs(price_min=200000) == ["mid", "dear", "euro"]
+    assert slugs(price_min=200000, currency="GBP") == ["mid", "dear"]
+    assert slugs(price_max=250000, currency="gbp", sort="price_desc") == ["mid", "cheap"]
+
+
+@pytest.mark.parametrize("text, expected", [("3+1", 3), (" 4 + 2 ", 4), ("5", 5), (2, 2), ("", None), (None, None), ("studio", None)])
+def test_parse_room_count(text, expected):
+    assert parse_room_count(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("320", 320.0), ("320 m²", 320.0), ("250m²", 250.0), ("1,250.5", 1250.5), ("1.250", 1250.0),
+    ("1.250,5", 1250.5), ("85,5", 85.5), (85, 85.0), ("", None), ("n/a", None),
+])
+def test_parse_area(text, expected):
+    assert parse_area(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1,250,000", "1250000"), ("1.250.000", "1250000"), ("1 250 000", "1250000"),
+    ("1,250.75", "1250.75"), ("1.250,75", "1250.75"), ("12.5", "12.5"), ("1,5M", "1500000"),
+    ("1.250k", "1250"), ("20 m2", "20"), ("12 k", "12"), ("none", None),
+])
+def test_parse_number_reads_both_separator_styles_and_suffixes(text, expected):
+    assert parse_number(text) == (Decimal(expected) if expected is not None else None)
+
+
+def test_normalize_prefers_the_detailed_fields():
+    data = normalize_listing_numbers({
+        "beds": 0, "baths": 0, "beds_room_count": "3+1", "baths_count": "2",
+        "area": "", "closed_area": "180 m²", "plot_area": "", "plotSize": "600",
+    })
+    assert (data["beds"], data["baths"], data["area"]) == (3, 2, "180 m²")
+    assert (data["closed_area_m2"], data["plot_area_m2"]) == (180.0, 600.0)
+
+
+def test_typed_columns_are_stored_and_filterable(client, add_listing):
+    add_listing("small", beds_room_count="1+1", baths_count="1", closed_area="65 m²")
+    add_listing("large", beds_room_count="4+1", baths_count="3", closed_area="1,250")
+    items = {item["slug"]: item for item in client.get("/api/properties").json()}
+    assert (items["large"]["beds"], items["large"]["baths"], items["large"]["closed_area_m2"]) == (4, 3, 1250.0)
+
+    def slugs(**params):
+        return [item["slug"] for item in client.get("/api/properties", params=params).json()]
+
+    assert slugs(beds_min=2) == ["large"]
+    assert slugs(baths_max=1) == ["small"]
+    assert slugs(area_min=100) == ["large"]
+    assert slugs(sort="area_desc") == ["large", "small"]
@@ -0,0 +1,126 @@
+import asyncio
+import json
+
+import pytest
+
+import server
+from listing_import import iter_records
+
+
+def records(data, chunk_size):
+    async def chunks():
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+
+    async def collect():
+        return [item async for item in iter_records(chunks())]
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1000])
+@pytest.mark.parametrize("body", [
+    '{"slug": "a", "title": "Çamlıbel"}\n\n{"slug": "b"}\n',
+    ' [ {"slug": "a", "title": "Çamlıbel"} ,\n {"slug": "b"} ] ',
+])
+def test_records_are_parsed_across_chunk_boundaries(body, chunk_size):
+    assert records(body.encode(), chunk_size) == [(1, {"slug": "a", "title": "Çamlıbel"}), (2, {"slug": "b"})]
+
+
+def test_every_kind_of_value_survives_a_chunk_boundary():
+    record = {"slug": "a", "ok": True, "gone": None, "no": False, "n": [-2, 1.5e+10], "t": "ç\\n", "x": float("-inf")}
+    body = "[" + json.dumps(record, ensure_ascii=True) + "]"
+    assert records(body.encode(), 1) == [(1, record)]
+
+
+def test_array_parsing_stops_at_the_first_syntax_error():
+    read = []
+
+    async def chunks():
+        for chunk in [b'[{"slug": "a"}, {"slug": "b" "title": "B"},', b'{"slug": "c"}', b']']:
+            read.append(chunk)
+            yield chunk
+
+    async def collect():
+        return [item async for item in iter_records(chunks())]
+    parsed = asyncio.run(collect())
+    assert parsed[0] == (1, {"slug": "a"})
+    assert parsed[1][0] == 2 and parsed[1][1].startswith("Invalid JSON")
+    assert len(parsed) == 2 and len(read) == 1
+
+
+@pytest.mark.parametrize("body, expected", [
+    ('{"slug": "a"}\nnot json\n[1]\n{"slug": "b"}', [(1, {"slug": "a"}), (2, "Invalid JSON"), (3, "Record must be"), (4, {"slug": "b"})]),
+    ('[{"slug": "a"} {"slug": "b"}]', [(1, {"slug": "a"}), (2, "Expected ',' or ']'")]),
+    ('[{"slug": "a"},', [(1, {"slug": "a"}), (2, "Unterminated JSON array")]),
+    ('[]', []),
+])
+def test_malformed_rows_are_reported(body, expected):
+    parsed = records(body.encode(), 4)
+    assert [row for row, _ in parsed] == [row for row, _ in expected]
+    for (_, record), (_, want) in zip(parsed, expected):
+        assert record == want if isinstance(want, dict) else record.startswith(want)
+
+
+def ndjson(*rows):
+    return "".join(json.dumps(r) + "\n" for r in rows)
+
+
+def test_import_upserts_on_slug_and_reports_each_row(client, add_listing):
+    add_listing("existing", price="£100,000")
+    body = ndjson(
+        {"slug": "existing", "title": "Existing", "price": "£90,000"},
+        {"slug": "new", "title": "New", "ozellikler_dis": ["Garden"]},
+        {"slug": "untitled"},
+        {"slug": "new", "title": "Again"},
+    ) + "{oops\n"
+    response = client.post("/api/properties/import", content=body)
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["inserted"], result["updated"], result["failed"]) == (1, 1, 3)
+    assert [(r["row"], r["status"]) for r in result["results"]] == [
+        (1, "updated"), (2, "inserted"), (3, "error"), (4, "error"), (5, "error"),
+    ]
+    assert result["results"][3]["errors"] == ["Duplicate slug in import"]
+    assert result["results"][2]["errors"][0].startswith("title")
+
+    items = {item["slug"]: item for item in client.get("/api/properties").json()}
+    assert set(items) == {"existing", "new"}
+    assert items["existing"]["price_amount"] == 90000
+    facets = {f["title_en"]: f["count"] for f in client.get("/api/properties/facets").json()["facets"]}
+    assert facets["Garden"] == 1
+
+
+def test_batches_are_written_while_the_body_streams_in(client, monkeypatch):
+    monkeypatch.setattr(server, "IMPORT_BATCH_SIZE", 2)
+    stored_before_third_row = []
+
+    class Upload:
+        async def stream(self):
+            yield ndjson({"slug": "one", "title": "One"}, {"slug": "two", "title": "Two"}).encode()
+            stored_before_third_row.extend(item["slug"] for item in client.get("/api/properties").json())
+            yield ndjson({"slug": "three", "title": "Three"}).encode()
+
+    result = asyncio.run(server.import_properties(Upload()))
+    assert result["inserted"] == 3
+    assert stored_before_third_row == ["one", "two"]
+
+
+def test_failed_batch_ends_the_import_and_keeps_earlier_batches(client, add_listing, monkeypatch):
+    add_listing("existing")
+    monkeypatch.setattr(server, "IMPORT_BATCH_SIZE", 1)
+    real = server.upsert_listing_batch
+    rows = []
+
+    def fail_on_second(cursor, batch, db_cols):
+        rows.append(batch[0][0])
+        if batch[0][0] == 2:
+            raise RuntimeError("disk full")
+        return real(cursor, batch, db_cols)
+    monkeypatch.setattr(server, "upsert_listing_batch", fail_on_second)
+
+    body = ndjson({"slug": "one", "title": "One"}, {"slug": "two", "title": "Two"}, {"slug": "three", "title": "Three"})
+    response = client.post("/api/properties/import", content=body)
+    assert response.status_code == 500
+    assert "1 rows were written" in response.json()["detail"]
+    assert rows == [1, 2]
+    assert sorted(item["slug"] for item in client.get("/api/properties").json()) == ["existing", "one"]
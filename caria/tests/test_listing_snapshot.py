@@ -0,0 +1,25 @@
+import server
+
+
+def test_unfiltered_catalogue_is_encoded_once_per_change(client, add_listing):
+    add_listing("villa", price="£100,000")
+    first = client.get("/api/properties")
+    builds = server.listing_snapshot.builds
+    second = client.get("/api/properties")
+    assert second.content == first.content
+    assert server.listing_snapshot.builds == builds
+
+    add_listing("flat")
+    third = client.get("/api/properties")
+    assert server.listing_snapshot.builds == builds + 1
+    assert [item["slug"] for item in third.json()] == ["villa", "flat"]
+
+
+def test_snapshot_matches_the_queried_listing_rows(client, add_listing):
+    add_listing("villa", price="£100,000", advisor_id=2)
+    add_listing("flat")
+    snapshot = client.get("/api/properties").json()
+    # Any query string bypasses the snapshot and builds the rows per request
+    queried = client.get("/api/properties", params={"sort": "oldest"}).json()
+    assert snapshot == queried
+    assert snapshot[0]["advisor"]["id"] == 2
@@ -0,0 +1,98 @@
+import pytest
+
+import server
+from map_clusters import ClusterIndex, cell_size
+
+# Three listings in one zoom-10 cell, a fourth far away
+POINTS = [
+    (1, "a", 35.3301, 33.3101, 100000, "GBP"),
+    (2, "b", 35.3302, 33.3102, 250000, "GBP"),
+    (3, "c", 35.3303, 33.3103, None, None),
+    (4, "d", 35.1250, 33.9410, 90000, "EUR"),
+]
+EVERYWHERE = (-90, -180, 90, 180)
+
+
+def index(points, version=lambda: 1):
+    return ClusterIndex(lambda db: list(points), version)
+
+
+def by_count(clusters):
+    return sorted(clusters, key=lambda c: -c["count"])
+
+
+def test_clusters_group_nearby_listings_with_a_price_range():
+    big, single = by_count(index(POINTS).clusters(None, 10, EVERYWHERE))
+    assert (big["count"], big["price_min"], big["price_max"], big["currency"]) == (3, 100000, 250000, "GBP")
+    assert big["lat"] == pytest.approx(35.3302)
+    assert (single["count"], single["id"], single["slug"]) == (1, 4, "d")
+    assert "id" not in big
+
+
+def test_mixed_currency_cluster_has_no_price_range():
+    points = POINTS[:3] + [(5, "e", 35.3304, 33.3104, 90000, "EUR")]
+    (cluster,) = index(points).clusters(None, 10, EVERYWHERE)
+    assert (cluster["count"], cluster["price_min"], cluster["price_max"], cluster["currency"]) == (4, None, None, None)
+
+
+def test_low_zoom_merges_everything_and_box_filters_centres():
+    (cluster,) = index(POINTS).clusters(None, 2, EVERYWHERE)
+    assert cluster["count"] == 4
+    assert cluster["price_min"] is None
+    assert index(POINTS).clusters(None, 10, (35.0, 33.8, 35.2, 34.0))[0]["slug"] == "d"
+    assert cell_size(0) == 90.0
+
+
+def test_grids_survive_versions_that_change_no_point():
+    version = [1]
+    clusters = index(POINTS, lambda: version[0])
+    clusters.grid(None, 10)
+    version[0] = 2
+    clusters.grid(None, 10)
+    assert clusters.builds == 1
+
+
+def test_small_viewport_only_looks_up_the_cells_it_covers():
+    class CellsOnly(dict):
+        def values(self):
+            raise AssertionError("scanned every cell")
+
+    points = [(n, f"p{n}", 35 + n * 0.01, 33 + n * 0.01, None, None) for n in range(100)]
+    clusters = index(points)
+    everything = clusters.clusters(None, 14, EVERYWHERE)
+    assert len(everything) == 100
+    assert [c["key"] for c in everything] == sorted(
+        (c["key"] for c in everything), key=lambda k: tuple(int(part) for part in k.split("/")[1:]))
+
+    clusters.grids[14] = CellsOnly(clusters.grids[14])
+    box = (35.095, 33.095, 35.135, 33.135)
+    assert clusters.clusters(None, 14, box) == [
+        c for c in everything if box[0] <= c["lat"] <= box[2] and box[1] <= c["lng"] <= box[3]
+    ]
+    assert len(clusters.clusters(None, 14, box)) == 4
+
+
+def test_points_reload_only_when_a_clustered_column_changes(client, add_listing):
+    add_listing("a", latitude="35.3301", longitude="33.3101", price="£100,000")
+    params = {"bbox": "33,35,34,36", "zoom": 10}
+    client.get("/api/properties/clusters", params=params)
+    loads = server.map_clusters.loads
+    listing = client.get("/api/properties/a").json()["id"]
+
+    client.patch(f"/api/properties/{listing}", json={"title": "Renamed"})
+    client.get("/api/properties/clusters", params=params)
+    assert server.map_clusters.loads == loads
+
+    client.patch(f"/api/properties/{listing}", json={"latitude": "35.5"})
+    (cluster,) = client.get("/api/properties/clusters", params=params).json()["clusters"]
+    assert server.map_clusters.loads == loads + 1
+    assert cluster["lat"] == pytest.approx(35.5)
+
+
+def test_clusters_endpoint(client, add_listing):
+    add_listing("a", latitude="35.3301", longitude="33.3101", price="£100,000")
+    add_listing("b", latitude="35.3302", longitude="33.3102", price="€200,000")
+    body = client.get("/api/properties/clusters", params={"bbox": "33,35,34,36", "zoom": 10}).json()
+    assert body["total"] == 2
+    assert (body["clusters"][0]["price_min"], body["clusters"][0]["currency"]) == (None, None)
+    assert client.get("/api/properties/clusters", params={"bbox": "x", "zoom": 10}).status_code == 400
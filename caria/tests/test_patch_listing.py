@@ -0,0 +1,69 @@
+import threading
+import time
+
+import server
+
+
+def test_only_changed_fields_are_written(client, add_listing):
+    listing_id = add_listing("villa", title="Villa", price="£100,000", region="KYRENIA", is_featured=False)
+    response = client.patch(f"/api/properties/{listing_id}", json={"title": "Villa", "region": "ISKELE", "is_featured": True})
+    assert response.status_code == 200
+    assert response.json() == {"status": "success", "id": listing_id, "changed": ["region", "is_featured"]}
+
+    stored = client.get("/api/properties/villa").json()
+    assert (stored["title"], stored["region"], stored["is_featured"]) == ("Villa", "ISKELE", 1)
+
+
+def test_derived_columns_follow_their_source(client, add_listing):
+    listing_id = add_listing("villa", price="£100,000", beds_room_count="3+1")
+    changed = client.patch(f"/api/properties/{listing_id}", json={"price": "€120,000", "beds_room_count": "4+1"}).json()["changed"]
+    assert {"price", "price_amount", "price_currency", "beds_room_count", "beds"} <= set(changed)
+    stored = client.get("/api/properties/villa").json()
+    assert (stored["price_amount"], stored["price_currency"], stored["beds"]) == (120000, "EUR", 4)
+
+
+def test_resending_stored_values_is_a_no_op(client, add_listing):
+    listing_id = add_listing("villa", title="Villa", price="£100,000", ozellikler_dis=["Garden"])
+    version = server.table_versions.version("listings")
+    response = client.patch(f"/api/properties/{listing_id}", json={"title": "Villa", "price": "£100,000", "ozellikler_dis": ["Garden"]})
+    assert response.json() == {"status": "unchanged", "id": listing_id, "changed": []}
+    assert server.table_versions.version("listings") == version
+
+
+def test_missing_listing_and_slug_conflict(client, add_listing):
+    add_listing("villa")
+    flat = add_listing("flat")
+    assert client.patch("/api/properties/999", json={"title": "x"}).status_code == 404
+    assert client.patch(f"/api/properties/{flat}", json={"slug": "villa"}).status_code == 409
+
+
+def test_patch_compares_against_the_row_it_overwrites(client, add_listing):
+    listing_id = add_listing("villa", title="Villa")
+    running, release = threading.Event(), threading.Event()
+
+    def hold_the_writer(conn):
+        running.set()
+        release.wait(5)
+    blocker = threading.Thread(target=server.db_writer.submit, args=(hold_the_writer,))
+    blocker.start()
+
+    def patch(title):
+        thread = threading.Thread(target=client.patch, args=(f"/api/properties/{listing_id}",), kwargs={"json": {"title": title}})
+        thread.start()
+        return thread
+
+    def wait_for_queued(n):
+        deadline = time.monotonic() + 5
+        while server.db_writer._jobs.qsize() < n and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    # Both PATCHes queue behind the blocked writer; the second one sent is applied last
+    running.wait(5)
+    first = patch("Loft")
+    wait_for_queued(1)
+    second = patch("Villa")
+    wait_for_queued(2)
+    release.set()
+    for thread in (blocker, first, second):
+        thread.join(5)
+    assert client.get("/api/properties/villa").json()["title"] == "Villa"
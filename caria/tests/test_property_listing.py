@@ -0,0 +1,77 @@
+import sqlite3
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def listings(add_listing):
+    add_listing("kyrenia-villa", region="KYRENIA", property_type="Villa", price="£450,000", beds_room_count="4+1", closed_area="240", status="published")
+    add_listing("iskele-flat", region="ISKELE", property_type="Apartment", price="£120,000", beds_room_count="2+1", closed_area="95", status="published")
+    add_listing("kyrenia-poa", region="KYRENIA", property_type="Villa", price="Contact for price", beds_room_count="5+1", status="published")
+    add_listing("kyrenia-flat", region="Kyrenia", property_type="Apartment", price="€95,000", beds_room_count="1+1", status="sold")
+
+
+def explain(db, sql, args=()):
+    return [row[3] for row in db.execute(f"EXPLAIN QUERY PLAN {sql}", args)]
+
+
+def slugs(items):
+    return [item["slug"] for item in items]
+
+
+def test_filters_combine(client, listings):
+    response = client.get("/api/properties", params={"region": "kyrenia", "status": "published"})
+    assert response.status_code == 200
+    assert slugs(response.json()) == ["kyrenia-villa", "kyrenia-poa"]
+
+    response = client.get("/api/properties", params={"beds_min": 2, "beds_max": 4})
+    assert slugs(response.json()) == ["kyrenia-villa", "iskele-flat"]
+
+    response = client.get("/api/properties", params={"property_type": "villa", "price_min": 100000})
+    assert slugs(response.json()) == ["kyrenia-villa"]
+
+    response = client.get("/api/properties", params={"price_max": 200000, "currency": "gbp"})
+    assert slugs(response.json()) == ["iskele-flat"]
+
+
+@pytest.mark.parametrize("sort, expected", [
+    ("price_asc", ["kyrenia-flat", "iskele-flat", "kyrenia-villa", "kyrenia-poa"]),
+    ("price_desc", ["kyrenia-villa", "iskele-flat", "kyrenia-flat", "kyrenia-poa"]),
+    ("beds_asc", ["kyrenia-flat", "iskele-flat", "kyrenia-villa", "kyrenia-poa"]),
+    ("newest", ["kyrenia-flat", "kyrenia-poa", "iskele-flat", "kyrenia-villa"]),
+])
+def test_sort_puts_unpriced_listings_last(client, listings, sort, expected):
+    response = client.get("/api/properties", params={"sort": sort})
+    assert slugs(response.json()) == expected
+
+
+def test_unknown_sort_is_rejected(client, listings):
+    response = client.get("/api/properties", params={"sort": "cheapest"})
+    assert response.status_code == 400
+
+
+def test_limit_returns_a_page_with_total(client, listings):
+    response = client.get("/api/properties", params={"sort": "price_asc", "limit": 3, "page": 2})
+    body = response.json()
+    assert body["total"] == 4
+    assert body["page"] == 2
+    assert slugs(body["items"]) == ["kyrenia-poa"]
+
+
+@pytest.mark.parametrize("sort", ["price_asc", "beds_asc", "area_asc"])
+@pytest.mark.parametrize("fields, table", [(None, "listings"), ("card", "listing_cards")])
+def test_ascending_sorts_keep_their_index(client, listings, sort, fields, table):
+    order = server.PROPERTY_SORTS[sort]
+    params = {k: v for k, v in (("sort", sort), ("fields", fields), ("cursor", ""), ("limit", 1)) if v is not None}
+    cursor = server.decode_cursor(client.get("/api/properties", params=params).json()["next_cursor"], f"properties:{sort}")
+    sql, args = server.keyset_query(table, "", [], order, cursor, 1)
+    with sqlite3.connect(server.db_writer.path) as db:
+        # limit/page: one walk of the (key IS NULL, key) index
+        paged = explain(db, f"SELECT id FROM {table} ORDER BY {server.order_clause(*order)} LIMIT 1 OFFSET 1")
+        # cursor pages: a seek past the cursor on the key's own index
+        after_cursor = explain(db, sql, args)
+    assert not [line for line in paged if "TEMP B-TREE" in line], paged
+    assert any(line.startswith(f"SEARCH {table} ") for line in after_cursor), after_cursor
+    assert not [line for line in after_cursor if line.startswith(f"SCAN {table}") or "TEMP B-TREE" in line], after_cursor
@@ -0,0 +1,345 @@
+"""EXPLAIN QUERY PLAN check for every SQL statement the API issues.
+
+The module's app runs on a fresh database built by schema.migrate(). Every
+statement its pooled and writer connections run while requests_for() exercises
+each route is recorded, then each distinct one is explained. A plan fails when
+it scans a large table without an index, or reads one in full and then sorts it
+through a temporary B-tree (sorting the rows an index search found is fine),
+unless the statement is listed in ALLOWED with the reason the whole table is
+read. Statements matching EXPECTED_INDEXES must use that index. A route missing
+from both requests_for() and SKIPPED fails too, so a new endpoint has to be
+added here before it ships.
+"""
+import re
+import sqlite3
+import threading
+
+import pytest
+from fastapi.routing import APIRoute
+
+import server
+from .conftest import running_app
+
+# Tables that grow with the business; scans of the small admin-curated ones
+# (sliders, menus, advisors, site_content, ...) are not worth an index
+LARGE_TABLES = {
+    "listings", "listing_cards", "listing_features", "listing_similar",
+    "inquiries", "change_log", "pages", "page_blocks",
+}
+
+# Statements that read a large table in full by design: (pattern, reason)
+ALLOWED = [
+    (r"^SELECT \* FROM listings$", "catalogue snapshot: the whole table, encoded once per version"),
+    (r"^SELECT \* FROM listing_cards ORDER BY id ASC$", "unfiltered, unpaged listing list"),
+    (r"^SELECT \* FROM listings ORDER BY id ASC$", "unfiltered, unpaged listing list"),
+    (r"^SELECT id, price_amount, beds, baths, closed_area_m2, plot_area_m2, region, property_type FROM listings$",
+     "similarity vectors are built from every listing"),
+    (r"^SELECT listing_id, feature_id FROM listing_features$", "similarity vectors are built from every listing"),
+    (r"FROM listings_geo g JOIN listings l ON l.id = g.id\s+ORDER BY l.id$", "map clusters index every geocoded listing"),
+    (r"^SELECT slug, updated_at FROM listings\s+WHERE slug IS NOT NULL", "sitemap lists every public listing"),
+    (r"^SELECT slug, updated_at FROM pages WHERE status = 'published'", "sitemap lists every published page"),
+    (r"^SELECT \* FROM inquiries ORDER BY created_at DESC$", "unpaged admin inbox, walked in index order"),
+    (r"^SELECT \* FROM pages ORDER BY created_at DESC$", "unpaged admin page list, walked in index order"),
+    (r"^SELECT MIN\(seq\) FROM change_log$", "served from the rowid b-tree's first entry"),
+    (r"^SELECT (\*|[\w, ]+) FROM (listings|listing_cards) ORDER BY id (ASC|DESC) LIMIT \d+",
+     "unfiltered page: walks the rowid b-tree and stops at LIMIT"),
+    (r"^SELECT listing_id, MIN\(score\), COUNT\(\*\) FROM listing_similar GROUP BY listing_id$",
+     "similarity refresh needs every stored list's k-th score; walks the primary key in order"),
+]
+
+# Statements that must be served by a particular index: (pattern, index)
+EXPECTED_INDEXES = [
+    (r"FROM listings WHERE advisor_id = \d+ AND status='published'", "idx_listings_advisor_status"),
+    (r"FROM listing_cards WHERE advisor_id = \d+", "idx_listing_cards_advisor"),
+    (r"FROM listing_cards WHERE price_amount IS NOT NULL ORDER BY price_amount ASC", "idx_listing_cards_price"),
+    (r"FROM listing_cards WHERE \(price_amount, id\) > \(", "idx_listing_cards_price"),
+    (r"FROM listings WHERE \(price_amount, id\) > \(", "idx_listings_price_amount"),
+    (r"FROM listings WHERE \(price_amount, id\) < \(", "idx_listings_price_amount"),
+    (r"FROM listings WHERE price_amount IS NULL AND id [<>] \d+", "idx_listings_price_amount"),
+    (r"FROM listing_cards WHERE \(beds, id\) > \(", "idx_listing_cards_beds"),
+    (r"FROM listing_cards WHERE \(closed_area_m2, id\) > \(", "idx_listing_cards_area"),
+    (r"FROM listing_cards ORDER BY beds IS NULL, beds", "idx_listing_cards_beds_sort"),
+    (r"FROM listing_cards ORDER BY closed_area_m2 IS NULL, closed_area_m2", "idx_listing_cards_area_sort"),
+    (r"FROM inquiries WHERE \(created_at, id\) < \(", "idx_inquiries_created"),
+    (r"FROM listing_features WHERE listing_id", "idx_listing_features_listing"),
+    (r"FROM listing_similar WHERE similar_id IN", "idx_listing_similar_similar"),
+    (r"FROM pages WHERE category = '[^']*' AND status = 'published' AND active = 1", "idx_pages_category"),
+    (r"^SELECT \* FROM pages WHERE active = 1 ORDER BY sort_order", "idx_pages_active"),
+    (r"FROM page_blocks WHERE page_id = \d+", "idx_page_blocks_page"),
+    (r"FROM pages ORDER BY created_at DESC", "idx_pages_created"),
+    (r"FROM inquiries ORDER BY created_at DESC", "idx_inquiries_created"),
+    (r"FROM sliders WHERE active = 1", "idx_sliders_active"),
+]
+
+# Routes with no SQL of their own, or that cannot run to completion here
+SKIPPED = {
+    ("GET", "/api/events"): "server-sent event stream",
+    ("POST", "/api/upload"): "file upload, no SQL",
+}
+
+
+def requests_for(ids):
+    """(method, route, path params, keyword args for the client), in run order: reads, then writes, then deletes."""
+    slug, listing_id, advisor_id, advisor_slug = ids["slug"], ids["listing"], ids["advisor"], ids["advisor_slug"]
+    page_id, page_slug, category, block_id = ids["page"], ids["page_slug"], ids["category"], ids["block"]
+    bbox = {"bbox": "34.5,32.0,36.0,35.0"}
+    listing = {"slug": "plan-check", "title": "Plan check", "price": "£100,000", "region": "KYRENIA",
+               "latitude": "35.3", "longitude": "33.3", "ozellikler_ic": ["Klima"]}
+    return [
+        ("GET", "/api/", {}, {}),
+        ("GET", "/api/properties", {}, {}),
+        ("GET", "/api/properties", {}, {"params": {"region": "kyrenia", "status": "published", "sort": "price_desc", "limit": 20}}),
+        ("GET", "/api/properties", {}, {"params": {"sort": "newest", "limit": 20, "page": 3, "fields": "detail"}}),
+        # cursor requests are followed to their last page, so later pages and NULL-key cursors are explained too
+        ("GET", "/api/properties", {}, {"params": {"cursor": "", "limit": 1, "sort": "price_asc", "fields": "card"}}),
+        ("GET", "/api/properties", {}, {"params": {"cursor": "", "limit": 1, "sort": "price_asc"}}),
+        ("GET", "/api/properties", {}, {"params": {"cursor": "", "limit": 1, "sort": "price_desc"}}),
+        ("GET", "/api/properties", {}, {"params": {"cursor": "", "limit": 1, "sort": "beds_asc", "fields": "card"}}),
+        ("GET", "/api/properties", {}, {"params": {"cursor": "", "limit": 1, "sort": "area_asc", "fields": "card"}}),
+        ("GET", "/api/properties", {}, {"params": {"sort": "beds_asc", "fields": "card"}}),
+        ("GET", "/api/properties", {}, {"params": {"sort": "area_asc", "fields": "card", "limit": 20}}),
+        ("GET", "/api/properties", {}, {"params": {"beds_min": 2, "price_max": 900000, "currency": "GBP", "limit": 20}}),
+        ("GET", "/api/properties", {}, {"params": {"is_featured": "true", "fields": "card"}}),
+        ("GET", "/api/properties", {}, {"params": {"property_type": "villa", "area_min": 100, "sort": "area_desc", "limit": 20}}),
+        ("GET", "/api/properties/facets", {}, {"params": {"features": "Klima", "region": "kyrenia"}}),
+        ("GET", "/api/properties/within", {}, {"params": bbox}),
+        ("GET", "/api/properties/nearby", {}, {"params": {"lat": 35.3, "lng": 33.3, "radius_km": 20}}),
+        ("GET", "/api/properties/clusters", {}, {"params": {**bbox, "zoom": 9}}),
+        ("GET", "/api/properties/search", {}, {"params": {"q": "villa", "limit": 10}}),
+        ("GET", "/api/properties/{slug}", {"slug": slug}, {}),
+        ("GET", "/api/properties/{slug}", {"slug": slug}, {"params": {"fields": "title,price"}}),
+        ("GET", "/api/properties/{slug}/similar", {"slug": slug}, {}),
+        ("GET", "/api/inquiries", {}, {}),
+        ("GET", "/api/inquiries", {}, {"params": {"cursor": "", "limit": 1}}),
+        ("GET", "/api/cache/stats", {}, {}),
+        ("GET", "/api/db/stats", {}, {}),
+        ("GET", "/api/events/stats", {}, {}),
+        ("GET", "/api/changes", {}, {}),
+        ("GET", "/api/changes", {}, {"params": {"since": "0", "tables": "listings,pages"}}),
+        ("GET", "/api/cms/features", {}, {}),
+        ("GET", "/api/cms/sliders", {}, {}),
+        ("GET", "/api/cms/content", {}, {}),
+        ("GET", "/api/cms/country-guides", {}, {}),
+        ("GET", "/api/cms/seo", {}, {}),
+        ("GET", "/api/cms/pages", {}, {}),
+        ("GET", "/api/cms/pages", {}, {"params": {"cursor": "", "limit": 20}}),
+        ("GET", "/api/cms/pages/{slug}", {"slug": page_slug}, {}),
+        ("GET", "/api/pages/{slug}", {"slug": page_slug}, {}),
+        ("GET", "/api/cms/menus", {}, {}),
+        ("GET", "/api/cms/homepage", {}, {}),
+        ("GET", "/api/homepage/blocks", {}, {}),
+        ("GET", "/api/advisors", {}, {}),
+        ("GET", "/api/advisors/{slug}", {"slug": advisor_slug}, {}),
+        ("GET", "/api/advisors/{id}/listings", {"id": advisor_id}, {}),
+        ("GET", "/api/advisors/{id}/listings", {"id": advisor_id}, {"params": {"cursor": "", "limit": 20, "fields": "card"}}),
+        ("GET", "/api/cms-blocks/pages", {}, {}),
+        ("GET", "/api/cms-blocks/pages", {}, {"params": {"category": category}}),
+        ("GET", "/api/cms-blocks/page/{slug}", {"slug": page_slug}, {}),
+        ("GET", "/api/cms-blocks/pages/category/{category}", {"category": category}, {}),
+        ("GET", "/api/cms-blocks/pages/{page_id}/blocks", {"page_id": page_id}, {}),
+        ("GET", "/sitemap.xml", {}, {}),
+        ("GET", "/sitemap-{part}.xml", {"part": 1}, {}),
+        ("POST", "/api/auth/signin", {}, {"json": {"email": "plan@check.local", "password": "x"}}),
+        # writes
+        ("POST", "/api/properties", {}, {"json": listing}),
+        ("POST", "/api/properties", {}, {"json": {**listing, "id": listing_id, "slug": slug}}),
+        ("POST", "/api/properties/import", {}, {"content": "\n".join([
+            '{"slug": "plan-check-import", "title": "Imported", "price": "€250,000"}',
+            '{"slug": "plan-check", "title": "Updated by import"}',
+        ])}),
+        ("PATCH", "/api/properties/{id}", {"id": listing_id}, {"json": {"price": "£123,000", "region": "ISKELE"}}),
+        ("POST", "/api/inquiries", {}, {"json": {"name": "Plan", "email": "plan@check.local", "property_id": listing_id}}),
+        ("POST", "/api/cms/features", {}, {"json": {"category": "Dış Özellikler", "title_tr": "Test", "title_en": "Test"}}),
+        ("POST", "/api/cms/sliders", {}, {"json": {"title": "Plan", "image_url": "/x.jpg"}}),
+        ("POST", "/api/cms/content", {}, {"json": {"content_key": "plan_check", "value_tr": "x"}}),
+        ("POST", "/api/cms/update", {}, {"json": {"content_key": "plan_check", "value_tr": "y"}}),
+        ("POST", "/api/cms/country-guides", {}, {"json": {"country_name_tr": "Plan", "slug": "plan-check"}}),
+        ("POST", "/api/cms/seo", {}, {"json": {"page_name": "plan-check", "title_tr": "x"}}),
+        ("POST", "/api/cms/pages", {}, {"json": {"title": "Plan", "slug": "plan-check-page"}}),
+        ("POST", "/api/cms/menus", {}, {"json": {"title": "Plan", "url": "/plan"}}),
+        ("POST", "/api/cms/homepage", {}, {"json": {"block_type": "hero", "title": "Plan"}}),
+        ("POST", "/api/homepage/blocks", {}, {"json": {"block_type": "hero", "title": "Plan 2"}}),
+        ("POST", "/api/advisors", {}, {"json": {"name": "Plan Check", "email": "plan@check.local", "phone": "1"}}),
+        ("POST", "/api/cms-blocks/page", {}, {"json": {"title": "Plan blocks", "category": category,
+                                                        "blocks": [{"block_type": "TEXT_SECTION", "block_data": {}}]}}),
+        ("POST", "/api/cms-blocks/pages/{page_id}/blocks", {"page_id": page_id}, {"json": {"block_type": "QUOTE", "data": {}}}),
+        ("PUT", "/api/cms-blocks/blocks/{block_id}", {"block_id": block_id}, {"json": {"data": {"text": "x"}, "active": True}}),
+        ("PUT", "/api/cms-blocks/pages/{page_id}/blocks/reorder", {"page_id": page_id}, {"json": {"block_ids": [block_id]}}),
+        # deletes
+        ("DELETE", "/api/cms-blocks/blocks/{block_id}", {"block_id": block_id}, {}),
+        ("DELETE", "/api/cms-blocks/pages/{page_id}", {"page_id": page_id}, {}),
+        ("DELETE", "/api/cms/pages/full/{page_id}", {"page_id": page_id}, {}),
+        ("DELETE", "/api/cms/pages/{id}", {"id": page_id}, {}),
+        ("DELETE", "/api/cms/features/{id}", {"id": 999}, {}),
+        ("DELETE", "/api/cms/menus/{id}", {"id": 1}, {}),
+        ("DELETE", "/api/cms/homepage/{id}", {"id": 1}, {}),
+        ("DELETE", "/api/advisors/{id}", {"id": advisor_id}, {}),
+        ("DELETE", "/api/inquiries/{id}", {"id": 1}, {}),
+        ("DELETE", "/api/properties/{id}", {"id": listing_id}, {}),
+    ]
+
+
+def seed(client):
+    """A few rows in every large table; returns the ids requests_for() needs."""
+    def post(path, body):
+        response = client.post(path, json=body)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    advisor = post("/api/advisors", {"name": "Ayse Plan", "slug": "ayse-plan", "email": "ayse@plan.local", "phone": "1"})
+    listing = post("/api/properties", {
+        "slug": "seed-villa", "title": "Seed villa", "price": "£450,000", "region": "KYRENIA",
+        "property_type": "Villa", "beds_room_count": "3+1", "closed_area": "180", "advisor_id": advisor["id"],
+        "latitude": "35.33", "longitude": "33.32", "ozellikler_ic": ["Klima"], "status": "published",
+    })
+    post("/api/properties", {"slug": "seed-flat", "title": "Seed flat", "price": "£150,000", "region": "ISKELE",
+                             "latitude": "35.28", "longitude": "33.89", "ozellikler_ic": ["Klima"]})
+    page = post("/api/cms-blocks/page", {"title": "Seed page", "slug": "seed-page", "category": "guides",
+                                         "blocks": [{"block_type": "TEXT_SECTION", "block_data": {}}]})
+    # Two unpriced listings, so a price cursor can land inside the NULL tail
+    for n in range(2):
+        post("/api/properties", {"slug": f"seed-poa-{n}", "title": "Seed POA", "price": "Contact for price"})
+    for n in range(2):
+        post("/api/inquiries", {"name": f"Seed {n}", "email": "seed@plan.local", "property_id": listing["id"]})
+
+    blocks = client.get(f"/api/cms-blocks/pages/{page['id']}/blocks").json()
+    return {
+        "slug": "seed-villa", "listing": listing["id"], "advisor": advisor["id"], "advisor_slug": "ayse-plan",
+        "page": page["id"], "page_slug": "seed-page", "category": "guides", "block": blocks[0]["id"],
+    }
+
+
+class StatementLog:
+    """Collects the statements run on every connection it is attached to."""
+
+    SKIP = re.compile(r"^\s*(--|BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE|PRAGMA)", re.I)
+
+    def __init__(self):
+        self.statements = {}
+        self.route = None
+        self._lock = threading.Lock()
+
+    def attach(self, conn):
+        conn.set_trace_callback(self.record)
+        return conn
+
+    def record(self, sql):
+        if self.route is None or self.SKIP.match(sql):
+            return
+        sql = " ".join(sql.split()) if "\n" in sql else sql.strip()
+        with self._lock:
+            self.statements.setdefault(sql, set()).add(self.route)
+
+
+ALIAS_RE = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(?!WHERE|JOIN|LEFT|INNER|ON|ORDER|GROUP|LIMIT|SET|VALUES|USING)(\w+))?", re.I)
+
+
+def explain(conn, sql):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()]
+
+
+def plan_problems(conn, sql):
+    """Plan lines that scan or temp-sort a large table, or [] when the plan is fine."""
+    tables = {}
+    for table, alias in ALIAS_RE.findall(sql):
+        tables[table] = table
+        if alias:
+            tables[alias] = table
+    large = {alias for alias, table in tables.items() if table in LARGE_TABLES}
+    if not large:
+        return []
+    try:
+        plan = explain(conn, sql)
+    except sqlite3.Error as e:
+        return [f"cannot explain: {e}"]
+    # SCAN without USING reads every row; SCAN ... USING INDEX walks a whole
+    # index, which is fine unless the rows still go through a temp B-tree
+    scans = [d for d in plan if re.match(r"^SCAN (\w+)", d) and d.split()[1] in large]
+    problems = [d for d in scans if " USING " not in d]
+    if scans:
+        problems += [d for d in plan if d.startswith("USE TEMP B-TREE")]
+    return problems
+
+
+def allowed(sql):
+    for pattern, reason in ALLOWED:
+        if re.search(pattern, sql):
+            return reason
+    return None
+
+
+@pytest.fixture(scope="module")
+def exercised(tmp_path_factory):
+    """Runs requests_for() against a freshly migrated database; returns
+    (responses, statement log, database path)."""
+    workdir = tmp_path_factory.mktemp("query-plans")
+    log = StatementLog()
+    with pytest.MonkeyPatch.context() as mp:
+        for owner in (server.db_pool, server.db_writer):
+            connect = owner._connect
+            mp.setattr(owner, "_connect", lambda connect=connect: log.attach(connect()))
+        with running_app(workdir / "caria.db", workdir / "sitemaps") as client:
+            ids = seed(client)
+            responses = {}
+            for method, route, path_params, kwargs in requests_for(ids):
+                log.route = f"{method} {route}"
+                response = client.request(method, route.format(**path_params), **kwargs)
+                responses.setdefault((method, route), []).append(response)
+                params = kwargs.get("params", {})
+                while "cursor" in params and response.status_code == 200 and response.json()["next_cursor"]:
+                    params = {**params, "cursor": response.json()["next_cursor"]}
+                    response = client.request(method, route.format(**path_params), params=params)
+                    responses[(method, route)].append(response)
+            log.route = None
+    return responses, log, workdir / "caria.db"
+
+
+@pytest.fixture(scope="module")
+def plans_db(exercised):
+    conn = sqlite3.connect(exercised[2])
+    yield conn
+    conn.close()
+
+
+def test_requests_succeed(exercised):
+    failures = [f"{method} {route}: HTTP {r.status_code} {r.text[:200]}"
+                for (method, route), responses in exercised[0].items() for r in responses if r.status_code >= 500]
+    assert not failures, "\n".join(failures)
+
+
+def test_every_route_is_exercised(exercised):
+    routes = {(m, r.path) for r in server.app.routes if isinstance(r, APIRoute) for m in r.methods}
+    routes = {(m, p) for m, p in routes if not p.startswith(("/docs", "/redoc", "/openapi"))}
+    missing = sorted(routes - set(exercised[0]) - set(SKIPPED))
+    assert not missing, f"add these to requests_for() or SKIPPED: {missing}"
+
+
+def test_no_full_scans_or_temp_sorts_of_large_tables(exercised, plans_db):
+    failures = []
+    for sql, sources in sorted(exercised[1].statements.items()):
+        problems = plan_problems(plans_db, sql)
+        if problems and not allowed(sql):
+            failures.append(f"{', '.join(sorted(sources))}\n    {sql}\n    " + "\n    ".join(problems))
+    assert not failures, "\n".join(failures)
+
+
+@pytest.mark.parametrize("pattern, index", EXPECTED_INDEXES)
+def test_queries_use_their_index(exercised, plans_db, pattern, index):
+    matched = [sql for sql in exercised[1].statements if re.search(pattern, sql)]
+    assert matched, f"no statement matched {pattern!r}"
+    for sql in matched:
+        plan = explain(plans_db, sql)
+        assert any(re.search(rf"\bINDEX {index}\b", line) for line in plan), f"{sql}\n    " + "\n    ".join(plan)
+
+
+def test_cursor_pages_only_seek(exercised, plans_db):
+    """Every filtered or cursor-bounded page reads its rows with index searches."""
+    failures = []
+    for sql in exercised[1].statements:
+        if "AS _sort_key" not in sql or " WHERE " not in sql:
+            continue
+        plan = explain(plans_db, sql)
+        bad = [line for line in plan if re.match(r"^SCAN (?!\()", line) or line.startswith("USE TEMP B-TREE")]
+        if bad or not any(line.startswith("SEARCH ") for line in plan):
+            failures.append(f"{sql}\n    " + "\n    ".join(plan))
+    assert not failures, "\n".join(failures)
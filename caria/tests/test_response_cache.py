@@ -0,0 +1,96 @@
+import server
+from response_cache import ResponseCache, TableVersions
+
+
+def test_invalidate_drops_only_entries_built_from_the_table():
+    cache = ResponseCache()
+    cache.set("menus", [1], ("menus",))
+    cache.set("listings", [2], ("listings", "advisors"))
+    cache.set("detail", {"title": "x"}, ("advisors", "listings.title"))
+    cache.invalidate("listings")
+    assert cache.get("menus") == [1]
+    assert cache.get("listings") is None
+    assert cache.get("detail") is None
+
+
+def test_invalidate_columns_keeps_entries_tagged_with_other_columns():
+    cache = ResponseCache()
+    cache.set("whole", [1], ("listings",))
+    cache.set("title", {"title": "x"}, ("listings.slug", "listings.title"))
+    cache.set("price", {"price": "y"}, ("listings.slug", "listings.price"))
+    cache.invalidate_columns("listings", ["price"])
+    assert cache.get("whole") is None
+    assert cache.get("price") is None
+    assert cache.get("title") == {"title": "x"}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", 1, ("t",))
+    cache.set("b", 2, ("t",))
+    cache.get("a")
+    cache.set("c", 3, ("t",))
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_set_skips_responses_built_before_a_write():
+    versions = TableVersions()
+    cache = ResponseCache(version_fn=versions.version)
+    stamp = cache.stamp(("advisors", "listings.title"))
+    assert stamp == {"advisors": 0, "listings": 0}
+    versions.bump("listings")
+    cache.set("detail", {"title": "old"}, ("advisors", "listings.title"), stamp)
+    assert cache.get("detail") is None
+    assert cache.stats()["stale_sets"] == 1
+
+    cache.set("detail", {"title": "new"}, ("advisors", "listings.title"), cache.stamp(("advisors", "listings")))
+    assert cache.get("detail") == {"title": "new"}
+
+
+def test_reads_are_served_from_cache_until_a_write(client):
+    client.post("/api/cms/menus", json={"title": "Home", "url": "/"})
+    assert [m["title"] for m in client.get("/api/cms/menus").json()] == ["Home"]
+    hits = server.response_cache.hits
+    assert [m["title"] for m in client.get("/api/cms/menus").json()] == ["Home"]
+    assert server.response_cache.hits == hits + 1
+
+    client.post("/api/cms/menus", json={"title": "Contact", "url": "/contact", "display_order": 1})
+    assert [m["title"] for m in client.get("/api/cms/menus").json()] == ["Home", "Contact"]
+
+
+def test_listing_write_invalidates_cached_listing_reads(client, add_listing):
+    add_listing("villa", price="£100,000")
+    assert [item["price"] for item in client.get("/api/properties").json()] == ["£100,000"]
+    add_listing("flat", price="£90,000")
+    assert [item["slug"] for item in client.get("/api/properties").json()] == ["villa", "flat"]
+
+
+def test_patch_keeps_cached_responses_of_untouched_columns(client, add_listing):
+    listing_id = add_listing("villa", title="Villa", price="£100,000")
+    title_url, price_url = "/api/properties/villa?fields=title", "/api/properties/villa?fields=price"
+    client.get(title_url)
+    client.get(price_url)
+
+    client.patch(f"/api/properties/{listing_id}", json={"price": "£120,000"})
+    hits = server.response_cache.hits
+    assert client.get(title_url).json() == {"title": "Villa"}
+    assert server.response_cache.hits == hits + 1
+    assert client.get(price_url).json() == {"price": "£120,000"}
+    assert server.response_cache.hits == hits + 1
+
+
+def test_write_between_query_and_set_is_not_cached(client, monkeypatch):
+    client.post("/api/cms/menus", json={"title": "Home", "url": "/"})
+    real_set = server.response_cache.set
+
+    def set_after_a_write(key, value, tables, stamp=None):
+        # The handler has read its rows; a write commits and invalidates before it stores them
+        monkeypatch.setattr(server.response_cache, "set", real_set)
+        client.post("/api/cms/menus", json={"title": "Contact", "url": "/contact", "display_order": 1})
+        real_set(key, value, tables, stamp)
+    monkeypatch.setattr(server.response_cache, "set", set_after_a_write)
+
+    assert [m["title"] for m in client.get("/api/cms/menus").json()] == ["Home"]
+    assert [m["title"] for m in client.get("/api/cms/menus").json()] == ["Home", "Contact"]
+    assert server.response_cache.stats()["stale_sets"] == 1
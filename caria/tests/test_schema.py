@@ -0,0 +1,87 @@
+import sqlite3
+
+import pytest
+
+import schema
+import server
+
+STATIC = (server.STATIC_FEATURES, server.STATIC_ADVISORS)
+LATEST = schema.migrations(*STATIC)[-1].version
+
+
+def migrate(path):
+    return schema.migrate(str(path), *STATIC)
+
+
+def objects(path):
+    with sqlite3.connect(path) as conn:
+        return set(conn.execute("SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'").fetchall())
+
+
+def user_version(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def test_versions_are_increasing_and_unique():
+    versions = [step.version for step in schema.migrations(*STATIC)]
+    assert versions == list(range(1, LATEST + 1))
+
+
+def test_fresh_database_reaches_the_latest_version(tmp_path):
+    path = tmp_path / "fresh.db"
+    assert migrate(path) == LATEST
+    assert user_version(path) == LATEST
+    names = {name for _, name, _ in objects(path)}
+    assert {"listings", "listings_fts", "listings_geo", "listing_cards", "card_static_advisors", "change_log"} <= names
+
+
+def test_migrate_is_idempotent(tmp_path, capsys):
+    path = tmp_path / "twice.db"
+    migrate(path)
+    before = objects(path)
+    capsys.readouterr()
+    assert migrate(path) == LATEST
+    assert "Migration" not in capsys.readouterr().out
+    assert objects(path) == before
+
+
+def test_older_database_catches_up_to_a_fresh_one(tmp_path):
+    fresh, old = tmp_path / "fresh.db", tmp_path / "old.db"
+    migrate(fresh)
+    conn = sqlite3.connect(old, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    for step in schema.migrations(*STATIC)[:10]:
+        step.apply(conn)
+    conn.execute("PRAGMA user_version = 10")
+    conn.close()
+
+    assert migrate(old) == LATEST
+    assert {n for _, n, _ in objects(old)} == {n for _, n, _ in objects(fresh)}
+
+
+def broken(conn):
+    conn.execute("CREATE TABLE half_done (id INTEGER)")
+    raise RuntimeError("step failed")
+
+
+def test_failed_step_rolls_back_every_pending_step(tmp_path, monkeypatch):
+    path = tmp_path / "broken.db"
+    steps = schema.migrations(*STATIC)
+    monkeypatch.setattr(schema, "migrations", lambda *args: steps + [schema.Migration(LATEST + 1, "broken", broken)])
+    with pytest.raises(RuntimeError):
+        migrate(path)
+    assert user_version(path) == 0
+    assert objects(path) == set()
+
+
+def test_failed_step_keeps_the_current_version(tmp_path, monkeypatch):
+    path = tmp_path / "current.db"
+    migrate(path)
+    before = objects(path)
+    steps = schema.migrations(*STATIC)
+    monkeypatch.setattr(schema, "migrations", lambda *args: steps + [schema.Migration(LATEST + 1, "broken", broken)])
+    with pytest.raises(RuntimeError):
+        migrate(path)
+    assert user_version(path) == LATEST
+    assert objects(path) == before
@@ -0,0 +1,49 @@
+import pytest
+
+import server
+
+
+@pytest.fixture
+def listings(add_listing):
+    add_listing("sea-villa", title="Sea view villa", description="Pool and garden in Kyrenia", status="published")
+    add_listing("town-flat", title="Town flat", description="Close to the sea front", status="published")
+    add_listing("mountain-house", title="Mountain house", location="Lapta", status="draft")
+
+
+def search(client, q, **params):
+    response = client.get("/api/properties/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return response.json()["items"]
+
+
+def test_title_matches_rank_above_description_matches(client, listings):
+    assert [item["slug"] for item in search(client, "sea")] == ["sea-villa", "town-flat"]
+
+
+def test_every_word_must_match_as_a_prefix(client, listings):
+    assert [item["slug"] for item in search(client, "gard kyren")] == ["sea-villa"]
+    assert search(client, "garden lapta") == []
+
+
+def test_status_filter_and_highlights(client, listings):
+    assert search(client, "lapta", status="published") == []
+    item = search(client, "villa", status="published")[0]
+    assert item["title_highlight"] == "Sea view <mark>villa</mark>"
+    assert {"snippet", "rank", "slug"} <= set(item)
+
+
+def test_index_follows_edits_and_deletes(client, listings):
+    listing_id = client.get("/api/properties/town-flat").json()["id"]
+    client.patch(f"/api/properties/{listing_id}", json={"title": "Harbour loft"})
+    assert [item["slug"] for item in search(client, "harbour")] == ["town-flat"]
+    client.delete(f"/api/properties/{listing_id}")
+    assert search(client, "harbour") == []
+
+
+@pytest.mark.parametrize("q", ["", "  ", "***", '"'])
+def test_empty_query_is_rejected(client, listings, q):
+    assert client.get("/api/properties/search", params={"q": q}).status_code == 400
+
+
+def test_fts_syntax_in_input_is_taken_literally():
+    assert server.build_search_query('villa OR "pool" NEAR(x)') == '"villa"* "OR"* "pool"* "NEAR"* "x"*'
@@ -0,0 +1,107 @@
+import sqlite3
+import threading
+
+import numpy as np
+import pytest
+
+import listing_similarity
+import server
+
+
+@pytest.fixture
+def listings(add_listing):
+    add_listing("villa-1", region="KYRENIA", property_type="Villa", price="£450,000", beds_room_count="4+1", ozellikler_dis=["Garden"])
+    add_listing("villa-2", region="KYRENIA", property_type="Villa", price="£480,000", beds_room_count="4+1", ozellikler_dis=["Garden"])
+    add_listing("flat-1", region="ISKELE", property_type="Apartment", price="£95,000", beds_room_count="1+1")
+    add_listing("flat-2", region="ISKELE", property_type="Apartment", price="£99,000", beds_room_count="1+1")
+
+
+def similar(client, slug):
+    response = client.get(f"/api/properties/{slug}/similar")
+    assert response.status_code == 200, response.text
+    return [item["slug"] for item in response.json()["items"]]
+
+
+def writer_db():
+    conn = sqlite3.connect(server.db_writer.path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def test_neighbours_are_ranked_by_similarity(client, listings):
+    assert similar(client, "villa-1")[:1] == ["villa-2"]
+    assert similar(client, "flat-2")[:1] == ["flat-1"]
+    assert client.get("/api/properties/missing/similar").status_code == 404
+
+
+def test_neighbours_follow_edits_and_deletes(client, add_listing, listings):
+    flat = client.get("/api/properties/flat-2").json()["id"]
+    client.patch(f"/api/properties/{flat}", json={"region": "KYRENIA", "property_type": "Villa", "price": "£470,000",
+                                                   "beds_room_count": "4+1", "ozellikler_dis": ["Garden"]})
+    assert "flat-2" in similar(client, "villa-1")[:2]
+
+    client.delete(f"/api/properties/{flat}")
+    assert "flat-2" not in similar(client, "villa-1")
+
+
+def test_kept_vectors_match_a_full_read_after_writes(client, add_listing, listings):
+    villa = client.get("/api/properties/villa-1").json()["id"]
+    flat = client.get("/api/properties/flat-1").json()["id"]
+    add_listing("bungalow", region="ISKELE", price="€210,000", ozellikler_dis=["BBQ"])
+    client.patch(f"/api/properties/{villa}", json={"price": "£500,000", "ozellikler_dis": ["Terrace"]})
+    client.delete(f"/api/properties/{flat}")
+
+    assert server.listing_vectors.loads == 1
+    with writer_db() as db:
+        kept_ids, kept = server.listing_vectors.sync(db)
+        ids, vectors = listing_similarity.load_vectors(db)
+    assert kept_ids.tolist() == ids.tolist()
+    assert np.allclose(kept, vectors)
+
+
+def test_kept_vectors_reload_after_reset(client, listings):
+    with writer_db() as db:
+        server.listing_vectors.sync(db)
+        server.listing_vectors.reset()
+        server.listing_vectors.sync(db)
+    assert server.listing_vectors.loads == 2
+
+
+def test_refresh_binds_ids_in_batches(client, listings):
+    # More ids than SQLite accepts variables in one statement
+    ids = list(range(1, 40000))
+    with writer_db() as db:
+        assert listing_similarity.refresh(db, ids, vectors=server.listing_vectors) == 4
+
+
+def test_refresh_failure_is_reported_with_the_write(client, add_listing, listings, monkeypatch, caplog):
+    def fail(db, listing_ids, vectors=None):
+        raise sqlite3.OperationalError("disk I/O error")
+    monkeypatch.setattr(listing_similarity, "refreshed_neighbours", fail)
+
+    response = client.post("/api/properties", json={"slug": "loft", "title": "Loft"})
+    assert response.status_code == 200
+    assert response.json()["warning"] == server.SIMILAR_STALE_WARNING
+    assert "Similar listings refresh failed" in caplog.text
+    assert server.listing_vectors.token is None
+
+
+def test_neighbours_are_computed_outside_the_writer(client, listings, monkeypatch):
+    threads = []
+    compute = listing_similarity.refreshed_neighbours
+
+    def recording(db, listing_ids, vectors=None):
+        threads.append(threading.current_thread().name)
+        return compute(db, listing_ids, vectors)
+    monkeypatch.setattr(listing_similarity, "refreshed_neighbours", recording)
+
+    client.post("/api/properties", json={"slug": "loft", "title": "Loft", "region": "KYRENIA"})
+    assert threads and "db-writer" not in threads
+    assert client.get("/api/properties/loft/similar").json()
+
+
+def test_lists_computed_before_a_listing_write_are_not_stored(client, add_listing, listings):
+    token, neighbours = server.compute_similar([1])
+    assert server.db_writer.submit(server.store_similar_if_current, token, neighbours) == len(neighbours)
+    add_listing("loft")
+    assert server.db_writer.submit(server.store_similar_if_current, token, neighbours) is None
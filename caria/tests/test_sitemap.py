@@ -0,0 +1,65 @@
+import re
+
+import server
+from sitemap import SitemapCache
+
+
+def locs(client, path="/sitemap.xml"):
+    response = client.get(path)
+    assert response.status_code == 200
+    return re.findall(r"<loc>(.*?)</loc>", response.text)
+
+
+def test_sitemap_lists_public_urls_only(client, add_listing):
+    add_listing("villa", status="published")
+    add_listing("draft-villa", status="draft")
+    client.post("/api/cms/country-guides", json={
+        "country_name_tr": "Kıbrıs", "country_name_en": "Cyprus", "content_tr": "", "content_en": "", "slug": "cyprus",
+    })
+    urls = locs(client)
+    assert "http://testserver/properties/villa" in urls
+    assert "http://testserver/properties/draft-villa" not in urls
+    # The SPA has no route for a single country guide
+    assert not [url for url in urls if "cyprus" in url]
+    active = [a for a in server.STATIC_ADVISORS if a.get("isActive")]
+    assert f"http://testserver/advisor/{active[0]['slug']}" in urls
+
+
+def test_writes_rebuild_the_files(client, add_listing):
+    add_listing("villa")
+    locs(client)
+    builds = server.sitemaps.builds
+    locs(client)
+    assert server.sitemaps.builds == builds
+    add_listing("flat")
+    assert "http://testserver/properties/flat" in locs(client)
+    assert server.sitemaps.builds == builds + 1
+
+
+def test_files_survive_a_restart(client, add_listing, tmp_path, monkeypatch):
+    add_listing("villa")
+    first = locs(client)
+    # A new process: fresh in-memory versions and cache, same database and directory
+    monkeypatch.setattr(server, "table_versions", server.TableVersions())
+    monkeypatch.setattr(server, "sitemaps", SitemapCache(server.sitemaps.cache_dir))
+    assert locs(client) == first
+    assert server.sitemaps.builds == 0
+
+    add_listing("flat")
+    assert "http://testserver/properties/flat" in locs(client)
+    assert server.sitemaps.builds == 1
+
+
+def test_large_sitemaps_are_split_under_an_index(tmp_path):
+    cache = SitemapCache(str(tmp_path), max_urls=2)
+    urls = [(f"https://caria.example/properties/{n}", "2024-05-01") for n in range(5)]
+    files = cache.ensure("sig", "https://caria.example", lambda: iter(urls))
+    assert files == ["sitemap.xml", "sitemap-1.xml", "sitemap-2.xml", "sitemap-3.xml"]
+    index = (tmp_path / "sitemap.xml").read_text()
+    assert index.count("<sitemap>") == 3 and "https://caria.example/sitemap-3.xml" in index
+
+    reopened = SitemapCache(str(tmp_path), max_urls=2)
+    assert reopened.ensure("sig", "https://caria.example", lambda: iter(())) == files
+    assert reopened.builds == 0
+    (tmp_path / "sitemap-3.xml").unlink()
+    assert SitemapCache(str(tmp_path), max_urls=2).ensure("sig", "https://caria.example", lambda: iter(urls)) == files
@@ -0,0 +1,49 @@
+import pytest
+
+import server
+
+
+@pytest.fixture
+def listings(add_listing):
+    add_listing("villa", price="£450,000", latitude="35.33", longitude="33.31", advisor_id=2)
+    add_listing("flat", price="£120,000")
+
+
+def test_column_list_narrows_every_row(client, listings):
+    response = client.get("/api/properties", params={"fields": "slug,price_amount"})
+    assert response.json() == [{"slug": "villa", "price_amount": 450000}, {"slug": "flat", "price_amount": 120000}]
+
+
+def test_presets_mix_with_columns(client, listings):
+    item = client.get("/api/properties", params={"fields": "map,description"}).json()[0]
+    assert set(item) == set(server.LISTING_FIELD_PRESETS["map"]) | {"description"}
+    item = client.get("/api/properties", params={"fields": "card"}).json()[0]
+    assert set(item) == set(server.LISTING_FIELD_PRESETS["card"])
+    assert item["advisor_slug"] == client.get("/api/properties/villa").json()["advisor"]["slug"]
+
+
+def test_detail_preset_returns_every_column(client, listings):
+    assert client.get("/api/properties", params={"fields": "detail"}).json() == client.get("/api/properties").json()
+
+
+def test_advisor_fields_are_merged_in(client, listings):
+    item = client.get("/api/properties/villa", params={"fields": "title,advisor"}).json()
+    assert set(item) == {"title", "advisor"}
+    assert item["advisor"]["id"] == 2
+
+
+def test_unknown_field_is_rejected(client, listings):
+    response = client.get("/api/properties", params={"fields": "slug,password"})
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("fields, source", [
+    (None, "listings"),
+    ("card", "listing_cards"),
+    ("slug,advisor_name", "listing_cards"),
+    ("slug,description", "listings"),
+])
+def test_card_fields_are_read_from_the_card_table(client, fields, source):
+    columns, requested = server.resolve_listing_fields(fields)
+    assert server.listing_source(columns, requested)[0] == source
@@ -0,0 +1,93 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from db import ConnectionPool, WriteQueue
+
+
+@pytest.fixture
+def writer(tmp_path):
+    path = str(tmp_path / "writes.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+    writer = WriteQueue(path)
+    yield writer
+    writer.close()
+
+
+def names(writer):
+    with sqlite3.connect(writer.path) as conn:
+        return sorted(row[0] for row in conn.execute("SELECT name FROM t"))
+
+
+def insert(name):
+    def job(conn):
+        return conn.execute("INSERT INTO t (name) VALUES (?)", (name,)).lastrowid
+    return job
+
+
+def test_execute_is_durable_on_return(writer):
+    result = writer.execute("INSERT INTO t (name) VALUES (?)", ("a",))
+    assert (result.lastrowid, result.rowcount) == (1, 1)
+    assert names(writer) == ["a"]
+
+
+def test_queued_jobs_share_a_commit_and_fail_alone(writer):
+    writer.execute("INSERT INTO t (name) VALUES ('taken')")
+    running, release = threading.Event(), threading.Event()
+
+    def hold(conn):
+        running.set()
+        return release.wait(5)
+
+    with ThreadPoolExecutor(4) as pool:
+        # Hold the writer so the next jobs queue up behind it
+        blocker = pool.submit(writer.submit, hold)
+        assert running.wait(5)
+        jobs = [pool.submit(writer.submit, insert(name)) for name in ("a", "taken", "b")]
+        deadline = time.monotonic() + 5
+        while writer.stats()["queued"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+
+        assert blocker.result() is True
+        assert jobs[0].result() and jobs[2].result()
+        with pytest.raises(sqlite3.IntegrityError):
+            jobs[1].result()
+
+    assert names(writer) == ["a", "b", "taken"]
+    stats = writer.stats()
+    assert (stats["jobs"], stats["commits"], stats["failed"]) == (5, 3, 1)
+
+
+def test_partial_work_of_a_failed_job_is_rolled_back(writer):
+    def half_done(conn):
+        conn.execute("INSERT INTO t (name) VALUES ('half')")
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError):
+        writer.submit(half_done)
+    writer.submit(insert("whole"))
+    assert names(writer) == ["whole"]
+
+
+def test_closed_writer_restarts_on_submit(writer):
+    writer.submit(insert("a"))
+    writer.close()
+    writer.submit(insert("b"))
+    assert names(writer) == ["a", "b"]
+
+
+def test_only_the_writer_syncs_every_commit(writer):
+    # PRAGMA synchronous: 1 is NORMAL, 2 is FULL
+    assert writer.submit(lambda conn: conn.execute("PRAGMA synchronous").fetchone()[0]) == 2
+    pool = ConnectionPool(writer.path, size=1)
+    try:
+        conn = pool.acquire()
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+        pool.release(conn)
+    finally:
+        pool.close_all()